@@ -13,11 +13,15 @@ config = context.config
 
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
-fileConfig(config.config_file_name)
+# 在应用进程中调用迁移（如测试）时可关闭，避免覆盖应用的日志配置
+if config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name)
 
 # add your model's MetaData object here
 # for 'autogenerate' support
 from app.db.base import Base
+# 导入全部模型，使Base.metadata包含所有表
+from app.models import auto_reply_rule, token_revocation, user, wechat_app  # noqa: F401
 target_metadata = Base.metadata
 
 # other values from the config, defined by the needs of env.py,
@@ -25,7 +29,9 @@ target_metadata = Base.metadata
 # my_important_option = config.get_main_option("my_important_option")
 # ... etc.
 from app.core.config import settings
-config.set_main_option("sqlalchemy.url", settings.DATABASE_URL)
+from app.db.session import _database_url
+# 与应用使用相同的异步驱动（sqlite:///需换成sqlite+aiosqlite:///）
+config.set_main_option("sqlalchemy.url", _database_url(settings.DATABASE_URL))
 
 
 def run_migrations_offline():
@@ -53,7 +59,12 @@ def run_migrations_offline():
 
 
 def do_run_migrations(connection):
-    context.configure(connection=connection, target_metadata=target_metadata)
+    # SQLite不支持ALTER COLUMN，使用batch模式通过重建表完成修改
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        render_as_batch=connection.dialect.name == "sqlite",
+    )
 
     with context.begin_transaction():
         context.run_migrations()
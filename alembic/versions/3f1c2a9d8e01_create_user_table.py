@@ -0,0 +1,47 @@
+"""create user table
+
+Revision ID: 3f1c2a9d8e01
+Revises: 
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c2a9d8e01'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # 开发环境启动时会自动建表（DEBUG），已存在的表不再创建
+    if sa.inspect(op.get_bind()).has_table("user"):
+        return
+    op.create_table(
+        "user",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("username", sa.String(length=50), nullable=False),
+        sa.Column("email", sa.String(length=100), nullable=True),
+        sa.Column("mobile", sa.String(length=20), nullable=True),
+        sa.Column("hashed_password", sa.String(length=100), nullable=False),
+        sa.Column("is_active", sa.Boolean(), nullable=False),
+        sa.Column("is_superuser", sa.Boolean(), nullable=False),
+        sa.Column("openid", sa.String(length=50), nullable=True),
+        sa.Column("unionid", sa.String(length=50), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_user_id", "user", ["id"], unique=False)
+    op.create_index("ix_user_username", "user", ["username"], unique=True)
+    op.create_index("ix_user_email", "user", ["email"], unique=True)
+    op.create_index("ix_user_mobile", "user", ["mobile"], unique=True)
+    op.create_index("ix_user_openid", "user", ["openid"], unique=True)
+    op.create_index("ix_user_unionid", "user", ["unionid"], unique=True)
+
+
+def downgrade():
+    op.drop_table("user")
@@ -0,0 +1,35 @@
+"""user: nullable hashed_password, add session_key
+
+Revision ID: 7b2e4c1d9a03
+Revises: e8a1c4d7f062
+Create Date: 2026-10-19 10:15:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7b2e4c1d9a03'
+down_revision = 'e8a1c4d7f062'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # 开发环境可能已按当前模型建表，只执行尚未完成的修改
+    columns = {c["name"]: c for c in sa.inspect(op.get_bind()).get_columns("user")}
+    with op.batch_alter_table("user") as batch_op:
+        # 仅通过微信登录的账号没有密码
+        if not columns["hashed_password"]["nullable"]:
+            batch_op.alter_column("hashed_password", existing_type=sa.String(length=100), nullable=True)
+        if "session_key" not in columns:
+            batch_op.add_column(sa.Column("session_key", sa.String(length=100), nullable=True))
+
+
+def downgrade():
+    # 旧版本要求密码非空：没有密码的微信账号写入空字符串，仍无法用密码登录
+    op.execute(sa.text("UPDATE \"user\" SET hashed_password = '' WHERE hashed_password IS NULL"))
+    with op.batch_alter_table("user") as batch_op:
+        batch_op.drop_column("session_key")
+        batch_op.alter_column("hashed_password", existing_type=sa.String(length=100), nullable=False)
@@ -0,0 +1,42 @@
+"""user: add token_version, create token_revocation
+
+Revision ID: a4d81f3c6b27
+Revises: 7b2e4c1d9a03
+Create Date: 2026-10-19 10:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4d81f3c6b27'
+down_revision = '7b2e4c1d9a03'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if "token_version" not in {c["name"] for c in inspector.get_columns("user")}:
+        with op.batch_alter_table("user") as batch_op:
+            # 已有用户的令牌版本从0开始
+            batch_op.add_column(
+                sa.Column("token_version", sa.Integer(), server_default="0", nullable=False)
+            )
+    if not inspector.has_table("token_revocation"):
+        op.create_table(
+            "token_revocation",
+            sa.Column("user_id", sa.Integer(), autoincrement=False, nullable=False),
+            sa.Column("min_version", sa.Integer(), nullable=False),
+            sa.Column("expires_at", sa.DateTime(), nullable=False),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint("user_id"),
+        )
+        op.create_index("ix_token_revocation_expires_at", "token_revocation", ["expires_at"], unique=False)
+
+
+def downgrade():
+    op.drop_table("token_revocation")
+    with op.batch_alter_table("user") as batch_op:
+        batch_op.drop_column("token_version")
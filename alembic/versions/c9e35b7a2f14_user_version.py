@@ -0,0 +1,29 @@
+"""user: add version
+
+Revision ID: c9e35b7a2f14
+Revises: f3b9d2e6a418
+Create Date: 2026-10-19 10:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c9e35b7a2f14'
+down_revision = 'f3b9d2e6a418'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if "version" in {c["name"] for c in sa.inspect(op.get_bind()).get_columns("user")}:
+        return
+    with op.batch_alter_table("user") as batch_op:
+        # 已有记录的版本号从1开始，与新建记录一致
+        batch_op.add_column(sa.Column("version", sa.Integer(), server_default="1", nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table("user") as batch_op:
+        batch_op.drop_column("version")
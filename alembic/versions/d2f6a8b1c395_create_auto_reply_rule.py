@@ -0,0 +1,40 @@
+"""create auto_reply_rule table
+
+Revision ID: d2f6a8b1c395
+Revises: 3f1c2a9d8e01
+Create Date: 2026-10-19 10:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2f6a8b1c395'
+down_revision = '3f1c2a9d8e01'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table("auto_reply_rule"):
+        return
+    op.create_table(
+        "auto_reply_rule",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("appid", sa.String(length=50), nullable=True),
+        sa.Column("match_type", sa.String(length=20), nullable=False),
+        sa.Column("pattern", sa.String(length=500), nullable=False),
+        sa.Column("reply", sa.Text(), nullable=False),
+        sa.Column("priority", sa.Integer(), nullable=False),
+        sa.Column("is_active", sa.Boolean(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_auto_reply_rule_id", "auto_reply_rule", ["id"], unique=False)
+    op.create_index("ix_auto_reply_rule_appid", "auto_reply_rule", ["appid"], unique=False)
+
+
+def downgrade():
+    op.drop_table("auto_reply_rule")
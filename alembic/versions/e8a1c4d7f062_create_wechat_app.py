@@ -0,0 +1,42 @@
+"""create wechat_app table
+
+Revision ID: e8a1c4d7f062
+Revises: d2f6a8b1c395
+Create Date: 2026-10-19 10:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8a1c4d7f062'
+down_revision = 'd2f6a8b1c395'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table("wechat_app"):
+        return
+    op.create_table(
+        "wechat_app",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("appid", sa.String(length=50), nullable=False),
+        sa.Column("app_type", sa.String(length=10), nullable=False),
+        sa.Column("name", sa.String(length=100), nullable=True),
+        sa.Column("secret", sa.String(length=100), nullable=False),
+        sa.Column("token", sa.String(length=100), nullable=True),
+        sa.Column("aes_key", sa.String(length=50), nullable=True),
+        sa.Column("max_concurrency", sa.Integer(), nullable=False),
+        sa.Column("is_active", sa.Boolean(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_wechat_app_id", "wechat_app", ["id"], unique=False)
+    op.create_index("ix_wechat_app_appid", "wechat_app", ["appid"], unique=True)
+
+
+def downgrade():
+    op.drop_table("wechat_app")
@@ -0,0 +1,32 @@
+"""user: indexes for keyset pagination
+
+Revision ID: f3b9d2e6a418
+Revises: a4d81f3c6b27
+Create Date: 2026-10-19 10:25:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3b9d2e6a418'
+down_revision = 'a4d81f3c6b27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    existing = {index["name"] for index in sa.inspect(op.get_bind()).get_indexes("user")}
+    # 用户列表按(created_at, id)倒序做游标分页，按是否激活筛选时使用第二个索引
+    if "ix_user_created_at_id" not in existing:
+        op.create_index("ix_user_created_at_id", "user", ["created_at", "id"], unique=False)
+    if "ix_user_is_active_created_at_id" not in existing:
+        op.create_index(
+            "ix_user_is_active_created_at_id", "user", ["is_active", "created_at", "id"], unique=False
+        )
+
+
+def downgrade():
+    op.drop_index("ix_user_is_active_created_at_id", table_name="user")
+    op.drop_index("ix_user_created_at_id", table_name="user")
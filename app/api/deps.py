@@ -1,51 +1,166 @@
 from typing import Generator, Optional
+from functools import lru_cache
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.auth_cache import AuthState, auth_cache
 from app.core.config import settings
+from app.core.token_revocation import token_revocations
 from app.core.security import verify_password
-from app.db.session import get_db
+from app.db.session import get_read_db, reads_from_replica
 from app.models.user import User
 from app.schemas.token import TokenPayload
+from app.services.wechat_apps import WechatAppNotFoundError, wechat_apps
+from app.services.wechat_crypto import WechatCryptoError
+from app.services.wechat_mini import WechatMiniService
+from app.services.wechat_mp import WechatMPService
+from app.services.wechat_pay import WechatPayService
 
 # OAuth2密码Bearer
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_PREFIX}/auth/login")
 
 
+def _decode_token(token: str) -> TokenPayload:
+    """
+    校验JWT并返回载荷，校验结果按令牌哈希缓存
+    """
+    payload = auth_cache.get_token_payload(token)
+    if payload is not None:
+        return payload
+    
+    try:
+        payload = TokenPayload(
+            **jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+        )
+        int(payload.sub)
+    except (JWTError, ValidationError, TypeError, ValueError):
+        raise _credentials_exception("认证失败")
+    
+    auth_cache.set_token_payload(token, payload, payload.exp)
+    return payload
+
+
+def _credentials_exception(detail: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+def _check_token_version(payload: TokenPayload, token_version: Optional[int]):
+    """
+    令牌携带版本号时，拒绝版本低于用户当前令牌版本的令牌
+
+    从副本读到的令牌版本可能还没有包含刚发生的吊销，因此同时检查吊销列表。
+    """
+    if payload.ver is None:
+        return
+    if payload.ver < (token_version or 0) or token_revocations.is_revoked(int(payload.sub), payload.ver):
+        raise _credentials_exception("令牌已失效")
+
+
+def _user_state(db: AsyncSession, user: User) -> AuthState:
+    """
+    根据用户记录得到鉴权状态，只缓存从主库读到的记录
+
+    副本上的记录可能是吊销或停用之前的旧数据，缓存后会在TTL内一直沿用。
+    """
+    if reads_from_replica(db):
+        return AuthState.from_user(user)
+    return auth_cache.set_state(user)
+
+
 async def get_current_user(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     token: str = Depends(oauth2_scheme),
 ) -> User:
     """
     获取当前用户依赖
     """
-    try:
-        payload = jwt.decode(
-            token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM]
-        )
-        token_data = TokenPayload(**payload)
-    except (JWTError, ValidationError):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="认证失败",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+    payload = _decode_token(token)
 
     # 从数据库获取用户
-    user = await User.get_by_id(db=db, id=token_data.sub)
+    user = await User.get_by_id(db=db, id=int(payload.sub))
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="用户不存在",
         )
+    _check_token_version(payload, user.token_version)
     
+    _user_state(db, user)
     return user
 
 
+async def get_current_auth(
+    db: AsyncSession = Depends(get_read_db),
+    token: str = Depends(oauth2_scheme),
+) -> AuthState:
+    """
+    获取当前用户的鉴权状态依赖，命中缓存时不查询数据库
+
+    无状态鉴权模式下直接信任令牌中的用户状态声明，只检查吊销列表。
+    只需要用户ID和权限的接口应使用这一组依赖，需要完整用户信息时使用get_current_user。
+    """
+    payload = _decode_token(token)
+    user_id = int(payload.sub)
+    if settings.AUTH_CLAIMS_MODE and payload.act is not None and payload.ver is not None:
+        if token_revocations.is_revoked(user_id, payload.ver):
+            raise _credentials_exception("令牌已失效")
+        return AuthState(user_id, bool(payload.act), bool(payload.su), payload.ver)
+    
+    state = auth_cache.get_state(user_id)
+    if state is not None:
+        # 缓存的状态可能早于令牌吊销，命中缓存时同样检查令牌版本和吊销列表
+        _check_token_version(payload, state.token_version)
+        return state
+    
+    user = await User.get_by_id(db=db, id=user_id)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="用户不存在",
+        )
+    _check_token_version(payload, user.token_version)
+    
+    return _user_state(db, user)
+
+
+async def get_current_active_auth(
+    auth: AuthState = Depends(get_current_auth),
+) -> AuthState:
+    """
+    获取当前激活用户的鉴权状态依赖
+    """
+    if not auth.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="用户未激活",
+        )
+    
+    return auth
+
+
+async def get_current_superuser_auth(
+    auth: AuthState = Depends(get_current_active_auth),
+) -> AuthState:
+    """
+    获取当前超级用户的鉴权状态依赖
+    """
+    if not auth.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="权限不足",
+        )
+    
+    return auth
+
+
 async def get_current_active_user(
     current_user: User = Depends(get_current_user),
 ) -> User:
@@ -73,4 +188,61 @@ async def get_current_superuser(
             detail="权限不足",
         )
     
-    return current_user 
\ No newline at end of file
+    return current_user
+
+
+def get_wechat_mini_service() -> WechatMiniService:
+    """
+    获取默认微信小程序服务依赖（进程内单例）
+    """
+    return wechat_apps.default_mini_service()
+
+
+def get_wechat_mp_service() -> WechatMPService:
+    """
+    获取默认微信公众号服务依赖（进程内单例）
+    """
+    return wechat_apps.default_mp_service()
+
+
+async def get_wechat_mini_app_service(request: Request) -> WechatMiniService:
+    """
+    按路径中的appid获取小程序服务依赖，路径中没有appid时使用默认小程序
+    """
+    appid = request.path_params.get("appid")
+    if appid is None:
+        return get_wechat_mini_service()
+    try:
+        return await wechat_apps.get_mini_service(appid)
+    except WechatAppNotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+
+
+async def get_wechat_mp_app_service(request: Request) -> WechatMPService:
+    """
+    按路径中的appid获取公众号服务依赖，路径中没有appid时使用默认公众号
+    """
+    appid = request.path_params.get("appid")
+    if appid is None:
+        return get_wechat_mp_service()
+    try:
+        return await wechat_apps.get_mp_service(appid)
+    except WechatAppNotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except WechatCryptoError as e:
+        # 账号配置无效属于客户端可见的配置错误，不作为服务器内部错误返回
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@lru_cache()
+def get_wechat_pay_service() -> WechatPayService:
+    """
+    获取微信支付服务依赖（进程内单例）
+    """
+    return WechatPayService(
+        appid=settings.WECHAT_MINI_APPID,
+        mchid=settings.WECHAT_PAY_MCHID,
+        key=settings.WECHAT_PAY_KEY,
+        cert_path=settings.WECHAT_PAY_CERT_PATH,
+        key_path=settings.WECHAT_PAY_KEY_PATH,
+    )
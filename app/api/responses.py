@@ -0,0 +1,22 @@
+from typing import Any, Dict, Optional, Sequence, Type
+
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+
+
+def model_list_response(
+    items: Sequence[Any],
+    schema: Type[BaseModel],
+    headers: Optional[Dict[str, str]] = None,
+) -> ORJSONResponse:
+    """
+    列表接口的快速返回
+
+    按返回模型的字段用模型预生成的序列化函数直接读取ORM对象，由orjson编码，
+    跳过FastAPI对每一行的Pydantic校验和jsonable_encoder。返回模型的字段必须都是模型的列，
+    接口上的response_model仍用于生成文档。
+    """
+    if not items:
+        return ORJSONResponse([], headers=headers)
+    serialize = type(items[0]).serializer(schema.model_fields)
+    return ORJSONResponse([serialize(item) for item in items], headers=headers)
@@ -1,11 +1,39 @@
 from typing import Dict, List, Any, Optional
+import asyncio
 import os
+import re
+import shutil
+import tempfile
 from pathlib import Path
-from fastapi import APIRouter, Depends, HTTPException, Query, File, UploadFile, Body
+from fastapi import APIRouter, Depends, HTTPException, Query, File, UploadFile, Body, Request
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.api.deps import get_wechat_mp_service
+from app.api.responses import model_list_response
 from app.core.config import settings
-from app.utils.logger import get_logger
+from app.db.session import get_db, pool_stats
+from app.models.auto_reply_rule import AutoReplyRule
+from app.models.wechat_app import WechatApp
+from app.orchestrator.scheduler import scheduler
+from app.schemas.auto_reply_rule import (
+    AutoReplyRule as AutoReplyRuleSchema,
+    AutoReplyRuleCreate,
+    AutoReplyRuleUpdate,
+)
+from app.schemas.wechat_app import WechatApp as WechatAppSchema, WechatAppCreate, WechatAppUpdate
+from app.services.user_transfer import EXPORT_FORMATS, export_users, user_importer
+from app.services.wechat_apps import wechat_apps
+from app.services.wechat_crypto import WechatCryptoError, WechatMsgCrypto
+from app.services.wechat_dedup import message_deduplicator
+from app.services.wechat_mp import WechatMPService
+from app.services.wechat_rules import rule_engine
+from app.utils.http_client import http_client
+from app.utils import log_reader
+from app.utils.logger import LOG_LEVELS, get_logger, log_stats
+from app.worker.job_queue import job_queue
 
 router = APIRouter()
 logger = get_logger("admin")
@@ -21,19 +49,31 @@ async def check_admin_token(token: str = Depends(oauth2_scheme)):
     return token
 
 
+# 日志类型只能是文件名，防止读取日志目录之外的文件
+_LOG_TYPE_RE = re.compile(r"[\w-]+")
+# 跟踪日志时没有新内容的情况下发送心跳的间隔（秒），避免代理断开空闲连接
+_LOG_HEARTBEAT_INTERVAL = 15
+
+
 @router.get("/logs", response_model=Dict[str, Any])
 async def get_logs(
     log_type: str = Query("app", description="日志类型: app, api, db, llm, arxiv, paper_qa, wechat_mp"),
     lines: int = Query(100, ge=1, le=1000, description="返回的日志行数"),
+    level: Optional[str] = Query(None, description="最低日志级别: debug, info, warning, error, critical"),
+    contains: Optional[str] = Query(None, description="只返回首行包含该文本的日志记录"),
     token: str = Depends(check_admin_token)
 ):
     """
     获取指定类型的日志
+
+    从文件末尾向前读取，当前文件不够时继续读取轮转出的旧文件
     """
+    if level and level.lower() not in LOG_LEVELS:
+        raise HTTPException(status_code=400, detail="无效的日志级别")
     log_dir = Path("logs")
     log_file = log_dir / f"{log_type}.log"
     
-    if not log_file.exists():
+    if not _LOG_TYPE_RE.fullmatch(log_type) or not log_reader.log_files(log_file):
         log_files = [f.name for f in log_dir.glob("*.log")]
         logger.warning(f"请求的日志文件 {log_type}.log 不存在")
         return {
@@ -44,16 +84,14 @@ async def get_logs(
     
     try:
         # 读取最后N行日志
-        with open(log_file, "r", encoding="utf-8") as f:
-            all_lines = f.readlines()
-            log_content = all_lines[-lines:] if len(all_lines) > lines else all_lines
+        log_content = await asyncio.to_thread(log_reader.tail, log_file, lines, level, contains)
         
         logger.info(f"成功读取日志文件: {log_type}.log，返回 {len(log_content)} 行")
         return {
             "error": False,
             "log_type": log_type,
             "lines": len(log_content),
-            "content": log_content
+            "content": [line + "\n" for line in log_content]
         }
     except Exception as e:
         logger.error(f"读取日志文件时出错: {str(e)}")
@@ -63,6 +101,55 @@ async def get_logs(
         }
 
 
+@router.get("/logs/follow")
+async def follow_logs(
+    request: Request,
+    log_type: str = Query("app", description="日志类型: app, api, db, llm, arxiv, paper_qa, wechat_mp"),
+    lines: int = Query(0, ge=0, le=1000, description="开始跟踪前先返回的最近日志行数"),
+    level: Optional[str] = Query(None, description="最低日志级别: debug, info, warning, error, critical"),
+    contains: Optional[str] = Query(None, description="只返回首行包含该文本的日志记录"),
+    token: str = Depends(check_admin_token)
+):
+    """
+    以Server-Sent Events持续推送新写入的日志，日志轮转后自动切换到新文件
+    """
+    if not _LOG_TYPE_RE.fullmatch(log_type):
+        raise HTTPException(status_code=400, detail="无效的日志类型")
+    if level and level.lower() not in LOG_LEVELS:
+        raise HTTPException(status_code=400, detail="无效的日志级别")
+    log_file = Path("logs") / f"{log_type}.log"
+
+    async def events():
+        # 最近的日志读到这个位置为止，跟踪从同一位置开始，中间写入的日志不会遗漏
+        start = await asyncio.to_thread(log_reader.position, log_file)
+        if lines:
+            for line in await asyncio.to_thread(log_reader.tail, log_file, lines, level, contains, start):
+                yield f"data: {line}\n\n"
+
+        stream = log_reader.follow(log_file, level, contains, start=start)
+        next_line = asyncio.ensure_future(stream.__anext__())
+        try:
+            while True:
+                done, _ = await asyncio.wait({next_line}, timeout=_LOG_HEARTBEAT_INTERVAL)
+                if await request.is_disconnected():
+                    break
+                if not done:
+                    yield ": ping\n\n"
+                    continue
+                yield f"data: {next_line.result()}\n\n"
+                next_line = asyncio.ensure_future(stream.__anext__())
+        finally:
+            next_line.cancel()
+            await asyncio.gather(next_line, return_exceptions=True)
+            await stream.aclose()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/logs/types", response_model=List[str])
 async def get_log_types(token: str = Depends(check_admin_token)):
     """
@@ -80,4 +167,309 @@ async def get_log_types(token: str = Depends(check_admin_token)):
         return log_files
     except Exception as e:
         logger.error(f"获取日志类型时出错: {str(e)}")
-        return [] 
\ No newline at end of file
+        return [] 
+
+
+@router.get("/logs/stats", response_model=Dict[str, Any])
+async def get_log_stats(token: str = Depends(check_admin_token)):
+    """
+    获取日志队列统计，包括队列已满时丢弃的日志数
+    """
+    return log_stats()
+
+
+@router.get("/worker/stats", response_model=Dict[str, Any])
+async def get_worker_stats(token: str = Depends(check_admin_token)):
+    """
+    获取Agent任务队列状态
+    """
+    result = {"mode": settings.AGENT_WORKER_MODE, "scheduler": scheduler.stats(), "jobs": {}}
+    if settings.AGENT_WORKER_MODE != "queue":
+        return result
+
+    try:
+        result["jobs"] = await job_queue.stats()
+    except Exception as e:
+        logger.error(f"获取任务队列状态时出错: {str(e)}")
+        result["error"] = str(e)
+    return result
+
+
+@router.get("/http/stats", response_model=Dict[str, Any])
+async def get_http_stats(token: str = Depends(check_admin_token)):
+    """
+    获取共享HTTP客户端的连接复用统计
+    """
+    return http_client.stats()
+
+
+@router.get("/db/stats", response_model=Dict[str, Any])
+async def get_db_stats(token: str = Depends(check_admin_token)):
+    """
+    获取数据库连接池统计
+    """
+    return pool_stats()
+
+
+@router.get("/users/export")
+async def export_users_file(
+    format: str = Query("ndjson", description="导出格式: ndjson, csv"),
+    token: str = Depends(check_admin_token),
+):
+    """
+    流式导出全部用户（不含密码哈希）
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"不支持的导出格式: {format}")
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        export_users(format),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=users.{format}"},
+    )
+
+
+@router.post("/users/import", response_model=Dict[str, Any])
+async def import_users_file(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, description="文件格式: ndjson, csv，默认按文件扩展名判断"),
+    token: str = Depends(check_admin_token),
+):
+    """
+    批量导入用户，文件每行一个用户（字段同创建用户接口，可附带openid、unionid）
+
+    导入在后台进行，返回的任务ID用于查询进度；用户名、邮箱、手机号或openid已存在的行跳过。
+    """
+    if format is None:
+        format = "csv" if (file.filename or "").lower().endswith(".csv") else "ndjson"
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"不支持的导入格式: {format}")
+    
+    # 请求结束后上传文件即被关闭，先复制到临时文件供后台任务读取
+    fd, path = tempfile.mkstemp(prefix="user-import-", suffix=f".{format}")
+    with os.fdopen(fd, "wb") as f:
+        await asyncio.to_thread(shutil.copyfileobj, file.file, f)
+    job = await user_importer.start(path, format)
+    logger.info(f"开始导入用户 {job.id}: {file.filename}")
+    return job.to_dict()
+
+
+@router.get("/users/import/{job_id}", response_model=Dict[str, Any])
+async def get_import_job(job_id: str, token: str = Depends(check_admin_token)):
+    """
+    查询用户导入进度
+    """
+    job = await user_importer.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="导入任务不存在")
+    return job
+
+
+@router.get("/wechat/mp/stats", response_model=Dict[str, Any])
+async def get_wechat_mp_stats(
+    token: str = Depends(check_admin_token),
+    wechat_service: WechatMPService = Depends(get_wechat_mp_service),
+):
+    """
+    获取公众号消息处理统计
+    """
+    return {
+        "duplicate_callbacks": message_deduplicator.duplicates,
+        "access_token_fetches": wechat_service.token_manager.fetch_count,
+        "custom_message_sender": wechat_service.sender.stats(),
+        "auto_reply_rules": rule_engine.stats(),
+        "loaded_apps": wechat_apps.stats(),
+    }
+
+
+@router.get("/wechat/apps", response_model=List[WechatAppSchema])
+async def list_wechat_apps(
+    db: AsyncSession = Depends(get_db),
+    token: str = Depends(check_admin_token),
+):
+    """
+    获取数据库中配置的微信账号
+    """
+    result = await db.execute(select(WechatApp).order_by(WechatApp.id))
+    return model_list_response(result.scalars().all(), WechatAppSchema)
+
+
+def _check_aes_key(appid: str, token: Optional[str], aes_key: Optional[str]):
+    """
+    校验EncodingAESKey能否用于安全模式，无效时返回400
+    """
+    if not aes_key:
+        return
+    try:
+        WechatMsgCrypto(token or "", aes_key, appid)
+    except WechatCryptoError as e:
+        raise HTTPException(status_code=400, detail=f"EncodingAESKey无效: {str(e)}")
+
+
+@router.post("/wechat/apps", response_model=WechatAppSchema)
+async def create_wechat_app(
+    *,
+    db: AsyncSession = Depends(get_db),
+    app_in: WechatAppCreate,
+    token: str = Depends(check_admin_token),
+):
+    """
+    添加微信账号
+    """
+    if await WechatApp.get_by_appid(db, app_in.appid):
+        raise HTTPException(status_code=400, detail="该appid已存在")
+    _check_aes_key(app_in.appid, app_in.token, app_in.aes_key)
+    
+    wechat_app = WechatApp(**app_in.dict())
+    db.add(wechat_app)
+    await db.commit()
+    await db.refresh(wechat_app)
+    wechat_apps.invalidate(wechat_app.appid)
+    return wechat_app
+
+
+@router.put("/wechat/apps/{appid}", response_model=WechatAppSchema)
+async def update_wechat_app(
+    *,
+    db: AsyncSession = Depends(get_db),
+    appid: str,
+    app_in: WechatAppUpdate,
+    token: str = Depends(check_admin_token),
+):
+    """
+    更新微信账号配置，本进程立即生效，其他进程在缓存过期后生效
+    """
+    wechat_app = await WechatApp.get_by_appid(db, appid)
+    if wechat_app is None:
+        raise HTTPException(status_code=404, detail="账号不存在")
+    values = app_in.dict(exclude_unset=True)
+    _check_aes_key(appid, values.get("token", wechat_app.token), values.get("aes_key", wechat_app.aes_key))
+    
+    for field, value in values.items():
+        setattr(wechat_app, field, value)
+    await db.commit()
+    await db.refresh(wechat_app)
+    wechat_apps.invalidate(appid)
+    return wechat_app
+
+
+@router.delete("/wechat/apps/{appid}", response_model=WechatAppSchema)
+async def delete_wechat_app(
+    *,
+    db: AsyncSession = Depends(get_db),
+    appid: str,
+    token: str = Depends(check_admin_token),
+):
+    """
+    删除微信账号
+    """
+    wechat_app = await WechatApp.get_by_appid(db, appid)
+    if wechat_app is None:
+        raise HTTPException(status_code=404, detail="账号不存在")
+    
+    await db.delete(wechat_app)
+    await db.commit()
+    wechat_apps.invalidate(appid)
+    return wechat_app
+
+
+@router.get("/wechat/mp/rules", response_model=List[AutoReplyRuleSchema])
+async def list_auto_reply_rules(
+    db: AsyncSession = Depends(get_db),
+    appid: Optional[str] = Query(None, description="只返回该公众号的专属规则"),
+    token: str = Depends(check_admin_token),
+):
+    """
+    获取公众号自动回复规则
+    """
+    stmt = select(AutoReplyRule).order_by(AutoReplyRule.id)
+    if appid:
+        stmt = stmt.filter(AutoReplyRule.appid == appid)
+    result = await db.execute(stmt)
+    return model_list_response(result.scalars().all(), AutoReplyRuleSchema)
+
+
+@router.post("/wechat/mp/rules", response_model=AutoReplyRuleSchema)
+async def create_auto_reply_rule(
+    *,
+    db: AsyncSession = Depends(get_db),
+    rule_in: AutoReplyRuleCreate,
+    token: str = Depends(check_admin_token),
+):
+    """
+    创建公众号自动回复规则
+    """
+    _check_rule_pattern(rule_in.match_type, rule_in.pattern)
+    rule = AutoReplyRule(**rule_in.dict())
+    db.add(rule)
+    await db.commit()
+    await db.refresh(rule)
+    await rule_engine.reload()
+    return rule
+
+
+@router.put("/wechat/mp/rules/{rule_id}", response_model=AutoReplyRuleSchema)
+async def update_auto_reply_rule(
+    *,
+    db: AsyncSession = Depends(get_db),
+    rule_id: int,
+    rule_in: AutoReplyRuleUpdate,
+    token: str = Depends(check_admin_token),
+):
+    """
+    更新公众号自动回复规则
+    """
+    rule = await db.get(AutoReplyRule, rule_id)
+    if rule is None:
+        raise HTTPException(status_code=404, detail="规则不存在")
+    
+    update_data = rule_in.dict(exclude_unset=True)
+    _check_rule_pattern(
+        update_data.get("match_type", rule.match_type), update_data.get("pattern", rule.pattern)
+    )
+    for field, value in update_data.items():
+        setattr(rule, field, value)
+    await db.commit()
+    await db.refresh(rule)
+    await rule_engine.reload()
+    return rule
+
+
+@router.delete("/wechat/mp/rules/{rule_id}", response_model=AutoReplyRuleSchema)
+async def delete_auto_reply_rule(
+    *,
+    db: AsyncSession = Depends(get_db),
+    rule_id: int,
+    token: str = Depends(check_admin_token),
+):
+    """
+    删除公众号自动回复规则
+    """
+    rule = await db.get(AutoReplyRule, rule_id)
+    if rule is None:
+        raise HTTPException(status_code=404, detail="规则不存在")
+    
+    await db.delete(rule)
+    await db.commit()
+    await rule_engine.reload()
+    return rule
+
+
+@router.post("/wechat/mp/rules/reload", response_model=Dict[str, Any])
+async def reload_auto_reply_rules(token: str = Depends(check_admin_token)):
+    """
+    立即从数据库重新加载自动回复规则
+    """
+    await rule_engine.reload()
+    return rule_engine.stats()
+
+
+def _check_rule_pattern(match_type: str, pattern: str):
+    """
+    校验正则规则能否编译
+    """
+    if match_type == "regex":
+        try:
+            re.compile(pattern)
+        except re.error as e:
+            raise HTTPException(status_code=400, detail=f"正则表达式无效: {str(e)}")
@@ -5,7 +5,7 @@ from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_current_user
-from app.core.security import create_access_token, verify_password
+from app.core.security import create_access_token, verify_and_update_password
 from app.db.session import get_db
 from app.models.user import User
 from app.schemas.token import Token
@@ -31,15 +31,21 @@ async def login_access_token(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    if not verify_password(form_data.password, user.hashed_password):
+    valid, new_hash = await verify_and_update_password(form_data.password, user.hashed_password)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="用户名或密码不正确",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # bcrypt cost调整后，借登录时的明文密码透明地重新哈希
+    if new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
+    
     # 创建访问令牌
-    access_token = create_access_token(subject=str(user.id))
+    access_token = create_access_token(subject=str(user.id), user=user)
     
     return {"access_token": access_token, "token_type": "bearer"}
 
@@ -1,18 +1,30 @@
-from typing import Any, List
+from typing import Any, List, Optional, Tuple
+from datetime import datetime
+import base64
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
-from sqlalchemy import update, delete
 
-from app.api.deps import get_current_active_user, get_current_superuser
-from app.core.security import get_password_hash
-from app.db.session import get_db
+from app.api.deps import (
+    get_current_active_auth,
+    get_current_active_user,
+    get_current_superuser_auth,
+)
+from app.api.responses import model_list_response
+from app.core.auth_cache import AuthState, auth_cache
+from app.core.token_revocation import token_revocations
+from app.core.security import get_password_hash_async
+from app.db.counts import approximate_count
+from app.db.session import get_db, get_read_db
 from app.models.user import User
+from app.repositories.user import UserRepository, VersionConflictError
 from app.schemas.user import User as UserSchema, UserCreate, UserUpdate
 
 router = APIRouter()
 
+# 修改这些字段后，已签发的令牌需要失效
+_REVOKING_FIELDS = {"hashed_password", "is_active", "is_superuser"}
+
 
 @router.get("/me", response_model=UserSchema)
 async def read_user_me(current_user: User = Depends(get_current_active_user)) -> Any:
@@ -27,40 +39,94 @@ async def update_user_me(
     *,
     db: AsyncSession = Depends(get_db),
     user_in: UserUpdate,
-    current_user: User = Depends(get_current_active_user),
+    current_user: AuthState = Depends(get_current_active_auth),
 ) -> Any:
     """
     更新当前用户信息
     """
+    return await _update_user(db, current_user.id, user_in)
+
+
+async def _update_user(db: AsyncSession, user_id: int, user_in: UserUpdate) -> User:
+    """
+    按UserUpdate修改用户，修改密码或权限时吊销已签发的令牌
+    """
     # 构建更新数据
     update_data = user_in.dict(exclude_unset=True)
-    if "password" in update_data and update_data["password"]:
-        update_data["hashed_password"] = get_password_hash(update_data["password"])
-        del update_data["password"]
+    expected_version = update_data.pop("version", None)
+    password = update_data.pop("password", None)
+    if password:
+        update_data["hashed_password"] = await get_password_hash_async(password)
+    revoke_tokens = bool(_REVOKING_FIELDS & update_data.keys())
     
-    # 更新用户
-    await db.execute(
-        update(User).where(User.id == current_user.id).values(**update_data)
-    )
+    try:
+        user = await UserRepository(db).update(
+            user_id, update_data, expected_version=expected_version, revoke_tokens=revoke_tokens
+        )
+    except VersionConflictError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="用户不存在",
+        )
+    if revoke_tokens:
+        await token_revocations.revoke(db, user_id, min_version=user.token_version)
     await db.commit()
+    auth_cache.invalidate(user_id)
     
-    # 返回更新后的用户
-    return await User.get_by_id(db, id=current_user.id)
+    return user
+
+
+def _encode_cursor(user: User) -> str:
+    raw = f"{user.created_at.isoformat()}|{user.id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        created_at, user_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(user_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="无效的分页游标",
+        )
 
 
 @router.get("", response_model=List[UserSchema])
 async def read_users(
-    db: AsyncSession = Depends(get_db),
-    skip: int = 0,
-    limit: int = 100,
-    current_user: User = Depends(get_current_superuser),
+    db: AsyncSession = Depends(get_read_db),
+    cursor: Optional[str] = Query(None, description="上一页响应头X-Next-Cursor中的游标"),
+    limit: int = Query(100, ge=1, le=1000),
+    is_active: Optional[bool] = None,
+    created_from: Optional[datetime] = Query(None, description="注册时间下限（含）"),
+    created_to: Optional[datetime] = Query(None, description="注册时间上限（不含）"),
+    with_total: bool = Query(False, description="是否在X-Total-Count响应头返回估算总数"),
+    skip: int = Query(0, ge=0, deprecated=True, description="兼容旧的偏移分页，深分页很慢"),
+    current_user: AuthState = Depends(get_current_superuser_auth),
 ) -> Any:
     """
-    获取所有用户列表
+    获取用户列表，按注册时间倒序
+
+    使用游标分页：还有下一页时响应头X-Next-Cursor给出游标，作为下次请求的cursor参数。
     """
-    result = await db.execute(select(User).offset(skip).limit(limit))
-    users = result.scalars().all()
-    return users
+    filters = {"is_active": is_active, "created_from": created_from, "created_to": created_to}
+    if skip and cursor is None:
+        stmt = User.list_query(**filters).order_by(User.created_at.desc(), User.id.desc())
+        result = await db.execute(stmt.offset(skip).limit(limit))
+        users = list(result.scalars().all())
+    else:
+        after = _decode_cursor(cursor) if cursor else None
+        users = await User.get_page(db, limit=limit, after=after, **filters)
+    
+    headers = {}
+    if len(users) == limit:
+        headers["X-Next-Cursor"] = _encode_cursor(users[-1])
+    if with_total:
+        headers["X-Total-Count"] = str(await approximate_count(db, User.list_query(**filters)))
+    return model_list_response(users, UserSchema, headers=headers)
 
 
 @router.post("", response_model=UserSchema)
@@ -68,7 +134,7 @@ async def create_user(
     *,
     db: AsyncSession = Depends(get_db),
     user_in: UserCreate,
-    current_user: User = Depends(get_current_superuser),
+    current_user: AuthState = Depends(get_current_superuser_auth),
 ) -> Any:
     """
     创建新用户
@@ -95,7 +161,7 @@ async def create_user(
         username=user_in.username,
         email=user_in.email,
         mobile=user_in.mobile,
-        hashed_password=get_password_hash(user_in.password),
+        hashed_password=await get_password_hash_async(user_in.password),
         is_active=user_in.is_active,
         is_superuser=user_in.is_superuser,
     )
@@ -109,8 +175,8 @@ async def create_user(
 @router.get("/{user_id}", response_model=UserSchema)
 async def read_user(
     user_id: int,
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: AuthState = Depends(get_current_active_auth),
 ) -> Any:
     """
     获取指定用户信息
@@ -138,52 +204,36 @@ async def update_user(
     user_id: int,
     db: AsyncSession = Depends(get_db),
     user_in: UserUpdate,
-    current_user: User = Depends(get_current_superuser),
+    current_user: AuthState = Depends(get_current_superuser_auth),
 ) -> Any:
     """
-    更新指定用户信息
+    更新指定用户信息，请求中带version时只有与当前版本一致才会修改，否则返回409
     """
-    user = await User.get_by_id(db, id=user_id)
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="用户不存在",
-        )
-    
-    # 构建更新数据
-    update_data = user_in.dict(exclude_unset=True)
-    if "password" in update_data and update_data["password"]:
-        update_data["hashed_password"] = get_password_hash(update_data["password"])
-        del update_data["password"]
-    
-    # 更新用户
-    await db.execute(
-        update(User).where(User.id == user_id).values(**update_data)
-    )
-    await db.commit()
-    
-    # 返回更新后的用户
-    return await User.get_by_id(db, id=user_id)
+    return await _update_user(db, user_id, user_in)
 
 
 @router.delete("/{user_id}", response_model=UserSchema)
 async def delete_user(
     user_id: int,
+    version: Optional[int] = Query(None, description="客户端读取时的版本号，不一致时返回409"),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_superuser),
+    current_user: AuthState = Depends(get_current_superuser_auth),
 ) -> Any:
     """
     删除指定用户
     """
-    user = await User.get_by_id(db, id=user_id)
+    try:
+        user = await UserRepository(db).delete(user_id, expected_version=version)
+    except VersionConflictError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="用户不存在",
         )
     
-    # 删除用户
-    await db.execute(delete(User).where(User.id == user_id))
+    await token_revocations.revoke(db, user_id, deleted=True)
     await db.commit()
+    auth_cache.invalidate(user_id)
     
-    return user 
\ No newline at end of file
+    return user
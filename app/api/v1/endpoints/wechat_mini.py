@@ -3,8 +3,8 @@ from typing import Any, Dict
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.config import settings
-from app.core.security import create_access_token, get_password_hash
+from app.api.deps import get_wechat_mini_app_service
+from app.core.security import create_access_token
 from app.db.session import get_db
 from app.models.user import User
 from app.schemas.token import Token
@@ -13,20 +13,18 @@ from app.services.wechat_mini import WechatMiniService
 router = APIRouter()
 
 
+# /login 对应环境变量中配置的默认小程序，/{appid}/login 对应数据库中配置的其他小程序
 @router.post("/login", response_model=Token)
+@router.post("/{appid}/login", response_model=Token)
 async def wechat_mini_login(
     *,
     db: AsyncSession = Depends(get_db),
+    wechat_service: WechatMiniService = Depends(get_wechat_mini_app_service),
     code: str,
 ) -> Any:
     """
     微信小程序登录
     """
-    wechat_service = WechatMiniService(
-        appid=settings.WECHAT_MINI_APPID,
-        secret=settings.WECHAT_MINI_SECRET,
-    )
-    
     try:
         # 获取微信用户信息
         wx_result = await wechat_service.code2session(code)
@@ -38,31 +36,16 @@ async def wechat_mini_login(
                 detail="微信登录失败，无法获取openid",
             )
         
-        openid = wx_result["openid"]
-        unionid = wx_result.get("unionid")
-        
-        # 检查用户是否已存在
-        user = await User.get_by_openid(db, openid=openid)
-        
-        # 如果用户不存在，创建新用户
-        if not user:
-            # 生成临时用户名
-            temp_username = f"wx_{openid[-8:]}"
-            temp_password = f"{openid}_{unionid}" if unionid else openid
-            
-            user = User(
-                username=temp_username,
-                hashed_password=get_password_hash(temp_password),
-                openid=openid,
-                unionid=unionid,
-                is_active=True,
-            )
-            db.add(user)
-            await db.commit()
-            await db.refresh(user)
+        # 查找或创建用户并保存session_key，微信账号不设置密码
+        user = await User.upsert_by_openid(
+            db,
+            openid=wx_result["openid"],
+            unionid=wx_result.get("unionid"),
+            session_key=wx_result.get("session_key"),
+        )
         
         # 创建访问令牌
-        access_token = create_access_token(subject=str(user.id))
+        access_token = create_access_token(subject=str(user.id), user=user)
         
         return {"access_token": access_token, "token_type": "bearer"}
     
@@ -74,19 +57,16 @@ async def wechat_mini_login(
 
 
 @router.post("/phone", response_model=Dict[str, str])
+@router.post("/{appid}/phone", response_model=Dict[str, str])
 async def wechat_mini_get_phone(
     *,
     db: AsyncSession = Depends(get_db),
+    wechat_service: WechatMiniService = Depends(get_wechat_mini_app_service),
     code: str,
 ) -> Any:
     """
     获取微信小程序用户手机号
     """
-    wechat_service = WechatMiniService(
-        appid=settings.WECHAT_MINI_APPID,
-        secret=settings.WECHAT_MINI_SECRET,
-    )
-    
     try:
         # 获取微信用户手机号
         result = await wechat_service.get_phone_number(code)
@@ -5,49 +5,55 @@ from fastapi import APIRouter, Depends, HTTPException, status, Request
 from fastapi.responses import PlainTextResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.config import settings
+from app.api.deps import get_wechat_mp_app_service, get_wechat_mp_service
 from app.db.session import get_db
 from app.services.wechat_mp import WechatMPService
+from app.utils.logger import get_logger
 
 router = APIRouter()
 
+logger = get_logger("wechat_mp")
 
+
+def _check_signature(token: str, signature: str, timestamp: str, nonce: str) -> bool:
+    """
+    校验微信服务器请求的signature
+    """
+    temp_list = sorted([token, timestamp, nonce])
+    temp_str = "".join(temp_list)
+    hash_str = hashlib.sha1(temp_str.encode("utf-8")).hexdigest()
+    return hash_str == signature
+
+
+# /callback 对应环境变量中配置的默认公众号，/{appid}/callback 对应数据库中配置的其他公众号
 @router.get("/callback", response_class=PlainTextResponse)
+@router.get("/{appid}/callback", response_class=PlainTextResponse)
 async def verify_mp_callback(
     signature: str,
     timestamp: str,
     nonce: str,
     echostr: str,
+    wechat_service: WechatMPService = Depends(get_wechat_mp_app_service),
 ) -> Any:
     """
     验证微信公众号服务器配置
     """
-    token = settings.WECHAT_MP_TOKEN
-    temp_list = sorted([token, timestamp, nonce])
-    temp_str = "".join(temp_list)
-    hash_str = hashlib.sha1(temp_str.encode("utf-8")).hexdigest()
-    
-    if hash_str == signature:
+    if _check_signature(wechat_service.token, signature, timestamp, nonce):
         return echostr
     
     return "验证失败"
 
 
 @router.post("/callback", response_class=PlainTextResponse)
+@router.post("/{appid}/callback", response_class=PlainTextResponse)
 async def handle_mp_message(
     request: Request,
     db: AsyncSession = Depends(get_db),
+    wechat_service: WechatMPService = Depends(get_wechat_mp_app_service),
 ) -> Any:
     """
     处理微信公众号消息并自动回复
     """
-    wechat_service = WechatMPService(
-        appid=settings.WECHAT_MP_APPID,
-        secret=settings.WECHAT_MP_SECRET,
-        token=settings.WECHAT_MP_TOKEN,
-        aes_key=settings.WECHAT_MP_AES_KEY,
-    )
-    
     try:
         # 获取请求体
         body = await request.body()
@@ -59,20 +65,28 @@ async def handle_mp_message(
         nonce = params.get("nonce", "")
         
         # 验证签名
-        token = settings.WECHAT_MP_TOKEN
-        temp_list = sorted([token, timestamp, nonce])
-        temp_str = "".join(temp_list)
-        hash_str = hashlib.sha1(temp_str.encode("utf-8")).hexdigest()
-        
-        if hash_str != signature:
+        if not _check_signature(wechat_service.token, signature, timestamp, nonce):
             return "签名验证失败"
         
+        # 安全模式：校验msg_signature并解密消息体
+        encrypted = params.get("encrypt_type") == "aes"
+        if encrypted:
+            if wechat_service.crypto is None:
+                logger.error(f"公众号 {wechat_service.appid} 收到安全模式消息，但未配置有效的EncodingAESKey")
+                return ""
+            body = await wechat_service.crypto.decrypt_callback_async(
+                body, params.get("msg_signature", ""), timestamp, nonce
+            )
+        
         # 解析消息并自动回复
         reply = await wechat_service.auto_reply(body)
+        if encrypted and reply:
+            reply = await wechat_service.crypto.encrypt_reply_async(reply, timestamp, nonce)
         return reply
     
     except Exception as e:
         # 出现异常，返回空字符串，避免微信服务器重试
+        logger.error(f"处理公众号消息出错: {str(e)}")
         return ""
 
 
@@ -80,6 +94,7 @@ async def handle_mp_message(
 async def send_custom_message(
     *,
     db: AsyncSession = Depends(get_db),
+    wechat_service: WechatMPService = Depends(get_wechat_mp_service),
     openid: str,
     message_type: str = "text",
     content: str,
@@ -87,13 +102,6 @@ async def send_custom_message(
     """
     发送客服消息
     """
-    wechat_service = WechatMPService(
-        appid=settings.WECHAT_MP_APPID,
-        secret=settings.WECHAT_MP_SECRET,
-        token=settings.WECHAT_MP_TOKEN,
-        aes_key=settings.WECHAT_MP_AES_KEY,
-    )
-    
     try:
         result = await wechat_service.send_custom_message(openid, message_type, content)
         return result
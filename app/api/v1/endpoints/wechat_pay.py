@@ -6,8 +6,7 @@ from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
 from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.deps import get_current_active_user
-from app.core.config import settings
+from app.api.deps import get_current_active_user, get_wechat_pay_service
 from app.db.session import get_db
 from app.models.user import User
 from app.services.wechat_pay import WechatPayService
@@ -20,6 +19,7 @@ async def create_order(
     *,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
+    wechat_pay_service: WechatPayService = Depends(get_wechat_pay_service),
     amount: int,
     description: str,
 ) -> Any:
@@ -33,15 +33,6 @@ async def create_order(
             detail="金额必须大于0",
         )
     
-    # 创建微信支付服务
-    wechat_pay_service = WechatPayService(
-        appid=settings.WECHAT_MINI_APPID,
-        mchid=settings.WECHAT_PAY_MCHID,
-        key=settings.WECHAT_PAY_KEY,
-        cert_path=settings.WECHAT_PAY_CERT_PATH,
-        key_path=settings.WECHAT_PAY_KEY_PATH,
-    )
-    
     try:
         # 生成订单号
         out_trade_no = f"ORDER_{int(time.time())}_{uuid.uuid4().hex[:8]}"
@@ -67,18 +58,11 @@ async def create_order(
 async def wechat_pay_notify(
     request: Request,
     db: AsyncSession = Depends(get_db),
+    wechat_pay_service: WechatPayService = Depends(get_wechat_pay_service),
 ) -> Any:
     """
     处理微信支付结果通知
     """
-    wechat_pay_service = WechatPayService(
-        appid=settings.WECHAT_MINI_APPID,
-        mchid=settings.WECHAT_PAY_MCHID,
-        key=settings.WECHAT_PAY_KEY,
-        cert_path=settings.WECHAT_PAY_CERT_PATH,
-        key_path=settings.WECHAT_PAY_KEY_PATH,
-    )
-    
     try:
         # 获取请求体
         body = await request.body()
@@ -0,0 +1,101 @@
+from typing import Any, NamedTuple, Optional
+import hashlib
+import time
+
+from app.core.config import settings
+from app.utils.ttl_cache import TTLCache
+
+
+class AuthState(NamedTuple):
+    """
+    鉴权所需的用户状态
+    """
+    id: int
+    is_active: bool
+    is_superuser: bool
+    token_version: int = 0
+
+    @classmethod
+    def from_user(cls, user: Any) -> "AuthState":
+        """
+        根据用户记录构造鉴权状态
+        """
+        return cls(user.id, bool(user.is_active), bool(user.is_superuser), user.token_version or 0)
+
+
+class AuthCache:
+    """
+    进程内的用户鉴权状态缓存
+
+    - 按用户ID缓存 id/is_active/is_superuser/token_version，认证请求不再每次查询数据库
+    - 可选地按令牌哈希缓存JWT校验后的载荷，跳过重复的签名验证
+    修改或删除用户时需要调用invalidate；其他进程中的缓存最多在TTL后失效。
+    """
+
+    def __init__(self, ttl: float = 60, token_ttl: float = 0, maxsize: int = 10000):
+        """
+        初始化缓存
+
+        Args:
+            ttl: 用户状态的缓存时间（秒），0表示不缓存
+            token_ttl: 令牌校验结果的缓存时间（秒），0表示不缓存
+            maxsize: 每类缓存的最大条目数
+        """
+        self.ttl = ttl
+        self.token_ttl = token_ttl
+        self._states = TTLCache(maxsize=maxsize, ttl=ttl or 1)
+        self._tokens = TTLCache(maxsize=maxsize, ttl=token_ttl or 1)
+
+    @staticmethod
+    def _token_key(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get_state(self, user_id: int) -> Optional[AuthState]:
+        """
+        获取缓存的用户状态
+        """
+        if self.ttl <= 0:
+            return None
+        return self._states.get(user_id)
+
+    def set_state(self, user: Any) -> AuthState:
+        """
+        根据用户记录缓存鉴权状态
+        """
+        state = AuthState.from_user(user)
+        if self.ttl > 0:
+            self._states.set(state.id, state)
+        return state
+
+    def get_token_payload(self, token: str) -> Optional[Any]:
+        """
+        获取已校验过的令牌载荷
+        """
+        if self.token_ttl <= 0:
+            return None
+        return self._tokens.get(self._token_key(token))
+
+    def set_token_payload(self, token: str, payload: Any, expires_at: Optional[int] = None):
+        """
+        缓存令牌校验结果，缓存时间不超过令牌本身的有效期
+        """
+        if self.token_ttl <= 0:
+            return
+        ttl = self.token_ttl
+        if expires_at is not None:
+            ttl = min(ttl, expires_at - time.time())
+        if ttl > 0:
+            self._tokens.set(self._token_key(token), payload, ttl)
+
+    def invalidate(self, user_id: int):
+        """
+        用户被修改或删除后丢弃其鉴权状态
+        """
+        self._states.delete(user_id)
+
+
+auth_cache = AuthCache(
+    ttl=settings.AUTH_USER_CACHE_TTL,
+    token_ttl=settings.AUTH_TOKEN_CACHE_TTL,
+    maxsize=settings.AUTH_CACHE_MAXSIZE,
+)
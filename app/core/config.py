@@ -35,14 +35,71 @@ class Settings(BaseSettings):
                 return []
         return []
     
+    # 日志输出：是否输出JSON行格式（附带请求ID和追踪ID）、是否gzip压缩轮转出的旧日志、
+    # 日志队列容量（写入线程跟不上时丢弃超出的日志，不阻塞请求处理）
+    LOG_JSON: bool = os.getenv("LOG_JSON", "False").lower() in ('true', '1', 't')
+    LOG_COMPRESS_ROTATED: bool = os.getenv("LOG_COMPRESS_ROTATED", "False").lower() in ('true', '1', 't')
+    LOG_QUEUE_SIZE: int = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+    # 日志队列中只给ERROR及以上级别使用的预留容量，低级别日志积压时错误日志也不会被丢弃
+    LOG_QUEUE_ERROR_RESERVE: int = int(os.getenv("LOG_QUEUE_ERROR_RESERVE", "1000"))
+    
     # 数据库配置
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./app.db")
+    # 只读副本地址（逗号分隔），只读查询分配到复制延迟不超过上限（秒）的副本，并定期（秒）检查延迟
+    DATABASE_REPLICA_URLS: str = os.getenv("DATABASE_REPLICA_URLS", "")
+    DB_REPLICA_MAX_LAG: float = float(os.getenv("DB_REPLICA_MAX_LAG", "5"))
+    DB_REPLICA_CHECK_INTERVAL: float = float(os.getenv("DB_REPLICA_CHECK_INTERVAL", "10"))
+    # 非PostgreSQL数据库下列表总数（COUNT(*)）的缓存时间（秒）
+    DB_COUNT_CACHE_TTL: float = float(os.getenv("DB_COUNT_CACHE_TTL", "60"))
+    # 慢查询阈值（毫秒，0表示不记录），超过的语句以指纹形式写入db日志
+    DB_SLOW_QUERY_MS: float = float(os.getenv("DB_SLOW_QUERY_MS", "200"))
+    # 是否在响应头X-DB-Queries/X-DB-Time-Ms中返回本次请求的查询次数和数据库耗时
+    DB_QUERY_STATS_HEADERS: bool = os.getenv("DB_QUERY_STATS_HEADERS", "False").lower() in ('true', '1', 't')
+    # 同一语句在一个请求中执行达到该次数时警告可能的N+1查询（0表示关闭，建议仅在开发环境开启）
+    DB_REPEATED_QUERY_THRESHOLD: int = int(os.getenv("DB_REPEATED_QUERY_THRESHOLD", "0"))
+    # 是否输出SQL语句日志，与DEBUG分开控制
+    DB_ECHO: bool = os.getenv("DB_ECHO", "False").lower() in ('true', '1', 't')
+    # 连接池：常驻连接数、允许额外创建的连接数、等待空闲连接的时限（秒）、连接回收周期（秒）、借出前是否探活
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "True").lower() in ('true', '1', 't')
+    # SQLite连接参数：日志模式、同步级别、锁等待时间（毫秒）、内存映射大小（字节）、页缓存（负数表示KiB）
+    SQLITE_JOURNAL_MODE: str = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS: str = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_BUSY_TIMEOUT: int = int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000"))
+    SQLITE_MMAP_SIZE: int = int(os.getenv("SQLITE_MMAP_SIZE", "268435456"))
+    SQLITE_CACHE_SIZE: int = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))
     
     # JWT设置
     JWT_SECRET_KEY: str = os.getenv("JWT_SECRET_KEY", "your_jwt_secret")
     JWT_ALGORITHM: str = os.getenv("JWT_ALGORITHM", "HS256")
     JWT_ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("JWT_ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
     
+    # 无状态鉴权模式：令牌携带用户状态，鉴权不查询数据库，停用/删除用户通过吊销列表生效
+    AUTH_CLAIMS_MODE: bool = os.getenv("AUTH_CLAIMS_MODE", "False").lower() in ('true', '1', 't')
+    # 吊销列表从数据库同步的间隔（秒）与布隆过滤器的预计容量
+    AUTH_REVOCATION_SYNC_INTERVAL: float = float(os.getenv("AUTH_REVOCATION_SYNC_INTERVAL", "30"))
+    AUTH_REVOCATION_CAPACITY: int = int(os.getenv("AUTH_REVOCATION_CAPACITY", "100000"))
+    
+    # 鉴权缓存：用户状态与令牌校验结果的缓存时间（秒，0表示不缓存）及最大条目数
+    AUTH_USER_CACHE_TTL: float = float(os.getenv("AUTH_USER_CACHE_TTL", "60"))
+    AUTH_TOKEN_CACHE_TTL: float = float(os.getenv("AUTH_TOKEN_CACHE_TTL", "300"))
+    AUTH_CACHE_MAXSIZE: int = int(os.getenv("AUTH_CACHE_MAXSIZE", "10000"))
+    
+    # 密码哈希配置：bcrypt cost（每加1耗时翻倍）、哈希线程数与最多排队的哈希任务数
+    PASSWORD_BCRYPT_ROUNDS: int = int(os.getenv("PASSWORD_BCRYPT_ROUNDS", "12"))
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", "4"))
+    PASSWORD_HASH_MAX_PENDING: int = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
+    # 批量导入用户时的哈希线程数（与登录使用的线程池分开）
+    PASSWORD_BULK_HASH_WORKERS: int = int(os.getenv("PASSWORD_BULK_HASH_WORKERS", "2"))
+    
+    # 批量导入用户时每个事务插入的行数
+    USER_IMPORT_BATCH_SIZE: int = int(os.getenv("USER_IMPORT_BATCH_SIZE", "500"))
+    # 导入任务进度在共享存储中的保留时间（秒）
+    USER_IMPORT_JOB_TTL: int = int(os.getenv("USER_IMPORT_JOB_TTL", "86400"))
+    
     # 微信小程序配置
     WECHAT_MINI_APPID: str = os.getenv("WECHAT_MINI_APPID", "")
     WECHAT_MINI_SECRET: str = os.getenv("WECHAT_MINI_SECRET", "")
@@ -52,6 +109,35 @@ class Settings(BaseSettings):
     WECHAT_MP_SECRET: str = os.getenv("WECHAT_MP_SECRET", "")
     WECHAT_MP_TOKEN: str = os.getenv("WECHAT_MP_TOKEN", "")
     WECHAT_MP_AES_KEY: str = os.getenv("WECHAT_MP_AES_KEY", "")
+    # 等待Agent回答的时限（秒），时限内完成则直接被动回复，否则改用客服消息；0表示总是异步回复
+    WECHAT_MP_REPLY_TIMEOUT: float = float(os.getenv("WECHAT_MP_REPLY_TIMEOUT", "4.5"))
+    # 被动回复文本的最大字节数，超出时改用客服消息发送
+    WECHAT_MP_PASSIVE_REPLY_MAX_BYTES: int = int(os.getenv("WECHAT_MP_PASSIVE_REPLY_MAX_BYTES", "2048"))
+    # 是否通过客服消息接口发送异步回答，关闭后回答仅暂存，待用户下次发消息时领取
+    WECHAT_MP_CUSTOM_MESSAGE_ENABLED: bool = os.getenv("WECHAT_MP_CUSTOM_MESSAGE_ENABLED", "True").lower() in ('true', '1', 't')
+    # 客服消息发送队列：单条最大字节数、每秒发送数、突发数、并发数与临时错误重试次数
+    WECHAT_MP_CUSTOM_MESSAGE_MAX_BYTES: int = int(os.getenv("WECHAT_MP_CUSTOM_MESSAGE_MAX_BYTES", "2000"))
+    WECHAT_MP_SEND_RATE: float = float(os.getenv("WECHAT_MP_SEND_RATE", "20"))
+    WECHAT_MP_SEND_BURST: int = int(os.getenv("WECHAT_MP_SEND_BURST", "40"))
+    WECHAT_MP_SEND_CONCURRENCY: int = int(os.getenv("WECHAT_MP_SEND_CONCURRENCY", "10"))
+    WECHAT_MP_SEND_MAX_RETRIES: int = int(os.getenv("WECHAT_MP_SEND_MAX_RETRIES", "3"))
+    # 待领取回答的保留时间（秒）与进程内最多保留的用户数
+    WECHAT_MP_ANSWER_TTL: int = int(os.getenv("WECHAT_MP_ANSWER_TTL", "86400"))
+    WECHAT_MP_ANSWER_MAXSIZE: int = int(os.getenv("WECHAT_MP_ANSWER_MAXSIZE", "10000"))
+    # 回调消息去重记录的保留时间（秒）与进程内最大条目数
+    WECHAT_MP_DEDUP_TTL: int = int(os.getenv("WECHAT_MP_DEDUP_TTL", "60"))
+    WECHAT_MP_DEDUP_MAXSIZE: int = int(os.getenv("WECHAT_MP_DEDUP_MAXSIZE", "50000"))
+    # 默认公众号同时运行的Agent任务上限，0表示不单独限制（数据库中的账号按各自配置）
+    WECHAT_MP_MAX_CONCURRENCY: int = int(os.getenv("WECHAT_MP_MAX_CONCURRENCY", "0"))
+    # 关键词/菜单自动回复规则的热更新检查间隔（秒），0表示只在启动和管理接口修改时加载
+    WECHAT_MP_RULES_RELOAD_INTERVAL: float = float(os.getenv("WECHAT_MP_RULES_RELOAD_INTERVAL", "30"))
+    # 安全模式下超过该字节数的报文放到线程中加解密
+    WECHAT_MP_CRYPTO_THREAD_THRESHOLD: int = int(os.getenv("WECHAT_MP_CRYPTO_THREAD_THRESHOLD", "65536"))
+    # access_token距离过期多少秒时开始后台刷新
+    WECHAT_TOKEN_REFRESH_MARGIN: int = int(os.getenv("WECHAT_TOKEN_REFRESH_MARGIN", "300"))
+    
+    # 多账号配置在进程内的缓存时间（秒）
+    WECHAT_APP_CACHE_TTL: float = float(os.getenv("WECHAT_APP_CACHE_TTL", "60"))
     
     # 微信支付配置
     WECHAT_PAY_MCHID: str = os.getenv("WECHAT_PAY_MCHID", "")
@@ -64,7 +150,37 @@ class Settings(BaseSettings):
     OPENAI_MODEL: str = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
     OPENAI_API_BASE: Optional[str] = os.getenv("OPENAI_API_BASE")
     OPENAI_HTTP_PROXY: Optional[str] = os.getenv("OPENAI_HTTP_PROXY")
-    
+
+    # 共享HTTP客户端（连接池）配置
+    HTTP_CLIENT_HTTP2: bool = os.getenv("HTTP_CLIENT_HTTP2", "False").lower() in ('true', '1', 't')
+    HTTP_CLIENT_TIMEOUT: float = float(os.getenv("HTTP_CLIENT_TIMEOUT", "10"))
+    HTTP_CLIENT_CONNECT_TIMEOUT: float = float(os.getenv("HTTP_CLIENT_CONNECT_TIMEOUT", "5"))
+    HTTP_CLIENT_MAX_CONNECTIONS: int = int(os.getenv("HTTP_CLIENT_MAX_CONNECTIONS", "100"))
+    HTTP_CLIENT_MAX_KEEPALIVE: int = int(os.getenv("HTTP_CLIENT_MAX_KEEPALIVE", "20"))
+    HTTP_CLIENT_KEEPALIVE_EXPIRY: float = float(os.getenv("HTTP_CLIENT_KEEPALIVE_EXPIRY", "30"))
+
+    # 跨进程共享状态存储（SQLite文件路径），为空时各进程独立缓存
+    SHARED_STORE_PATH: str = os.getenv("SHARED_STORE_PATH", "")
+    # 定期清理共享存储中过期键的间隔（秒），0表示不清理
+    SHARED_STORE_PURGE_INTERVAL: float = float(os.getenv("SHARED_STORE_PURGE_INTERVAL", "300"))
+
+    # Agent任务配置
+    # inline: 在Web进程内直接运行Agent; queue: Web进程只入队，由独立Worker进程处理
+    AGENT_WORKER_MODE: str = os.getenv("AGENT_WORKER_MODE", "inline")
+    AGENT_QUEUE_PATH: str = os.getenv("AGENT_QUEUE_PATH", "./agent_queue.db")
+    AGENT_WORKER_CONCURRENCY: int = int(os.getenv("AGENT_WORKER_CONCURRENCY", "4"))
+    AGENT_QUEUE_POLL_INTERVAL: float = float(os.getenv("AGENT_QUEUE_POLL_INTERVAL", "0.5"))
+    AGENT_JOB_VISIBILITY_TIMEOUT: int = int(os.getenv("AGENT_JOB_VISIBILITY_TIMEOUT", "600"))
+    AGENT_JOB_MAX_ATTEMPTS: int = int(os.getenv("AGENT_JOB_MAX_ATTEMPTS", "3"))
+    # 已结束任务的保留时间（秒，0表示不清理）及Worker清理的间隔（秒）
+    AGENT_JOB_RETENTION: int = int(os.getenv("AGENT_JOB_RETENTION", "86400"))
+    AGENT_JOB_PURGE_INTERVAL: int = int(os.getenv("AGENT_JOB_PURGE_INTERVAL", "3600"))
+    # Agent公平调度：全局并发、单用户并发与排队上限
+    AGENT_MAX_CONCURRENCY: int = int(os.getenv("AGENT_MAX_CONCURRENCY", "8"))
+    AGENT_MAX_INFLIGHT_PER_USER: int = int(os.getenv("AGENT_MAX_INFLIGHT_PER_USER", "1"))
+    AGENT_MAX_QUEUED_PER_USER: int = int(os.getenv("AGENT_MAX_QUEUED_PER_USER", "20"))
+    AGENT_SCHEDULER_QUANTUM: int = int(os.getenv("AGENT_SCHEDULER_QUANTUM", "1"))
+
     class Config:
         case_sensitive = True
         env_file = ".env"
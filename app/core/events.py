@@ -2,9 +2,15 @@ import logging
 from typing import Callable
 from fastapi import FastAPI
 
-from app.db.session import engine
+from app.core.config import settings
+from app.core.token_revocation import token_revocations
+from app.db.session import engine, replicas
 from app.db.base import Base
+from app.services.user_transfer import user_importer
+from app.services.wechat_rules import rule_engine
+from app.utils.http_client import http_client
 from app.utils.logger import get_logger
+from app.utils.shared_store import shared_store
 
 logger = get_logger("db")
 
@@ -25,6 +31,23 @@ def startup_event_handler(app: FastAPI) -> Callable:
         except Exception as e:
             logger.error(f"数据库初始化失败: {str(e)}")
         
+        # 检查只读副本的复制延迟并定期复查
+        await replicas.start()
+        
+        # 创建共享HTTP客户端
+        http_client.get_client()
+        
+        # 加载公众号自动回复规则并启动热更新
+        await rule_engine.start()
+        
+        # 无状态鉴权模式下加载令牌吊销列表并定期同步
+        if settings.AUTH_CLAIMS_MODE:
+            await token_revocations.start()
+        
+        # 定期清理共享存储中过期的键
+        if shared_store:
+            await shared_store.start()
+        
         get_logger("app").info("应用程序启动完成")
     
     return startup
@@ -35,6 +58,15 @@ def shutdown_event_handler(app: FastAPI) -> Callable:
     应用程序关闭事件处理
     """
     async def shutdown() -> None:
+        await rule_engine.stop()
+        await token_revocations.stop()
+        await user_importer.stop()
+        await replicas.stop()
+        if shared_store:
+            await shared_store.stop()
+        
+        # 关闭共享HTTP客户端的连接池
+        await http_client.close()
         get_logger("app").info("应用程序关闭")
     
     return shutdown
\ No newline at end of file
@@ -1,19 +1,49 @@
 from datetime import datetime, timedelta
-from typing import Any, Union, Optional
+from typing import Any, Callable, List, Union, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import functools
 
 from passlib.context import CryptContext
 from jose import jwt
 
 from app.core.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# 固定bcrypt的cost，cost调整后旧哈希在下次登录时自动按新cost重新生成
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.PASSWORD_BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.PASSWORD_BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.PASSWORD_BCRYPT_ROUNDS,
+)
+
+# bcrypt计算时会释放GIL，放到专用线程池中执行，线程数即同时进行的哈希计算上限
+_hash_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash"
+)
+_hash_pending = 0
+# 批量导入用户时使用独立的线程池，避免占满登录请求的哈希线程
+_bulk_hash_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_BULK_HASH_WORKERS, thread_name_prefix="password-bulk-hash"
+)
+
+
+class PasswordHashBusyError(Exception):
+    """
+    等待中的密码哈希任务过多
+    """
+    pass
 
 
 def create_access_token(
-    subject: Union[str, Any], expires_delta: Optional[timedelta] = None
+    subject: Union[str, Any], expires_delta: Optional[timedelta] = None, user: Any = None
 ) -> str:
     """
     创建JWT访问令牌
+
+    传入user时令牌携带用户当前的令牌版本，用于判断令牌是否已被吊销；
+    无状态鉴权模式下同时携带is_active和is_superuser，校验令牌时不再查询数据库。
     """
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
@@ -23,6 +53,10 @@ def create_access_token(
         )
     
     to_encode = {"exp": expire, "sub": str(subject)}
+    if user is not None:
+        to_encode["ver"] = user.token_version or 0
+        if settings.AUTH_CLAIMS_MODE:
+            to_encode.update(act=bool(user.is_active), su=bool(user.is_superuser))
     encoded_jwt = jwt.encode(
         to_encode, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM
     )
@@ -30,10 +64,12 @@ def create_access_token(
     return encoded_jwt
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
+def verify_password(plain_password: str, hashed_password: Optional[str]) -> bool:
     """
-    验证密码
+    验证密码，没有设置密码的账号（如仅通过微信登录）一律验证失败
     """
+    if not hashed_password:
+        return False
     return pwd_context.verify(plain_password, hashed_password)
 
 
@@ -41,4 +77,60 @@ def get_password_hash(password: str) -> str:
     """
     获取密码哈希值
     """
-    return pwd_context.hash(password) 
\ No newline at end of file
+    return pwd_context.hash(password)
+
+
+async def _run_hash_job(func: Callable[..., Any], *args: Any) -> Any:
+    """
+    在密码哈希线程池中执行，排队任务超过上限时直接拒绝，避免登录洪峰拖垮其他请求
+    """
+    global _hash_pending
+    if _hash_pending >= settings.PASSWORD_HASH_MAX_PENDING:
+        raise PasswordHashBusyError("密码校验请求过多，请稍后重试")
+    
+    _hash_pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_hash_executor, functools.partial(func, *args))
+    finally:
+        _hash_pending -= 1
+
+
+async def verify_password_async(plain_password: str, hashed_password: Optional[str]) -> bool:
+    """
+    在线程池中验证密码
+    """
+    if not hashed_password:
+        return False
+    return await _run_hash_job(pwd_context.verify, plain_password, hashed_password)
+
+
+async def verify_and_update_password(
+    plain_password: str, hashed_password: Optional[str]
+) -> Tuple[bool, Optional[str]]:
+    """
+    在线程池中验证密码，哈希的cost与当前配置不一致时同时生成新哈希
+
+    Returns:
+        (是否验证通过, 需要保存的新哈希或None)
+    """
+    if not hashed_password:
+        return False, None
+    return await _run_hash_job(pwd_context.verify_and_update, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """
+    在线程池中计算密码哈希
+    """
+    return await _run_hash_job(pwd_context.hash, password)
+
+
+async def get_password_hashes_async(passwords: List[str]) -> List[str]:
+    """
+    在批量哈希线程池中计算一批密码哈希，不受登录排队上限的限制
+    """
+    loop = asyncio.get_running_loop()
+    return list(await asyncio.gather(
+        *(loop.run_in_executor(_bulk_hash_executor, pwd_context.hash, password) for password in passwords)
+    ))
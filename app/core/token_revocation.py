@@ -0,0 +1,153 @@
+from typing import Dict, Any, Optional
+from datetime import datetime, timedelta
+import asyncio
+import time
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.token_revocation import TokenRevocation
+from app.models.user import User
+from app.utils.bloom import BloomFilter
+from app.utils.logger import get_logger
+
+logger = get_logger("app")
+
+# 删除用户时吊销其全部令牌
+_ALL_VERSIONS = 2 ** 31 - 1
+
+
+class TokenRevocationList:
+    """
+    无状态鉴权模式下的令牌吊销列表
+
+    吊销记录保存在数据库中，每个进程在内存里维护一份副本并定期同步：
+    布隆过滤器判定用户没有吊销记录时直接放行（绝大多数请求），
+    可能有记录时再查精确表比较令牌版本。本进程内的吊销立即生效，其他进程在下次同步后生效。
+    """
+
+    def __init__(self, sync_interval: float = 30, capacity: int = 100000):
+        self.sync_interval = sync_interval
+        self.capacity = capacity
+        self._filter = BloomFilter(capacity)
+        self._min_versions: Dict[int, int] = {}
+        self._sync_task: Optional[asyncio.Task] = None
+        self.synced_at: Optional[float] = None
+
+    def is_revoked(self, user_id: int, version: int) -> bool:
+        """
+        判断令牌是否已被吊销
+        """
+        if user_id not in self._filter:
+            return False
+        min_version = self._min_versions.get(user_id)
+        return min_version is not None and version < min_version
+
+    def _apply(self, user_id: int, min_version: int):
+        if self._min_versions.get(user_id, -1) < min_version:
+            self._min_versions[user_id] = min_version
+            self._filter.add(user_id)
+
+    async def revoke(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        deleted: bool = False,
+        min_version: Optional[int] = None,
+    ):
+        """
+        吊销用户已签发的令牌，由调用方提交事务
+
+        Args:
+            db: 数据库会话
+            user_id: 用户ID
+            deleted: 用户是否被删除，删除时吊销该用户的全部令牌
+            min_version: 调用方已经递增过令牌版本时传入新的版本号，不再单独递增
+        """
+        if deleted:
+            min_version = _ALL_VERSIONS
+        elif min_version is None:
+            await db.execute(
+                update(User).where(User.id == user_id).values(token_version=User.token_version + 1)
+            )
+            result = await db.execute(select(User.token_version).where(User.id == user_id))
+            min_version = result.scalar_one()
+
+        # 吊销之前签发的令牌最迟在一个有效期后全部过期，之后记录即可清理
+        expires_at = datetime.now() + timedelta(minutes=settings.JWT_ACCESS_TOKEN_EXPIRE_MINUTES)
+        record = await db.get(TokenRevocation, user_id)
+        if record is None:
+            db.add(TokenRevocation(user_id=user_id, min_version=min_version, expires_at=expires_at))
+        else:
+            record.min_version = max(record.min_version, min_version)
+            record.expires_at = expires_at
+
+        # 提交失败时本进程多吊销了令牌，下次同步会按数据库纠正
+        self._apply(user_id, min_version)
+
+    async def sync(self):
+        """
+        从数据库重建吊销列表，并清理已无意义的过期记录
+        """
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(TokenRevocation).where(TokenRevocation.expires_at <= datetime.now()))
+            await db.commit()
+            result = await db.execute(select(TokenRevocation.user_id, TokenRevocation.min_version))
+            rows = result.all()
+
+        bloom = BloomFilter(max(self.capacity, len(rows)))
+        min_versions = {}
+        for user_id, min_version in rows:
+            bloom.add(user_id)
+            min_versions[user_id] = min_version
+        self._filter, self._min_versions = bloom, min_versions
+        self.synced_at = time.time()
+
+    async def _sync_loop(self):
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                await self.sync()
+            except Exception as e:
+                logger.error(f"同步令牌吊销列表失败: {str(e)}")
+
+    async def start(self):
+        """
+        加载吊销列表并启动后台同步任务
+        """
+        try:
+            await self.sync()
+        except Exception as e:
+            logger.error(f"加载令牌吊销列表失败: {str(e)}")
+        if self.sync_interval > 0 and self._sync_task is None:
+            self._sync_task = asyncio.create_task(self._sync_loop())
+
+    async def stop(self):
+        """
+        停止后台同步任务
+        """
+        if self._sync_task is not None:
+            self._sync_task.cancel()
+            try:
+                await self._sync_task
+            except asyncio.CancelledError:
+                pass
+            self._sync_task = None
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        吊销列表规模
+        """
+        return {
+            "revoked_users": len(self._min_versions),
+            "filter_bits": self._filter.size,
+            "synced_at": self.synced_at,
+        }
+
+
+token_revocations = TokenRevocationList(
+    sync_interval=settings.AUTH_REVOCATION_SYNC_INTERVAL,
+    capacity=settings.AUTH_REVOCATION_CAPACITY,
+)
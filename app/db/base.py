@@ -1,7 +1,27 @@
-from typing import Any
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+from operator import attrgetter
+from sqlalchemy import inspect
 from sqlalchemy.ext.declarative import as_declarative, declared_attr
 import re
 
+# (模型类, 字段) -> 序列化函数
+_serializers: Dict[Tuple[type, Optional[Tuple[str, ...]]], Callable[[Any], dict]] = {}
+
+
+def _build_serializer(cls: type, fields: Optional[Tuple[str, ...]]) -> Callable[[Any], dict]:
+    if fields is None:
+        props = inspect(cls).column_attrs
+        attrs = [prop.key for prop in props]
+        names = [prop.columns[0].name for prop in props]
+    else:
+        attrs = names = list(fields)
+    if len(attrs) == 1:
+        getter = attrgetter(attrs[0])
+        name = names[0]
+        return lambda obj: {name: getter(obj)}
+    getter = attrgetter(*attrs)
+    return lambda obj: dict(zip(names, getter(obj)))
+
 
 @as_declarative()
 class Base:
@@ -17,19 +37,35 @@ class Base:
         s1 = re.sub('(.)([A-Z][a-z]+)', r'\1_\2', cls.__name__)
         return re.sub('([a-z0-9])([A-Z])', r'\1_\2', s1).lower()
     
+    @classmethod
+    def serializer(cls, fields: Optional[Iterable[str]] = None) -> Callable[[Any], dict]:
+        """
+        获取模型的序列化函数，按模型和字段生成一次后缓存
+        
+        fields为None时输出全部列（键为列名）；传入字段名时只输出这些属性，顺序与传入一致，
+        可直接传入Pydantic返回模型的model_fields，跳过逐行的模型校验。
+        """
+        key = (cls, None if fields is None else tuple(fields))
+        func = _serializers.get(key)
+        if func is None:
+            func = _serializers[key] = _build_serializer(cls, key[1])
+        return func
+    
     # 通用的字符串表示
     def __repr__(self) -> str:
-        attrs = []
-        for c in self.__table__.columns:
-            try:
-                attrs.append(f"{c.name}={getattr(self, c.name)}")
-            except Exception:
-                attrs.append(f"{c.name}=None")
+        try:
+            values = self.serializer()(self)
+        except Exception:
+            # 已过期且脱离会话的实例无法读取属性
+            values = {}
+            for c in self.__table__.columns:
+                try:
+                    values[c.name] = getattr(self, c.name)
+                except Exception:
+                    values[c.name] = None
+        attrs = [f"{name}={value}" for name, value in values.items()]
         return f"<{self.__class__.__name__} {', '.join(attrs)}>"
     
     # 通用的字典转换
     def to_dict(self) -> dict:
-        result = {}
-        for c in self.__table__.columns:
-            result[c.name] = getattr(self, c.name)
-        return result 
\ No newline at end of file
+        return self.serializer()(self) 
\ No newline at end of file
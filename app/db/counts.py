@@ -0,0 +1,41 @@
+from typing import Any
+import json
+
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+
+from app.core.config import settings
+from app.utils.ttl_cache import TTLCache
+
+# 非PostgreSQL数据库没有可用的行数估计，精确计数结果按查询缓存一段时间
+_count_cache = TTLCache(maxsize=1000, ttl=settings.DB_COUNT_CACHE_TTL or 1)
+
+
+async def approximate_count(db: AsyncSession, stmt: Select) -> int:
+    """
+    估算查询结果的行数，避免在大表上执行COUNT(*)
+
+    PostgreSQL下读取查询计划的行数估计（来自planner统计信息，ANALYZE后较准确）；
+    其他数据库执行一次COUNT(*)并缓存DB_COUNT_CACHE_TTL秒。
+
+    Args:
+        db: 数据库会话
+        stmt: 不带排序和分页的查询
+    """
+    if db.bind.dialect.name == "postgresql":
+        compiled = stmt.compile(dialect=db.bind.dialect, compile_kwargs={"literal_binds": True})
+        plan = (await db.execute(text(f"EXPLAIN (FORMAT JSON) {compiled}"))).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+    count_stmt = select(func.count()).select_from(stmt.subquery())
+    compiled = count_stmt.compile(dialect=db.bind.dialect)
+    key: Any = (str(compiled), tuple(sorted((k, str(v)) for k, v in compiled.params.items())))
+    count = _count_cache.get(key) if settings.DB_COUNT_CACHE_TTL > 0 else None
+    if count is None:
+        count = (await db.execute(count_stmt)).scalar_one()
+        if settings.DB_COUNT_CACHE_TTL > 0:
+            _count_cache.set(key, count)
+    return count
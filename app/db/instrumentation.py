@@ -0,0 +1,208 @@
+from typing import Dict, Any, List, Optional
+from collections import Counter
+from contextvars import ContextVar
+from functools import lru_cache
+import re
+import time
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.config import settings
+from app.utils.logger import get_logger
+
+logger = get_logger("db")
+
+# 最多统计的语句指纹数，超过后新指纹不再单独统计
+_MAX_FINGERPRINTS = 500
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"(?<![\w.$:])-?\d+(?:\.\d+)?\b")
+_PARAM_RE = re.compile(r"\$\d+|%\(\w+\)s|:\w+|\?")
+_IN_LIST_RE = re.compile(r"(\bIN\s*)\(\s*\?(?:\s*,\s*\?)*\s*\)", re.I)
+_VALUES_RE = re.compile(r"(VALUES\s*)(\(\s*\?(?:\s*,\s*\?)*\s*\))(?:\s*,\s*\(\s*\?(?:\s*,\s*\?)*\s*\))+", re.I)
+_SPACE_RE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(statement: str) -> str:
+    """
+    生成SQL语句指纹：字面量和参数占位符统一为?，IN列表和多行VALUES折叠，空白压缩
+
+    只是参数不同的语句得到相同的指纹。SQLAlchemy会缓存编译后的语句，同一语句文本反复出现，
+    因此结果按语句文本缓存。
+    """
+    sql = _STRING_RE.sub("?", statement)
+    sql = _NUMBER_RE.sub("?", sql)
+    sql = _PARAM_RE.sub("?", sql)
+    sql = _VALUES_RE.sub(r"\1\2", sql)
+    sql = _IN_LIST_RE.sub(r"\1(...)", sql)
+    return _SPACE_RE.sub(" ", sql).strip()
+
+
+class QueryStats:
+    """
+    一个请求内的数据库查询统计
+    """
+
+    __slots__ = ("path", "count", "total_time", "fingerprints", "warned")
+
+    def __init__(self, path: str = ""):
+        self.path = path
+        self.count = 0
+        self.total_time = 0.0
+        self.fingerprints: Counter = Counter()
+        self.warned = False
+
+
+_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("db_query_stats", default=None)
+
+
+class QueryMetrics:
+    """
+    全局的语句耗时统计，按指纹汇总次数、总耗时与最大耗时
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.slow = 0
+        self._by_fingerprint: Dict[str, List[float]] = {}
+
+    def record(self, key: str, elapsed: float, slow: bool):
+        self.count += 1
+        self.total_time += elapsed
+        if slow:
+            self.slow += 1
+        item = self._by_fingerprint.get(key)
+        if item is None:
+            if len(self._by_fingerprint) >= _MAX_FINGERPRINTS:
+                return
+            item = self._by_fingerprint[key] = [0, 0.0, 0.0]
+        item[0] += 1
+        item[1] += elapsed
+        item[2] = max(item[2], elapsed)
+
+    def stats(self, top: int = 20) -> Dict[str, Any]:
+        """
+        获取总体统计和总耗时最多的语句
+        """
+        ranked = sorted(self._by_fingerprint.items(), key=lambda kv: kv[1][1], reverse=True)[:top]
+        return {
+            "queries": self.count,
+            "total_ms": round(self.total_time * 1000, 3),
+            "slow_queries": self.slow,
+            "top": [
+                {
+                    "fingerprint": key,
+                    "count": count,
+                    "total_ms": round(total * 1000, 3),
+                    "avg_ms": round(total / count * 1000, 3),
+                    "max_ms": round(slowest * 1000, 3),
+                }
+                for key, (count, total, slowest) in ranked
+            ],
+        }
+
+
+query_metrics = QueryMetrics()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append((id(cursor), time.perf_counter()))
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("query_start")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()[1]
+    key = fingerprint(statement)
+    slow = settings.DB_SLOW_QUERY_MS > 0 and elapsed * 1000 >= settings.DB_SLOW_QUERY_MS
+    query_metrics.record(key, elapsed, slow)
+
+    stats = _query_stats.get()
+    if slow:
+        where = f" ({stats.path})" if stats is not None and stats.path else ""
+        logger.warning(f"慢查询 {elapsed * 1000:.1f}ms{where}: {key}")
+    if stats is None:
+        return
+    stats.count += 1
+    stats.total_time += elapsed
+    stats.fingerprints[key] += 1
+
+    # 同一请求中同一语句反复执行，通常是循环里逐条查询（N+1）
+    threshold = settings.DB_REPEATED_QUERY_THRESHOLD
+    if threshold > 0 and not stats.warned and stats.fingerprints[key] >= threshold:
+        stats.warned = True
+        logger.warning(f"同一语句在一个请求中执行了{threshold}次，可能存在N+1查询 ({stats.path}): {key}")
+
+
+def _handle_error(context):
+    """
+    语句执行失败时不会触发after_cursor_execute，丢弃其开始时间
+
+    conn.info随连接池中的连接一直存在，不丢弃的话每次失败都会留下一项，之后的语句耗时也会错位。
+    断开的连接会被丢弃，不需要处理。
+    """
+    conn = context.connection
+    cursor = getattr(context.execution_context, "cursor", None)
+    if conn is None or cursor is None or context.is_disconnect:
+        return
+    starts = conn.info.get("query_start")
+    if starts and starts[-1][0] == id(cursor):
+        starts.pop()
+
+
+def instrument_engine(engine: AsyncEngine):
+    """
+    为引擎挂载语句计时钩子
+    """
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine.sync_engine, "handle_error", _handle_error)
+
+
+def begin_request(path: str = "") -> QueryStats:
+    """
+    开始统计当前请求（当前上下文）的查询
+    """
+    stats = QueryStats(path)
+    _query_stats.set(stats)
+    return stats
+
+
+class QueryStatsMiddleware:
+    """
+    统计每个请求的查询次数和数据库耗时（用于N+1检测），headers为True时写入
+    X-DB-Queries和X-DB-Time-Ms响应头
+
+    流式响应在响应头发出之后执行的查询不计入响应头，但仍计入全局统计。
+    """
+
+    def __init__(self, app, headers: bool = True):
+        self.app = app
+        self.headers = headers
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = begin_request(scope.get("path", ""))
+        if not self.headers:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_stats(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-db-queries", str(stats.count).encode("latin-1")))
+                headers.append((b"x-db-time-ms", f"{stats.total_time * 1000:.1f}".encode("latin-1")))
+                message = dict(message, headers=headers)
+            await send(message)
+
+        await self.app(scope, receive, send_with_stats)
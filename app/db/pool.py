@@ -0,0 +1,88 @@
+from typing import Dict, Any, Optional
+import logging
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+
+class PoolMetrics:
+    """
+    连接池使用统计
+
+    记录借出次数、等待空闲连接的耗时、超时次数与新建连接数，用于判断连接池是否过小。
+    连接池失效重建后仍然累计到同一份统计中。
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.checked_out = 0
+        self.checked_out_peak = 0
+
+    def record_checkout(self, waited: float):
+        self.checkouts += 1
+        self.wait_total += waited
+        self.wait_max = max(self.wait_max, waited)
+        self.checked_out += 1
+        self.checked_out_peak = max(self.checked_out_peak, self.checked_out)
+
+    def record_checkin(self):
+        self.checkins += 1
+        self.checked_out = max(self.checked_out - 1, 0)
+
+    def stats(self, pool: Optional[Any] = None) -> Dict[str, Any]:
+        """
+        获取连接池统计，传入连接池时附带其当前状态
+        """
+        result = {
+            "checkouts": self.checkouts,
+            "checkins": self.checkins,
+            "connects": self.connects,
+            "timeouts": self.timeouts,
+            "checked_out": self.checked_out,
+            "checked_out_peak": self.checked_out_peak,
+            "wait_avg_ms": round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+            "wait_max_ms": round(self.wait_max * 1000, 3),
+        }
+        if pool is not None:
+            result["pool"] = pool.status()
+        return result
+
+
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    """
+    记录借出等待时间的异步连接池
+    """
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            pool_metrics.timeouts += 1
+            raise
+        pool_metrics.record_checkout(time.perf_counter() - start)
+        return conn
+
+    def _do_return_conn(self, record):
+        pool_metrics.record_checkin()
+        super()._do_return_conn(record)
+
+    def _create_connection(self):
+        pool_metrics.connects += 1
+        return super()._create_connection()
+
+
+# SQLAlchemy按连接池类所在的模块命名日志记录器，避免连接池的INFO日志混入应用日志
+logging.getLogger(f"{__name__}.{InstrumentedAsyncPool.__name__}").setLevel(logging.WARNING)
@@ -0,0 +1,129 @@
+from typing import Dict, Any, List, Optional
+import asyncio
+import time
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.utils.logger import get_logger
+
+logger = get_logger("db")
+
+# 备库已回放完收到的全部WAL时视为无延迟，否则按最后回放事务的时间估算延迟
+_PG_LAG_SQL = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+class ReplicaSet:
+    """
+    只读副本集合
+
+    后台定期检查每个副本的复制延迟，只有可连接且延迟不超过上限的副本参与只读查询的轮询分配；
+    没有可用副本（或尚未完成首次检查）时只读查询回退到主库。
+    """
+
+    def __init__(self, engines: List[AsyncEngine], max_lag: float = 5, check_interval: float = 10):
+        """
+        初始化副本集合
+
+        Args:
+            engines: 副本的异步引擎
+            max_lag: 允许的最大复制延迟（秒）
+            check_interval: 检查复制延迟的间隔（秒）
+        """
+        self.engines = list(engines)
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self._lags: Dict[int, Optional[float]] = {}
+        self._available: List[AsyncEngine] = []
+        self._next = 0
+        self._check_task: Optional[asyncio.Task] = None
+        self.checked_at: Optional[float] = None
+
+    def choose(self) -> Optional[AsyncEngine]:
+        """
+        轮询选择一个可用副本，没有可用副本时返回None
+        """
+        available = self._available
+        if not available:
+            return None
+        self._next = (self._next + 1) % len(available)
+        return available[self._next]
+
+    async def _measure(self, engine: AsyncEngine) -> float:
+        async with engine.connect() as conn:
+            if engine.dialect.name == "postgresql":
+                return float((await conn.execute(_PG_LAG_SQL)).scalar() or 0)
+            await conn.execute(text("SELECT 1"))
+            return 0.0
+
+    async def check(self):
+        """
+        检查所有副本的复制延迟并更新可用副本列表
+        """
+        available = []
+        for index, engine in enumerate(self.engines):
+            try:
+                lag = await asyncio.wait_for(self._measure(engine), timeout=max(self.check_interval, 1))
+            except Exception as e:
+                lag = None
+                logger.warning(f"只读副本 {engine.url.host or index} 不可用: {str(e)}")
+            if lag is not None and lag > self.max_lag:
+                logger.warning(f"只读副本 {engine.url.host or index} 复制延迟 {lag:.1f} 秒，暂停使用")
+            self._lags[index] = lag
+            if lag is not None and lag <= self.max_lag:
+                available.append(engine)
+        self._available = available
+        self.checked_at = time.time()
+
+    async def _check_loop(self):
+        while True:
+            await asyncio.sleep(self.check_interval)
+            try:
+                await self.check()
+            except Exception as e:
+                logger.error(f"检查只读副本失败: {str(e)}")
+
+    async def start(self):
+        """
+        完成首次检查并启动后台检查任务
+        """
+        if not self.engines:
+            return
+        await self.check()
+        if self.check_interval > 0 and self._check_task is None:
+            self._check_task = asyncio.create_task(self._check_loop())
+
+    async def stop(self):
+        """
+        停止后台检查任务并关闭副本连接池
+        """
+        if self._check_task is not None:
+            self._check_task.cancel()
+            try:
+                await self._check_task
+            except asyncio.CancelledError:
+                pass
+            self._check_task = None
+        self._available = []
+        for engine in self.engines:
+            await engine.dispose()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        各副本的复制延迟与可用状态
+        """
+        return {
+            "replicas": [
+                {
+                    "host": engine.url.host or engine.url.database,
+                    "lag": self._lags.get(index),
+                    "available": engine in self._available,
+                }
+                for index, engine in enumerate(self.engines)
+            ],
+            "max_lag": self.max_lag,
+            "checked_at": self.checked_at,
+        }
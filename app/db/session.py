@@ -1,34 +1,171 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker
+from typing import Dict, Any, Optional
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.sql.dml import UpdateBase
 
 from app.core.config import settings
+from app.db.instrumentation import instrument_engine, query_metrics
+from app.db.pool import InstrumentedAsyncPool, pool_metrics
+from app.db.replicas import ReplicaSet
 
-# 创建异步引擎
-# 对SQLite使用aiosqlite驱动
-if settings.DATABASE_URL.startswith("sqlite"):
-    engine = create_async_engine(
-        settings.DATABASE_URL.replace("sqlite:///", "sqlite+aiosqlite:///"),
-        echo=settings.DEBUG,
-        future=True,
-    )
-else:
-    # 对PostgreSQL使用asyncpg驱动
-    engine = create_async_engine(
-        settings.DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://") if settings.DATABASE_URL.startswith("postgresql://") else settings.DATABASE_URL,
-        echo=settings.DEBUG,
-        future=True,
+_SQLITE_JOURNAL_MODES = {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"}
+_SQLITE_SYNCHRONOUS = {"OFF", "NORMAL", "FULL", "EXTRA"}
+
+
+def _database_url(url: str) -> str:
+    """
+    为数据库URL选择异步驱动：SQLite使用aiosqlite，PostgreSQL使用asyncpg
+    """
+    if url.startswith("sqlite:///"):
+        return url.replace("sqlite:///", "sqlite+aiosqlite:///")
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+asyncpg://")
+    return url
+
+
+def _engine_options(url: str) -> Dict[str, Any]:
+    """
+    根据配置生成引擎参数，内存SQLite保持SQLAlchemy默认的单连接池
+    """
+    options: Dict[str, Any] = {"echo": settings.DB_ECHO, "future": True}
+    if url.startswith("sqlite") and (":memory:" in url or url.endswith("://")):
+        return options
+    options.update(
+        poolclass=InstrumentedAsyncPool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
     )
+    return options
+
+
+def sqlite_pragmas() -> Dict[str, Any]:
+    """
+    每个SQLite连接建立时设置的PRAGMA
+
+    WAL模式下读写互不阻塞，synchronous=NORMAL在WAL下只在检查点时fsync；
+    busy_timeout让并发写入等待锁而不是立即报database is locked。
+    """
+    journal_mode = settings.SQLITE_JOURNAL_MODE.upper()
+    synchronous = settings.SQLITE_SYNCHRONOUS.upper()
+    if journal_mode not in _SQLITE_JOURNAL_MODES:
+        raise ValueError(f"不支持的SQLITE_JOURNAL_MODE: {settings.SQLITE_JOURNAL_MODE}")
+    if synchronous not in _SQLITE_SYNCHRONOUS:
+        raise ValueError(f"不支持的SQLITE_SYNCHRONOUS: {settings.SQLITE_SYNCHRONOUS}")
+    return {
+        "journal_mode": journal_mode,
+        "synchronous": synchronous,
+        "busy_timeout": int(settings.SQLITE_BUSY_TIMEOUT),
+        "mmap_size": int(settings.SQLITE_MMAP_SIZE),
+        "cache_size": int(settings.SQLITE_CACHE_SIZE),
+    }
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in sqlite_pragmas().items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+def _create_engine(url: str) -> AsyncEngine:
+    url = _database_url(url)
+    async_engine = create_async_engine(url, **_engine_options(url))
+    if async_engine.dialect.name == "sqlite":
+        event.listen(async_engine.sync_engine, "connect", _set_sqlite_pragmas)
+    instrument_engine(async_engine)
+    return async_engine
+
+
+# 创建异步引擎（主库）与只读副本
+engine = _create_engine(settings.DATABASE_URL)
+replicas = ReplicaSet(
+    [_create_engine(url.strip()) for url in settings.DATABASE_REPLICA_URLS.split(",") if url.strip()],
+    max_lag=settings.DB_REPLICA_MAX_LAG,
+    check_interval=settings.DB_REPLICA_CHECK_INTERVAL,
+)
+
+# 当前请求是否已经在主库上写入过，写入后同一请求的只读查询也走主库（读己之写）
+_primary_written: ContextVar[bool] = ContextVar("db_primary_written", default=False)
+
+
+class RoutingSession(Session):
+    """
+    按语句路由的会话
+
+    写入（flush或INSERT/UPDATE/DELETE语句）总是走主库；只读会话的查询分配到一个可用副本，
+    同一会话固定使用同一个副本。
+    """
+
+    _replica: Optional[AsyncEngine] = None
+
+    @property
+    def uses_replica(self) -> bool:
+        """
+        只读查询当前是否由副本执行
+        """
+        return self._replica is not None and not _primary_written.get()
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self._flushing or isinstance(clause, UpdateBase):
+            _primary_written.set(True)
+            return engine.sync_engine
+        if self.info.get("read_only") and not _primary_written.get():
+            if self._replica is None:
+                self._replica = replicas.choose()
+            if self._replica is not None:
+                return self._replica.sync_engine
+        return engine.sync_engine
+
 
 # 创建异步会话工厂
 AsyncSessionLocal = sessionmaker(
     engine,
     class_=AsyncSession,
+    sync_session_class=RoutingSession,
+    expire_on_commit=False,
+    autocommit=False,
+    autoflush=False,
+)
+
+# 只读会话工厂，没有可用副本时回退到主库
+AsyncReadSessionLocal = sessionmaker(
+    engine,
+    class_=AsyncSession,
+    sync_session_class=RoutingSession,
     expire_on_commit=False,
     autocommit=False,
     autoflush=False,
+    info={"read_only": True},
 )
 
 
+def reads_from_replica(db: AsyncSession) -> bool:
+    """
+    会话读到的数据是否来自只读副本（可能落后于主库）
+    """
+    sync_session = getattr(db, "sync_session", None)
+    return isinstance(sync_session, RoutingSession) and sync_session.uses_replica
+
+
+def pool_stats() -> Dict[str, Any]:
+    """
+    获取数据库连接池统计（主库与副本的借出统计合并计算）及语句耗时统计
+    """
+    result = pool_metrics.stats(engine.pool)
+    result["dialect"] = engine.dialect.name
+    result["replicas"] = replicas.stats()
+    result["queries"] = query_metrics.stats()
+    return result
+
+
 async def get_db() -> AsyncSession:
     """
     获取数据库会话依赖
@@ -37,4 +174,18 @@ async def get_db() -> AsyncSession:
         try:
             yield session
         finally:
-            await session.close() 
\ No newline at end of file
+            await session.close()
+
+
+async def get_read_db() -> AsyncSession:
+    """
+    获取只读数据库会话依赖，查询分配到只读副本
+
+    副本数据可能有不超过DB_REPLICA_MAX_LAG秒的延迟，只用于不要求读到最新写入的查询；
+    同一请求中已经写入过主库时自动改用主库。
+    """
+    async with AsyncReadSessionLocal() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
@@ -1,9 +1,13 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse
 
 from app.core.config import settings
 from app.api.v1.router import api_router
 from app.core.events import startup_event_handler, shutdown_event_handler
+from app.core.security import PasswordHashBusyError
+from app.db.instrumentation import QueryStatsMiddleware
+from app.utils.logger import RequestContextMiddleware
 
 
 def create_application() -> FastAPI:
@@ -17,6 +21,8 @@ def create_application() -> FastAPI:
         docs_url="/docs" if settings.DEBUG else None,
         redoc_url="/redoc" if settings.DEBUG else None,
         openapi_url="/openapi.json" if settings.DEBUG else None,
+        # 用orjson编码响应，比标准库json快数倍且原生支持datetime
+        default_response_class=ORJSONResponse,
     )
 
     # 设置CORS
@@ -29,10 +35,26 @@ def create_application() -> FastAPI:
             allow_headers=["*"],
         )
 
+    # 统计每个请求的查询次数和数据库耗时
+    if settings.DB_QUERY_STATS_HEADERS or settings.DB_REPEATED_QUERY_THRESHOLD > 0:
+        application.add_middleware(QueryStatsMiddleware, headers=settings.DB_QUERY_STATS_HEADERS)
+
+    # 为日志记录请求ID和链路追踪ID（最后添加，位于最外层）
+    application.add_middleware(RequestContextMiddleware)
+
     # 添加事件处理
     application.add_event_handler("startup", startup_event_handler(application))
     application.add_event_handler("shutdown", shutdown_event_handler(application))
 
+    # 密码哈希排队已满时返回503，提示客户端稍后重试
+    @application.exception_handler(PasswordHashBusyError)
+    async def password_hash_busy_handler(request: Request, exc: PasswordHashBusyError):
+        return JSONResponse(
+            status_code=503,
+            content={"detail": str(exc)},
+            headers={"Retry-After": "1"},
+        )
+
     # 添加路由
     application.include_router(api_router, prefix=settings.API_PREFIX)
 
@@ -0,0 +1,35 @@
+from typing import List
+from datetime import datetime
+from sqlalchemy import Boolean, Column, Integer, String, Text, DateTime, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.base import Base
+
+
+class AutoReplyRule(Base):
+    """
+    公众号关键词/菜单自动回复规则
+    """
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    # 规则所属的公众号，为空表示对所有账号生效
+    appid = Column(String(50), index=True, nullable=True)
+    # 匹配方式: exact 完全匹配, prefix 前缀匹配, regex 正则匹配, event 事件/菜单点击
+    match_type = Column(String(20), nullable=False)
+    # event规则：菜单点击匹配EventKey，其他事件匹配事件名（如subscribe）
+    pattern = Column(String(500), nullable=False)
+    reply = Column(Text, nullable=False)
+    # 多条规则同时命中时优先级高的生效
+    priority = Column(Integer, default=0, nullable=False)
+    is_active = Column(Boolean, default=True, nullable=False)
+    
+    # 时间戳
+    created_at = Column(DateTime, default=datetime.now, nullable=False)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now, nullable=False)
+    
+    @classmethod
+    async def get_active(cls, db: AsyncSession) -> List["AutoReplyRule"]:
+        """
+        获取所有启用的规则
+        """
+        result = await db.execute(select(cls).filter(cls.is_active == True))
+        return list(result.scalars().all())
@@ -0,0 +1,17 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, DateTime
+
+from app.db.base import Base
+
+
+class TokenRevocation(Base):
+    """
+    令牌吊销记录：用户令牌版本低于min_version的令牌均已失效
+    """
+    user_id = Column(Integer, primary_key=True, autoincrement=False)
+    min_version = Column(Integer, nullable=False)
+    # 吊销前签发的令牌全部过期后，该记录即可清理
+    expires_at = Column(DateTime, index=True, nullable=False)
+    
+    # 时间戳
+    created_at = Column(DateTime, default=datetime.now, nullable=False)
@@ -1,6 +1,7 @@
-from typing import Optional
+from typing import Any, List, Optional, Tuple
 from datetime import datetime
-from sqlalchemy import Boolean, Column, Integer, String, DateTime, func, select
+from sqlalchemy import Boolean, Column, Index, Integer, String, DateTime, and_, func, or_, select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.base import Base
@@ -14,18 +15,31 @@ class User(Base):
     username = Column(String(50), unique=True, index=True, nullable=False)
     email = Column(String(100), unique=True, index=True, nullable=True)
     mobile = Column(String(20), unique=True, index=True, nullable=True)
-    hashed_password = Column(String(100), nullable=False)
+    # 仅通过微信登录的账号没有密码
+    hashed_password = Column(String(100), nullable=True)
     is_active = Column(Boolean, default=True, nullable=False)
     is_superuser = Column(Boolean, default=False, nullable=False)
+    # 令牌版本，停用、删除、修改权限或密码时递增，使已签发的令牌失效
+    token_version = Column(Integer, default=0, nullable=False)
+    # 记录版本，每次修改递增，用于乐观并发控制
+    version = Column(Integer, default=1, nullable=False)
     
     # 微信相关
     openid = Column(String(50), unique=True, index=True, nullable=True)
     unionid = Column(String(50), unique=True, index=True, nullable=True)
+    # 小程序登录返回的会话密钥，用于解密用户敏感数据
+    session_key = Column(String(100), nullable=True)
     
     # 时间戳
     created_at = Column(DateTime, default=datetime.now, nullable=False)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now, nullable=False)
     
+    # 用户列表按(created_at, id)倒序做游标分页，按是否激活筛选时使用第二个索引
+    __table_args__ = (
+        Index("ix_user_created_at_id", "created_at", "id"),
+        Index("ix_user_is_active_created_at_id", "is_active", "created_at", "id"),
+    )
+    
     @classmethod
     async def get_by_id(cls, db: AsyncSession, id: int) -> Optional["User"]:
         """
@@ -56,4 +70,117 @@ class User(Base):
         通过微信OpenID获取用户
         """
         result = await db.execute(select(cls).filter(cls.openid == openid))
-        return result.scalars().first() 
\ No newline at end of file
+        return result.scalars().first()
+    
+    @classmethod
+    def list_query(
+        cls,
+        is_active: Optional[bool] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+    ):
+        """
+        构建用户列表的筛选查询（不含排序和分页）
+        """
+        stmt = select(cls)
+        if is_active is not None:
+            stmt = stmt.filter(cls.is_active == is_active)
+        if created_from is not None:
+            stmt = stmt.filter(cls.created_at >= created_from)
+        if created_to is not None:
+            stmt = stmt.filter(cls.created_at < created_to)
+        return stmt
+    
+    @classmethod
+    async def get_page(
+        cls,
+        db: AsyncSession,
+        limit: int,
+        after: Optional[Tuple[datetime, int]] = None,
+        **filters: Any,
+    ) -> List["User"]:
+        """
+        按(created_at, id)倒序分页获取用户，after为上一页最后一个用户的(created_at, id)
+        
+        使用键集分页而不是OFFSET，翻到任意深度都只扫描一页的索引条目。
+        """
+        stmt = cls.list_query(**filters)
+        if after is not None:
+            stmt = stmt.filter(tuple_(cls.created_at, cls.id) < tuple_(*after))
+        stmt = stmt.order_by(cls.created_at.desc(), cls.id.desc()).limit(limit)
+        result = await db.execute(stmt)
+        return list(result.scalars().all())
+    
+    @classmethod
+    async def upsert_by_openid(
+        cls,
+        db: AsyncSession,
+        openid: str,
+        unionid: Optional[str] = None,
+        session_key: Optional[str] = None,
+    ) -> Any:
+        """
+        按微信OpenID查找或创建用户，并更新会话密钥，返回包含id、is_active、is_superuser、
+        token_version的行（签发令牌所需的字段）
+        
+        再次登录是最常见的情况：先用一次普通查询读取现有记录，会话密钥和unionid都没有变化时
+        直接返回，不开启写事务。需要写入时，SQLite和PostgreSQL下用一条
+        INSERT ... ON CONFLICT ... RETURNING完成，并发的首次登录也只会创建一个用户；
+        其他数据库退化为先查询再写入。
+        """
+        auth_columns = (cls.id, cls.is_active, cls.is_superuser, cls.token_version)
+        result = await db.execute(
+            select(*auth_columns, cls.session_key, cls.unionid).filter(cls.openid == openid)
+        )
+        existing = result.one_or_none()
+        if existing is not None and existing.session_key == session_key and (
+            unionid is None or existing.unionid == unionid
+        ):
+            return existing
+        
+        now = datetime.now()
+        dialect = db.bind.dialect.name
+        if dialect not in ("sqlite", "postgresql"):
+            user = await cls.get_by_openid(db, openid=openid)
+            if user is None:
+                user = cls(username=f"wx_{openid}", openid=openid)
+                db.add(user)
+            else:
+                user.version = (user.version or 0) + 1
+            user.unionid = unionid or user.unionid
+            user.session_key = session_key
+            await db.commit()
+            await db.refresh(user)
+            return user
+        
+        insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+        stmt = insert(cls).values(
+            username=f"wx_{openid}",
+            openid=openid,
+            unionid=unionid,
+            session_key=session_key,
+            created_at=now,
+            updated_at=now,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[cls.openid],
+            set_={
+                "session_key": stmt.excluded.session_key,
+                "unionid": func.coalesce(stmt.excluded.unionid, cls.unionid),
+                "updated_at": now,
+                "version": cls.version + 1,
+            },
+            where=or_(
+                cls.session_key.is_distinct_from(stmt.excluded.session_key),
+                and_(
+                    stmt.excluded.unionid.is_not(None),
+                    cls.unionid.is_distinct_from(stmt.excluded.unionid),
+                ),
+            ),
+        ).returning(*auth_columns)
+        row = (await db.execute(stmt)).one_or_none()
+        await db.commit()
+        if row is None:
+            result = await db.execute(select(*auth_columns).filter(cls.openid == openid))
+            row = result.one()
+        return row
@@ -0,0 +1,38 @@
+from typing import Optional
+from datetime import datetime
+from sqlalchemy import Boolean, Column, Integer, String, DateTime, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.base import Base
+
+
+class WechatApp(Base):
+    """
+    微信公众号/小程序账号配置，一个部署可以同时服务多个账号
+    """
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    appid = Column(String(50), unique=True, index=True, nullable=False)
+    # 账号类型: mp 公众号, mini 小程序
+    app_type = Column(String(10), nullable=False)
+    name = Column(String(100), nullable=True)
+    # secret和aes_key以明文保存：调用微信接口和解密消息时都需要原文，用部署在同一处的密钥加密
+    # 并不能阻止能读取数据库和配置的人拿到它们，因此依赖数据库访问控制与备份加密来保护
+    secret = Column(String(100), nullable=False)
+    # 公众号服务器配置的Token与EncodingAESKey，小程序不需要
+    token = Column(String(100), nullable=True)
+    aes_key = Column(String(50), nullable=True)
+    # 该账号同时运行的Agent任务上限，0表示不单独限制
+    max_concurrency = Column(Integer, default=0, nullable=False)
+    is_active = Column(Boolean, default=True, nullable=False)
+    
+    # 时间戳
+    created_at = Column(DateTime, default=datetime.now, nullable=False)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now, nullable=False)
+    
+    @classmethod
+    async def get_by_appid(cls, db: AsyncSession, appid: str) -> Optional["WechatApp"]:
+        """
+        通过appid获取账号配置
+        """
+        result = await db.execute(select(cls).filter(cls.appid == appid))
+        return result.scalars().first()
@@ -0,0 +1,191 @@
+from typing import Dict, Any, Optional
+from collections import deque
+import asyncio
+
+from app.core.config import settings
+from app.orchestrator.orchestrator import Orchestrator, orchestrator
+from app.utils.logger import get_logger
+
+logger = get_logger("app")
+
+
+class QueueFullError(Exception):
+    """
+    用户排队中的查询过多
+    """
+    pass
+
+
+class _Job:
+    __slots__ = ("cost", "query", "context", "agent_id", "future")
+
+    def __init__(self, cost, query, context, agent_id, future):
+        self.cost = cost
+        self.query = query
+        self.context = context
+        self.agent_id = agent_id
+        self.future = future
+
+
+class FairScheduler:
+    """
+    Agent查询的公平调度器
+
+    每个用户（如openid）拥有独立的队列，用户之间按差额轮询（Deficit Round Robin）
+    分配Agent处理能力，并限制单个用户同时处理中的查询数，
+    避免个别用户大量提问时占满全部LLM并发。
+    """
+
+    def __init__(
+        self,
+        orchestrator: Orchestrator,
+        max_concurrency: int = 8,
+        max_inflight_per_user: int = 1,
+        max_queued_per_user: int = 20,
+        quantum: int = 1,
+    ):
+        """
+        初始化调度器
+
+        Args:
+            orchestrator: 实际处理查询的协调器
+            max_concurrency: 全局同时处理的最大查询数
+            max_inflight_per_user: 单个用户同时处理的最大查询数
+            max_queued_per_user: 单个用户排队的最大查询数，0表示不限制
+            quantum: 每轮为用户增加的额度
+        """
+        self.orchestrator = orchestrator
+        self.max_concurrency = max_concurrency
+        self.max_inflight_per_user = max_inflight_per_user
+        self.max_queued_per_user = max_queued_per_user
+        self.quantum = quantum
+
+        self._queues: Dict[str, deque] = {}
+        self._deficits: Dict[str, int] = {}
+        self._inflight: Dict[str, int] = {}
+        # 有排队查询的用户，按轮询顺序排列
+        self._active: deque = deque()
+        self._running = 0
+
+    async def submit(
+        self,
+        user_key: str,
+        query: str,
+        context: Optional[Dict[str, Any]] = None,
+        agent_id: Optional[str] = None,
+        cost: int = 1,
+    ) -> Dict[str, Any]:
+        """
+        提交查询并等待处理结果
+
+        Args:
+            user_key: 用户标识，公平调度的单位
+            query: 用户查询
+            context: 上下文信息
+            agent_id: 指定使用的Agent ID
+            cost: 查询的调度成本，默认每个查询为1
+
+        Returns:
+            Orchestrator.process_query 的处理结果
+
+        Raises:
+            QueueFullError: 用户排队中的查询超过上限时
+        """
+        queue = self._queues.get(user_key)
+        if queue is None:
+            queue = self._queues[user_key] = deque()
+            self._deficits[user_key] = 0
+            self._active.append(user_key)
+
+        if self.max_queued_per_user and len(queue) >= self.max_queued_per_user:
+            raise QueueFullError(f"用户 {user_key} 排队中的查询过多")
+
+        future = asyncio.get_running_loop().create_future()
+        queue.append(_Job(max(cost, 1), query, context, agent_id, future))
+        self._dispatch()
+
+        return await future
+
+    def _dispatch(self):
+        """
+        按差额轮询从各用户队列中取出查询执行，直到没有空闲并发或没有可执行的查询
+        """
+        capped_visits = 0
+        while self._running < self.max_concurrency and self._active:
+            if capped_visits >= len(self._active):
+                # 所有排队用户都已达到单用户并发上限
+                break
+
+            user_key = self._active[0]
+            self._active.rotate(-1)
+            queue = self._queues[user_key]
+
+            if self._inflight.get(user_key, 0) >= self.max_inflight_per_user:
+                capped_visits += 1
+                continue
+            capped_visits = 0
+
+            self._deficits[user_key] += self.quantum
+            while (
+                queue
+                and queue[0].cost <= self._deficits[user_key]
+                and self._running < self.max_concurrency
+                and self._inflight.get(user_key, 0) < self.max_inflight_per_user
+            ):
+                job = queue.popleft()
+                if job.future.done():
+                    # 提交方已取消
+                    continue
+                self._deficits[user_key] -= job.cost
+                self._start(user_key, job)
+
+            if not queue:
+                # 用户队列已空，移出轮询（轮转后该用户位于队尾）
+                self._active.pop()
+                del self._queues[user_key]
+                del self._deficits[user_key]
+
+    def _start(self, user_key: str, job: _Job):
+        self._running += 1
+        self._inflight[user_key] = self._inflight.get(user_key, 0) + 1
+        asyncio.create_task(self._run(user_key, job))
+
+    async def _run(self, user_key: str, job: _Job):
+        try:
+            result = await self.orchestrator.process_query(
+                job.query, context=job.context, agent_id=job.agent_id
+            )
+            if not job.future.done():
+                job.future.set_result(result)
+        except Exception as e:
+            logger.error(f"调度的查询处理失败: {str(e)}")
+            if not job.future.done():
+                job.future.set_exception(e)
+        finally:
+            self._running -= 1
+            self._inflight[user_key] -= 1
+            if not self._inflight[user_key]:
+                del self._inflight[user_key]
+            self._dispatch()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取调度器状态
+        """
+        return {
+            "running": self._running,
+            "queued": sum(len(queue) for queue in self._queues.values()),
+            "active_users": len(self._active),
+            "max_concurrency": self.max_concurrency,
+            "max_inflight_per_user": self.max_inflight_per_user,
+        }
+
+
+# 创建单例实例
+scheduler = FairScheduler(
+    orchestrator,
+    max_concurrency=settings.AGENT_MAX_CONCURRENCY,
+    max_inflight_per_user=settings.AGENT_MAX_INFLIGHT_PER_USER,
+    max_queued_per_user=settings.AGENT_MAX_QUEUED_PER_USER,
+    quantum=settings.AGENT_SCHEDULER_QUANTUM,
+)
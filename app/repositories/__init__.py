@@ -0,0 +1 @@
+# 数据访问仓储模块
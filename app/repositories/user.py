@@ -0,0 +1,108 @@
+from typing import Dict, Any, Optional
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.user import User
+
+
+class VersionConflictError(Exception):
+    """
+    记录已被其他请求修改，客户端持有的版本号已过期
+    """
+    pass
+
+
+class UserRepository:
+    """
+    用户写操作的数据访问层
+
+    修改和删除使用UPDATE/DELETE ... RETURNING，一条语句完成存在性检查、写入和读回；
+    数据库不支持RETURNING（如3.35之前的SQLite）时退化为同一事务内的写入加查询。
+    每次修改递增version，传入expected_version时只在版本一致时写入，实现乐观并发控制。
+    只有写入失败时才额外查询一次，用于区分用户不存在和版本冲突。由调用方提交事务。
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    def _supports(self, feature: str) -> bool:
+        return getattr(self.db.bind.dialect, feature, False)
+
+    def _conditions(self, user_id: int, expected_version: Optional[int]):
+        conditions = [User.id == user_id]
+        if expected_version is not None:
+            conditions.append(User.version == expected_version)
+        return conditions
+
+    async def _raise_if_conflict(self, user_id: int, expected_version: Optional[int]):
+        if expected_version is None:
+            return
+        current = await self.db.scalar(select(User.version).where(User.id == user_id))
+        if current is not None:
+            raise VersionConflictError(f"用户已被修改，当前版本为 {current}")
+
+    async def update(
+        self,
+        user_id: int,
+        values: Dict[str, Any],
+        expected_version: Optional[int] = None,
+        revoke_tokens: bool = False,
+    ) -> Optional[User]:
+        """
+        修改用户并返回修改后的记录，用户不存在时返回None
+
+        Args:
+            user_id: 用户ID
+            values: 要修改的列
+            expected_version: 客户端持有的版本号，为None时不检查
+            revoke_tokens: 是否同时递增令牌版本
+        """
+        values = dict(values, version=User.version + 1)
+        if revoke_tokens:
+            values["token_version"] = User.token_version + 1
+        stmt = update(User).where(*self._conditions(user_id, expected_version)).values(**values)
+
+        if self._supports("update_returning"):
+            result = await self.db.execute(
+                stmt.returning(User).execution_options(synchronize_session=False, populate_existing=True)
+            )
+            user = result.scalars().first()
+        else:
+            result = await self.db.execute(stmt.execution_options(synchronize_session=False))
+            user = None
+            if result.rowcount:
+                result = await self.db.execute(
+                    select(User).where(User.id == user_id).execution_options(populate_existing=True)
+                )
+                user = result.scalars().first()
+
+        if user is None:
+            await self._raise_if_conflict(user_id, expected_version)
+        return user
+
+    async def delete(self, user_id: int, expected_version: Optional[int] = None) -> Optional[User]:
+        """
+        删除用户并返回被删除的记录，用户不存在时返回None
+        """
+        conditions = self._conditions(user_id, expected_version)
+
+        if self._supports("delete_returning"):
+            result = await self.db.execute(
+                delete(User).where(*conditions).returning(User)
+                .execution_options(synchronize_session=False)
+            )
+            user = result.scalars().first()
+        else:
+            result = await self.db.execute(select(User).where(*conditions))
+            user = result.scalars().first()
+            if user is not None:
+                result = await self.db.execute(
+                    delete(User).where(*conditions).execution_options(synchronize_session=False)
+                )
+                if not result.rowcount:
+                    user = None
+
+        if user is None:
+            await self._raise_if_conflict(user_id, expected_version)
+        return user
@@ -0,0 +1,43 @@
+from typing import Optional
+from datetime import datetime
+from pydantic import BaseModel, Field
+
+
+class AutoReplyRuleBase(BaseModel):
+    """
+    自动回复规则基础模型
+    """
+    appid: Optional[str] = Field(None, max_length=50)
+    match_type: Optional[str] = Field(None, pattern="^(exact|prefix|regex|event)$")
+    pattern: Optional[str] = Field(None, min_length=1, max_length=500)
+    reply: Optional[str] = None
+    priority: Optional[int] = 0
+    is_active: Optional[bool] = True
+
+
+class AutoReplyRuleCreate(AutoReplyRuleBase):
+    """
+    自动回复规则创建模型
+    """
+    match_type: str = Field(..., pattern="^(exact|prefix|regex|event)$")
+    pattern: str = Field(..., min_length=1, max_length=500)
+    reply: str
+
+
+class AutoReplyRuleUpdate(AutoReplyRuleBase):
+    """
+    自动回复规则更新模型
+    """
+    pass
+
+
+class AutoReplyRule(AutoReplyRuleBase):
+    """
+    自动回复规则返回模型
+    """
+    id: int
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
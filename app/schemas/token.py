@@ -15,4 +15,9 @@ class TokenPayload(BaseModel):
     令牌载荷模型
     """
     sub: Optional[str] = None
-    exp: Optional[int] = None 
\ No newline at end of file
+    exp: Optional[int] = None
+    # 无状态鉴权模式下的用户状态声明
+    act: Optional[bool] = None
+    su: Optional[bool] = None
+    # 签发时用户的令牌版本
+    ver: Optional[int] = None 
\ No newline at end of file
@@ -24,11 +24,21 @@ class UserCreate(UserBase):
     mobile: Optional[str] = None
 
 
+class UserImport(UserCreate):
+    """
+    批量导入的用户行，可附带微信标识
+    """
+    openid: Optional[str] = None
+    unionid: Optional[str] = None
+
+
 class UserUpdate(UserBase):
     """
     用户更新模型
     """
     password: Optional[str] = None
+    # 客户端读取时的版本号，提供时只有版本一致才会修改
+    version: Optional[int] = None
 
 
 class UserInDBBase(UserBase):
@@ -36,6 +46,7 @@ class UserInDBBase(UserBase):
     数据库中的用户模型
     """
     id: Optional[int] = None
+    version: Optional[int] = None
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
 
@@ -54,4 +65,4 @@ class UserInDB(UserInDBBase):
     """
     数据库中的带密码哈希的用户模型
     """
-    hashed_password: str 
\ No newline at end of file
+    hashed_password: Optional[str] = None 
\ No newline at end of file
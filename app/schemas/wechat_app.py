@@ -0,0 +1,48 @@
+from typing import Optional
+from datetime import datetime
+from pydantic import BaseModel, Field
+
+
+class WechatAppBase(BaseModel):
+    """
+    微信账号基础模型
+    """
+    name: Optional[str] = None
+    max_concurrency: Optional[int] = Field(0, ge=0)
+    is_active: Optional[bool] = True
+
+
+class WechatAppCreate(WechatAppBase):
+    """
+    微信账号创建模型
+    """
+    appid: str = Field(..., min_length=1, max_length=50)
+    app_type: str = Field(..., pattern="^(mp|mini)$")
+    secret: str
+    token: Optional[str] = None
+    aes_key: Optional[str] = Field(None, min_length=43, max_length=43)
+
+
+class WechatAppUpdate(WechatAppBase):
+    """
+    微信账号更新模型
+    """
+    secret: Optional[str] = None
+    token: Optional[str] = None
+    aes_key: Optional[str] = Field(None, min_length=43, max_length=43)
+    max_concurrency: Optional[int] = Field(None, ge=0)
+    is_active: Optional[bool] = None
+
+
+class WechatApp(WechatAppBase):
+    """
+    微信账号返回模型（不包含密钥和Token）
+    """
+    id: int
+    appid: str
+    app_type: str
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,327 @@
+from typing import Dict, Any, AsyncIterator, Iterator, List, Optional, Tuple
+from datetime import datetime
+import asyncio
+import csv
+import io
+import json
+import os
+import time
+import uuid
+
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.security import get_password_hashes_async
+from app.db.session import AsyncReadSessionLocal, AsyncSessionLocal
+from app.models.user import User
+from app.schemas.user import UserImport
+from app.utils.logger import get_logger
+from app.utils.shared_store import SharedStore, shared_store
+
+logger = get_logger("app")
+
+# 导出的字段，不包含密码哈希和会话密钥
+EXPORT_COLUMNS = (
+    "id", "username", "email", "mobile", "openid", "unionid",
+    "is_active", "is_superuser", "created_at", "updated_at",
+)
+EXPORT_FORMATS = ("ndjson", "csv")
+# 导出时每次从服务端游标取出的行数
+_EXPORT_PARTITION = 1000
+# 导入任务最多记录的错误行数
+_MAX_ERRORS = 100
+# 保留的已结束导入任务数
+_MAX_FINISHED_JOBS = 50
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"无法序列化的类型: {type(value).__name__}")
+
+
+async def export_users(fmt: str = "ndjson") -> AsyncIterator[str]:
+    """
+    流式导出全部用户
+
+    使用服务端游标按批取出行，每批编码后立即输出，内存占用与表大小无关。
+    会话在生成器内部创建，响应发送完毕时关闭。
+    """
+    columns = [getattr(User, name) for name in EXPORT_COLUMNS]
+    stmt = select(*columns).order_by(User.id).execution_options(yield_per=_EXPORT_PARTITION)
+
+    async with AsyncReadSessionLocal() as db:
+        result = await db.stream(stmt)
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(EXPORT_COLUMNS)
+            async for rows in result.partitions():
+                writer.writerows(rows)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            if buffer.tell():
+                yield buffer.getvalue()
+        else:
+            async for rows in result.partitions():
+                yield "".join(
+                    json.dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False, default=_json_default) + "\n"
+                    for row in rows
+                )
+
+
+def _read_rows(path: str, fmt: str) -> Iterator[Tuple[int, Any]]:
+    """
+    逐行读取导入文件，返回(行号, 数据)，无法解析的行返回异常对象
+    """
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        if fmt == "csv":
+            reader = csv.DictReader(f)
+            for row in reader:
+                # CSV中的空单元格视为未提供
+                yield reader.line_num, {k: v for k, v in row.items() if k and v not in ("", None)}
+        else:
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    yield line_no, json.loads(line)
+                except ValueError as e:
+                    yield line_no, e
+
+
+def _parse_rows(
+    rows: Iterator[Tuple[int, Any]], size: int
+) -> Tuple[List[UserImport], List[Tuple[int, str]], bool]:
+    """
+    从导入文件中继续读取最多size行并校验，返回(有效行, 无效行的行号和原因, 是否已读完)
+
+    读取文件和校验都是同步操作，在线程中调用，不阻塞事件循环。
+    """
+    batch: List[UserImport] = []
+    errors: List[Tuple[int, str]] = []
+    for line_no, data in rows:
+        if isinstance(data, Exception) or not isinstance(data, dict):
+            errors.append((line_no, "无法解析的行"))
+        else:
+            try:
+                batch.append(UserImport(**data))
+            except ValidationError as e:
+                error = e.errors()[0]
+                errors.append((line_no, f"{'.'.join(str(loc) for loc in error['loc'])}: {error['msg']}"))
+        if len(batch) + len(errors) >= size:
+            return batch, errors, False
+    return batch, errors, True
+
+
+class UserImportJob:
+    """
+    批量导入任务的进度
+    """
+
+    def __init__(self, fmt: str):
+        self.id = uuid.uuid4().hex
+        self.format = fmt
+        self.status = "running"
+        self.processed = 0
+        self.inserted = 0
+        self.skipped = 0
+        self.invalid = 0
+        self.errors: List[Dict[str, Any]] = []
+        self.error: Optional[str] = None
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+
+    def add_error(self, line: int, message: str):
+        self.invalid += 1
+        if len(self.errors) < _MAX_ERRORS:
+            self.errors.append({"line": line, "error": message})
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "format": self.format,
+            "status": self.status,
+            "processed": self.processed,
+            "inserted": self.inserted,
+            "skipped": self.skipped,
+            "invalid": self.invalid,
+            "errors": self.errors,
+            "error": self.error,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+async def _insert_batch(db: AsyncSession, rows: List[Dict[str, Any]]) -> int:
+    """
+    在一个事务中插入一批用户，用户名、邮箱、手机号或openid冲突的行跳过，返回实际插入的行数
+    """
+    dialect = db.bind.dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        dialect_insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+        stmt = dialect_insert(User).on_conflict_do_nothing().returning(User.id)
+        result = await db.execute(stmt, rows)
+        inserted = len(result.all())
+        await db.commit()
+        return inserted
+
+    # 其他数据库逐行插入，冲突的行回滚到保存点后跳过
+    inserted = 0
+    for row in rows:
+        try:
+            async with db.begin_nested():
+                await db.execute(insert(User), [row])
+            inserted += 1
+        except IntegrityError:
+            pass
+    await db.commit()
+    return inserted
+
+
+class UserImporter:
+    """
+    后台批量导入用户
+
+    上传文件先落盘，再由后台任务分批读取：每行用UserImport（即UserCreate加微信标识）校验，
+    每批在独立线程池中计算密码哈希后用一次批量INSERT写入，冲突行跳过。
+    读取和校验在线程中进行，内存中只保留一批数据，进度可随时查询。
+    配置共享存储后每批写入后保存进度，由其他进程接收的查询请求也能读到。
+    """
+
+    def __init__(self, batch_size: int = 500, store: Optional[SharedStore] = None, job_ttl: float = 86400):
+        """
+        初始化导入器
+
+        Args:
+            batch_size: 每个事务插入的行数
+            store: 跨进程共享存储，None表示仅在进程内保存进度
+            job_ttl: 进度在共享存储中的保留时间（秒）
+        """
+        self.batch_size = batch_size
+        self.store = store
+        self.job_ttl = job_ttl
+        self._jobs: Dict[str, UserImportJob] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    @staticmethod
+    def _key(job_id: str) -> str:
+        return f"user:import:{job_id}"
+
+    async def start(self, path: str, fmt: str) -> UserImportJob:
+        """
+        启动导入任务，任务结束后删除文件
+        """
+        job = UserImportJob(fmt)
+        self._jobs[job.id] = job
+        self._prune()
+        await self._save(job)
+        task = asyncio.create_task(self._run(job, path))
+        self._tasks[job.id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job.id, None))
+        return job
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        获取导入任务的进度
+        """
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job.to_dict()
+        if self.store:
+            value = await self.store.get(self._key(job_id))
+            if value:
+                return json.loads(value)
+        return None
+
+    async def _save(self, job: UserImportJob):
+        if not self.store:
+            return
+        try:
+            await self.store.set(self._key(job.id), json.dumps(job.to_dict()), ttl=self.job_ttl)
+        except Exception as e:
+            # 保存进度失败不影响导入本身，本进程仍可查询
+            logger.error(f"保存用户导入进度失败 {job.id}: {str(e)}")
+
+    def _prune(self):
+        finished = [job for job in self._jobs.values() if job.status != "running"]
+        for job in finished[:max(len(finished) - _MAX_FINISHED_JOBS, 0)]:
+            del self._jobs[job.id]
+
+    async def _flush(self, job: UserImportJob, batch: List[UserImport]):
+        hashes = await get_password_hashes_async([user.password for user in batch])
+        rows = [
+            {
+                "username": user.username,
+                "email": user.email,
+                "mobile": user.mobile,
+                "openid": user.openid,
+                "unionid": user.unionid,
+                "hashed_password": hashed_password,
+                "is_active": True if user.is_active is None else user.is_active,
+                "is_superuser": user.is_superuser,
+            }
+            for user, hashed_password in zip(batch, hashes)
+        ]
+        async with AsyncSessionLocal() as db:
+            inserted = await _insert_batch(db, rows)
+        job.inserted += inserted
+        job.skipped += len(rows) - inserted
+        job.processed += len(rows)
+
+    async def _run(self, job: UserImportJob, path: str):
+        rows = _read_rows(path, job.format)
+        try:
+            finished = False
+            while not finished:
+                batch, errors, finished = await asyncio.to_thread(_parse_rows, rows, self.batch_size)
+                for line_no, message in errors:
+                    job.processed += 1
+                    job.add_error(line_no, message)
+                if batch:
+                    await self._flush(job, batch)
+                await self._save(job)
+            job.status = "done"
+            logger.info(
+                f"用户导入完成 {job.id}: 新增 {job.inserted}，跳过 {job.skipped}，无效 {job.invalid}"
+            )
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+            raise
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            logger.error(f"用户导入失败 {job.id}: {str(e)}")
+        finally:
+            job.finished_at = time.time()
+            try:
+                # 取消时线程可能仍在读取，此时文件留给生成器被回收时关闭
+                rows.close()
+            except ValueError:
+                pass
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            await asyncio.shield(self._save(job))
+
+    async def stop(self):
+        """
+        取消进行中的导入任务
+        """
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+user_importer = UserImporter(
+    batch_size=settings.USER_IMPORT_BATCH_SIZE,
+    store=shared_store,
+    job_ttl=settings.USER_IMPORT_JOB_TTL,
+)
@@ -0,0 +1,74 @@
+from typing import Dict, Any, Optional
+
+from app.core.config import settings
+from app.utils.shared_store import SharedStore, shared_store
+from app.utils.ttl_cache import TTLCache
+
+
+class AnswerStore:
+    """
+    待领取的公众号回答
+
+    异步生成的回答无法通过客服消息送达（接口不可用、超出配额或被关闭）时，
+    按用户暂存在这里；用户发送下一条消息时直接作为被动回复返回。
+    配置共享存储后，Worker进程生成的回答也可以被Web进程领取。
+    """
+
+    def __init__(
+        self,
+        ttl: float = 86400,
+        maxsize: int = 10000,
+        store: Optional[SharedStore] = None,
+    ):
+        """
+        初始化存储
+
+        Args:
+            ttl: 回答保留时间（秒）
+            maxsize: 进程内最多保留回答的用户数
+            store: 跨进程共享存储，None表示仅在进程内保存
+        """
+        self.ttl = ttl
+        self.store = store
+        self._answers = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    @staticmethod
+    def _key(message: Dict[str, Any]) -> str:
+        return f"wechat:mp:answer:{message.get('ToUserName') or ''}:{message.get('FromUserName')}"
+
+    async def put(self, message: Dict[str, Any], answer: str, front: bool = False):
+        """
+        暂存用户的回答
+
+        Args:
+            message: 用户的原始消息
+            answer: 回答内容
+            front: 是否放在已暂存回答之前（用于放回未领取完的剩余内容）
+        """
+        key = self._key(message)
+        if self.store:
+            await self.store.append(key, answer, ttl=self.ttl, prepend=front)
+            return
+
+        answers = self._answers.get(key) or []
+        answers = [answer] + answers if front else answers + [answer]
+        self._answers.set(key, answers)
+
+    async def pop(self, message: Dict[str, Any]) -> Optional[str]:
+        """
+        取出用户所有待领取的回答，没有时返回None
+        """
+        key = self._key(message)
+        if self.store:
+            answers = await self.store.pop_list(key)
+        else:
+            answers = self._answers.pop(key) or []
+        return "\n\n".join(answers) if answers else None
+
+
+# 创建单例实例
+answer_store = AnswerStore(
+    ttl=settings.WECHAT_MP_ANSWER_TTL,
+    maxsize=settings.WECHAT_MP_ANSWER_MAXSIZE,
+    store=shared_store,
+)
@@ -0,0 +1,159 @@
+from typing import Dict, Any, Optional, Tuple
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.wechat_app import WechatApp
+from app.services.wechat_mini import WechatMiniService
+from app.services.wechat_mp import WechatMPService
+from app.utils.logger import get_logger
+from app.utils.ttl_cache import TTLCache
+
+logger = get_logger("wechat_mp")
+
+
+class WechatAppNotFoundError(LookupError):
+    """
+    账号不存在或已停用
+    """
+    pass
+
+
+class WechatAppRegistry:
+    """
+    多账号服务注册表
+
+    账号配置从数据库读取并在进程内短暂缓存（包括不存在的结果），每个appid只创建一个服务实例，
+    access_token、发送队列和并发限制都按账号隔离；配置变化后在下次访问时重建服务，
+    账号被删除或停用后释放其服务实例。
+    环境变量中配置的公众号和小程序作为默认账号，数据库中没有对应记录时使用。
+    """
+
+    def __init__(self, cache_ttl: float = 60, maxsize: int = 1000):
+        self._configs = TTLCache(maxsize=maxsize, ttl=cache_ttl)
+        self._services: Dict[Tuple[str, str], Tuple[Tuple[Any, ...], Any]] = {}
+
+    @staticmethod
+    def _default_config(app_type: str, appid: str) -> Optional[Dict[str, Any]]:
+        if app_type == "mp" and appid == settings.WECHAT_MP_APPID:
+            return {
+                "secret": settings.WECHAT_MP_SECRET,
+                "token": settings.WECHAT_MP_TOKEN,
+                "aes_key": settings.WECHAT_MP_AES_KEY,
+                "max_concurrency": settings.WECHAT_MP_MAX_CONCURRENCY,
+            }
+        if app_type == "mini" and appid == settings.WECHAT_MINI_APPID:
+            return {"secret": settings.WECHAT_MINI_SECRET}
+        return None
+
+    async def _load_config(self, app_type: str, appid: str) -> Optional[Dict[str, Any]]:
+        cache_key = (app_type, appid)
+        config = self._configs.get(cache_key)
+        if config is not None:
+            return config or None
+
+        async with AsyncSessionLocal() as db:
+            app = await WechatApp.get_by_appid(db, appid)
+        if app is not None and app.app_type == app_type:
+            config = {
+                "secret": app.secret,
+                "token": app.token or "",
+                "aes_key": app.aes_key or "",
+                "max_concurrency": app.max_concurrency or 0,
+            } if app.is_active else None
+        else:
+            config = self._default_config(app_type, appid)
+
+        # 不存在的账号也缓存，避免无效appid的请求反复查询数据库
+        self._configs.set(cache_key, config or {})
+        return config
+
+    def _build(self, app_type: str, appid: str, config: Dict[str, Any]):
+        if app_type == "mp":
+            return WechatMPService(
+                appid=appid,
+                secret=config["secret"],
+                token=config["token"],
+                aes_key=config["aes_key"],
+                max_concurrency=config["max_concurrency"],
+            )
+        return WechatMiniService(appid=appid, secret=config["secret"])
+
+    def _get_or_build(self, app_type: str, appid: str, config: Dict[str, Any]):
+        fingerprint = tuple(sorted(config.items()))
+        entry = self._services.get((app_type, appid))
+        if entry is not None and entry[0] == fingerprint:
+            return entry[1]
+
+        service = self._build(app_type, appid, config)
+        self._services[(app_type, appid)] = (fingerprint, service)
+        if entry is not None:
+            logger.info(f"账号 {appid} 的配置已更新，服务已重建")
+        return service
+
+    async def _get(self, app_type: str, appid: str):
+        config = await self._load_config(app_type, appid)
+        if config is None:
+            # 其他进程删除或停用的账号在配置缓存过期后才会发现，这时释放残留的服务实例
+            self._services.pop((app_type, appid), None)
+            raise WechatAppNotFoundError(f"账号不存在或已停用: {appid}")
+        return self._get_or_build(app_type, appid, config)
+
+    async def get_mp_service(self, appid: str) -> WechatMPService:
+        """
+        获取指定公众号的服务
+
+        Raises:
+            WechatAppNotFoundError: 账号不存在或已停用时
+        """
+        return await self._get("mp", appid)
+
+    async def get_mini_service(self, appid: str) -> WechatMiniService:
+        """
+        获取指定小程序的服务
+
+        Raises:
+            WechatAppNotFoundError: 账号不存在或已停用时
+        """
+        return await self._get("mini", appid)
+
+    def _get_default(self, app_type: str, appid: str):
+        # 默认账号已按数据库配置加载过时直接复用，避免两套配置来回重建
+        entry = self._services.get((app_type, appid))
+        if entry is not None:
+            return entry[1]
+        return self._get_or_build(app_type, appid, self._default_config(app_type, appid))
+
+    def default_mp_service(self) -> WechatMPService:
+        """
+        获取环境变量中配置的默认公众号服务
+        """
+        return self._get_default("mp", settings.WECHAT_MP_APPID)
+
+    def default_mini_service(self) -> WechatMiniService:
+        """
+        获取环境变量中配置的默认小程序服务
+        """
+        return self._get_default("mini", settings.WECHAT_MINI_APPID)
+
+    def invalidate(self, appid: str):
+        """
+        丢弃账号配置缓存和服务实例，下次访问时重新读取配置并创建服务
+
+        账号被修改、停用或删除后调用，避免已停用账号的服务一直留在注册表中。
+        """
+        for app_type in ("mp", "mini"):
+            self._configs.delete((app_type, appid))
+            if self._services.pop((app_type, appid), None) is not None:
+                logger.info(f"账号 {appid} 的服务已释放")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        已加载的账号
+        """
+        return {
+            "mp": [appid for app_type, appid in self._services if app_type == "mp"],
+            "mini": [appid for app_type, appid in self._services if app_type == "mini"],
+        }
+
+
+wechat_apps = WechatAppRegistry(cache_ttl=settings.WECHAT_APP_CACHE_TTL)
@@ -0,0 +1,157 @@
+from typing import Optional
+import asyncio
+import base64
+import hashlib
+import os
+import secrets
+import struct
+import time
+
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+from app.core.config import settings
+from app.utils.wechat_xml import cdata, parse_xml
+
+# 微信消息加解密使用32字节块的PKCS#7填充
+_BLOCK_SIZE = 32
+
+_ENCRYPTED_REPLY_TEMPLATE = (
+    "<xml>"
+    "<Encrypt><![CDATA[{encrypt}]]></Encrypt>"
+    "<MsgSignature><![CDATA[{signature}]]></MsgSignature>"
+    "<TimeStamp>{timestamp}</TimeStamp>"
+    "<Nonce><![CDATA[{nonce}]]></Nonce>"
+    "</xml>"
+)
+
+
+class WechatCryptoError(ValueError):
+    """
+    安全模式消息签名校验或解密失败
+    """
+    pass
+
+
+def _sha1_signature(*parts: str) -> str:
+    return hashlib.sha1("".join(sorted(parts)).encode("utf-8")).hexdigest()
+
+
+class WechatMsgCrypto:
+    """
+    公众号安全模式的消息加解密（AES-256-CBC）与msg_signature签名
+
+    密钥、IV和Cipher对象在构造时根据EncodingAESKey派生一次，每条消息只创建一次性的
+    加解密上下文；超过阈值的大报文放到线程中处理，避免阻塞事件循环。
+    """
+
+    def __init__(self, token: str, aes_key: str, appid: str, thread_threshold: Optional[int] = None):
+        if len(aes_key) != 43:
+            raise WechatCryptoError("EncodingAESKey长度应为43位")
+        try:
+            key = base64.b64decode(aes_key + "=", validate=True)
+        except ValueError as e:
+            raise WechatCryptoError(f"EncodingAESKey格式错误: {str(e)}")
+        if len(key) != 32:
+            raise WechatCryptoError("EncodingAESKey解码后应为32字节")
+
+        self.token = token
+        self.appid = appid
+        self._appid_bytes = appid.encode("utf-8")
+        # 微信约定IV取密钥的前16字节，因此Cipher对象可以复用
+        self._cipher = Cipher(algorithms.AES(key), modes.CBC(key[:16]))
+        self.thread_threshold = (
+            settings.WECHAT_MP_CRYPTO_THREAD_THRESHOLD if thread_threshold is None else thread_threshold
+        )
+
+    def signature(self, timestamp: str, nonce: str, encrypt: str) -> str:
+        """
+        计算msg_signature
+        """
+        return _sha1_signature(self.token, timestamp, nonce, encrypt)
+
+    def verify_signature(self, msg_signature: str, timestamp: str, nonce: str, encrypt: str) -> bool:
+        """
+        校验msg_signature
+        """
+        return secrets.compare_digest(self.signature(timestamp, nonce, encrypt), msg_signature)
+
+    def encrypt(self, plaintext: bytes) -> str:
+        """
+        加密消息：16字节随机串 + 4字节网络字节序长度 + 消息 + AppID，填充后加密并Base64编码
+        """
+        data = b"".join((
+            os.urandom(16), struct.pack("!I", len(plaintext)), plaintext, self._appid_bytes
+        ))
+        pad = _BLOCK_SIZE - len(data) % _BLOCK_SIZE
+        data += bytes((pad,)) * pad
+        encryptor = self._cipher.encryptor()
+        return base64.b64encode(encryptor.update(data) + encryptor.finalize()).decode("ascii")
+
+    def decrypt(self, encrypt: str) -> bytes:
+        """
+        解密消息并校验AppID，返回明文XML
+
+        Raises:
+            WechatCryptoError: 密文、填充或AppID不合法时
+        """
+        try:
+            ciphertext = base64.b64decode(encrypt)
+        except ValueError as e:
+            raise WechatCryptoError(f"密文不是合法的Base64: {str(e)}")
+        if not ciphertext or len(ciphertext) % 16:
+            raise WechatCryptoError("密文长度不合法")
+
+        decryptor = self._cipher.decryptor()
+        data = decryptor.update(ciphertext) + decryptor.finalize()
+
+        pad = data[-1]
+        if not 1 <= pad <= _BLOCK_SIZE or len(data) < 20 + pad:
+            raise WechatCryptoError("密文填充不合法")
+        content = data[16:-pad]
+        (length,) = struct.unpack("!I", content[:4])
+        plaintext = content[4:4 + length]
+        if len(plaintext) != length or content[4 + length:] != self._appid_bytes:
+            raise WechatCryptoError("消息AppID不匹配")
+        return plaintext
+
+    def decrypt_callback(self, body: bytes, msg_signature: str, timestamp: str, nonce: str) -> bytes:
+        """
+        校验签名并解密回调消息体，返回明文XML
+        """
+        encrypt = parse_xml(body).get("Encrypt")
+        if not encrypt:
+            raise WechatCryptoError("消息中缺少Encrypt字段")
+        if not self.verify_signature(msg_signature, timestamp, nonce, encrypt):
+            raise WechatCryptoError("msg_signature校验失败")
+        return self.decrypt(encrypt)
+
+    def encrypt_reply(self, reply: str, timestamp: Optional[str] = None, nonce: Optional[str] = None) -> str:
+        """
+        加密被动回复并生成带签名的回复XML
+        """
+        timestamp = timestamp or str(int(time.time()))
+        nonce = nonce or secrets.token_hex(8)
+        encrypt = self.encrypt(reply.encode("utf-8"))
+        return _ENCRYPTED_REPLY_TEMPLATE.format(
+            encrypt=encrypt,
+            signature=self.signature(timestamp, nonce, encrypt),
+            timestamp=timestamp,
+            nonce=cdata(nonce),
+        )
+
+    async def decrypt_callback_async(self, body: bytes, msg_signature: str, timestamp: str, nonce: str) -> bytes:
+        """
+        decrypt_callback的异步版本，大报文在线程中处理
+        """
+        if len(body) >= self.thread_threshold:
+            return await asyncio.to_thread(self.decrypt_callback, body, msg_signature, timestamp, nonce)
+        return self.decrypt_callback(body, msg_signature, timestamp, nonce)
+
+    async def encrypt_reply_async(self, reply: str, timestamp: Optional[str] = None, nonce: Optional[str] = None) -> str:
+        """
+        encrypt_reply的异步版本，大报文在线程中处理
+        """
+        # 按UTF-8每字符最多3字节估算，避免为判断大小再编码一次
+        if len(reply) * 3 >= self.thread_threshold:
+            return await asyncio.to_thread(self.encrypt_reply, reply, timestamp, nonce)
+        return self.encrypt_reply(reply, timestamp, nonce)
@@ -0,0 +1,72 @@
+from typing import Dict, Any, Optional
+
+from app.core.config import settings
+from app.utils.shared_store import SharedStore, shared_store
+from app.utils.ttl_cache import TTLCache
+
+
+class MessageDeduplicator:
+    """
+    微信公众号回调消息去重
+
+    微信在5秒内未收到响应时会重试推送同一条消息（最多3次）。
+    普通消息按MsgId去重，事件消息按FromUserName+CreateTime去重，
+    避免重试导致重复运行Agent。配置共享存储后，多个进程共享去重记录。
+    """
+
+    def __init__(
+        self,
+        ttl: float = 60,
+        maxsize: int = 50000,
+        store: Optional[SharedStore] = None,
+    ):
+        """
+        初始化去重器
+
+        Args:
+            ttl: 去重记录保留时间（秒），需覆盖微信的重试窗口
+            maxsize: 进程内最多保留的记录数
+            store: 跨进程共享存储，None表示仅在进程内去重
+        """
+        self.ttl = ttl
+        self.store = store
+        self._seen = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.duplicates = 0
+
+    @staticmethod
+    def message_key(message: Dict[str, Any]) -> str:
+        """
+        生成消息的去重键
+        """
+        account = message.get("ToUserName") or ""
+        msg_id = message.get("MsgId")
+        if msg_id:
+            return f"wechat:mp:dedup:{account}:msg:{msg_id}"
+        return (
+            f"wechat:mp:dedup:{account}:evt:"
+            f"{message.get('FromUserName')}:{message.get('CreateTime')}:{message.get('Event')}"
+        )
+
+    async def claim(self, message: Dict[str, Any]) -> bool:
+        """
+        登记消息，首次出现返回True，重试推送的重复消息返回False
+        """
+        key = self.message_key(message)
+        if not self._seen.add(key, True):
+            self.duplicates += 1
+            return False
+
+        if self.store and not await self.store.add(key, "1", ttl=self.ttl):
+            # 已被其他进程处理
+            self.duplicates += 1
+            return False
+
+        return True
+
+
+# 创建单例实例
+message_deduplicator = MessageDeduplicator(
+    ttl=settings.WECHAT_MP_DEDUP_TTL,
+    maxsize=settings.WECHAT_MP_DEDUP_MAXSIZE,
+    store=shared_store,
+)
@@ -1,7 +1,8 @@
 from typing import Dict, Any, Optional
 import json
 
-import httpx
+from app.services.wechat_token import get_token_manager
+from app.utils.http_client import http_client
 
 
 class WechatMiniService:
@@ -13,6 +14,7 @@ class WechatMiniService:
         self.appid = appid
         self.secret = secret
         self.base_url = "https://api.weixin.qq.com"
+        self.token_manager = get_token_manager(appid, secret)
     
     async def code2session(self, code: str) -> Dict[str, Any]:
         """
@@ -26,54 +28,38 @@ class WechatMiniService:
             "grant_type": "authorization_code",
         }
         
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, params=params)
-            response.raise_for_status()
-            
-            result = response.json()
-            if "errcode" in result and result["errcode"] != 0:
-                raise Exception(f"微信接口错误: {result['errmsg']}")
-            
-            return result
+        client = http_client.get_client()
+        response = await client.get(url, params=params)
+        response.raise_for_status()
+        
+        result = response.json()
+        if "errcode" in result and result["errcode"] != 0:
+            raise Exception(f"微信接口错误: {result['errmsg']}")
+        
+        return result
     
     async def get_access_token(self) -> str:
         """
-        获取小程序全局接口调用凭据
+        获取小程序全局接口调用凭据（由进程内共享的管理器缓存与刷新）
         """
-        url = f"{self.base_url}/cgi-bin/token"
-        params = {
-            "grant_type": "client_credential",
-            "appid": self.appid,
-            "secret": self.secret,
-        }
-        
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, params=params)
-            response.raise_for_status()
-            
-            result = response.json()
-            if "errcode" in result and result["errcode"] != 0:
-                raise Exception(f"获取access_token失败: {result['errmsg']}")
-            
-            return result["access_token"]
+        return await self.token_manager.get_token()
     
     async def get_phone_number(self, code: str) -> Dict[str, Any]:
         """
         获取用户手机号
         """
-        # 获取access_token
-        access_token = await self.get_access_token()
-        
-        # 构建请求
-        url = f"{self.base_url}/wxa/business/getuserphonenumber?access_token={access_token}"
         data = {"code": code}
         
-        async with httpx.AsyncClient() as client:
+        async def _request(access_token: str) -> Dict[str, Any]:
+            url = f"{self.base_url}/wxa/business/getuserphonenumber?access_token={access_token}"
+            client = http_client.get_client()
             response = await client.post(url, json=data)
             response.raise_for_status()
-            
-            result = response.json()
-            if result.get("errcode") != 0:
-                raise Exception(f"获取手机号失败: {result.get('errmsg')}")
-            
-            return result 
\ No newline at end of file
+            return response.json()
+        
+        # access_token失效时自动刷新重试
+        result = await self.token_manager.call(_request)
+        if result.get("errcode") != 0:
+            raise Exception(f"获取手机号失败: {result.get('errmsg')}")
+        
+        return result 
\ No newline at end of file
@@ -1,16 +1,28 @@
 from typing import Dict, Any, Optional
-import httpx
-import xml.etree.ElementTree as ET
+import contextlib
 import time
 import asyncio
-from datetime import datetime
 
-from app.orchestrator.orchestrator import orchestrator
+from app.core.config import settings
+from app.orchestrator.scheduler import scheduler, QueueFullError
+from app.services.wechat_answers import answer_store
+from app.services.wechat_crypto import WechatCryptoError, WechatMsgCrypto
+from app.services.wechat_dedup import message_deduplicator
+from app.services.wechat_mp_sender import CustomMessageSender, CustomMessageSendError, WechatAPIError
+from app.services.wechat_rules import rule_engine
+from app.services.wechat_token import get_token_manager
+from app.utils.http_client import http_client
 from app.utils.logger import get_logger
+from app.utils.text import take_prefix
+from app.utils.wechat_xml import build_text_reply, parse_xml
+from app.worker.job_queue import job_queue
 
 # 获取微信公众号服务的日志记录器
 logger = get_logger("wechat_mp")
 
+# 用于领取暂存回答的关键词
+CONTINUE_KEYWORDS = {"继续", "继续回答", "continue"}
+
 class WechatMPService:
     """
     微信公众号服务
@@ -21,67 +33,185 @@ class WechatMPService:
         appid: str, 
         secret: str, 
         token: str, 
-        aes_key: Optional[str] = None
+        aes_key: Optional[str] = None,
+        max_concurrency: int = 0,
     ):
         self.appid = appid
         self.secret = secret
         self.token = token
         self.aes_key = aes_key
         self.base_url = "https://api.weixin.qq.com"
-        # 存储正在处理的消息
-        self.processing_messages = {}
+        self.token_manager = get_token_manager(appid, secret)
+        # 配置了EncodingAESKey时支持安全模式，密钥与Cipher只派生一次；
+        # 密钥无效时只有安全模式的消息无法处理，明文模式不受影响
+        self.crypto = None
+        if aes_key:
+            try:
+                self.crypto = WechatMsgCrypto(token, aes_key, appid)
+            except WechatCryptoError as e:
+                logger.error(f"公众号 {appid} 的EncodingAESKey无效，无法处理安全模式消息: {str(e)}")
+        # 账号级的Agent并发上限，避免单个账号占满全局调度器
+        self.max_concurrency = max_concurrency
+        self._agent_slots = asyncio.Semaphore(max_concurrency) if max_concurrency > 0 else None
+        # 异步回答经发送队列分段、限速后通过客服消息发送
+        self.sender = CustomMessageSender(
+            self._send_text_message,
+            rate=settings.WECHAT_MP_SEND_RATE,
+            burst=settings.WECHAT_MP_SEND_BURST,
+            max_concurrency=settings.WECHAT_MP_SEND_CONCURRENCY,
+            max_retries=settings.WECHAT_MP_SEND_MAX_RETRIES,
+            max_bytes=settings.WECHAT_MP_CUSTOM_MESSAGE_MAX_BYTES,
+        )
     
     async def get_access_token(self) -> str:
         """
-        获取公众号全局接口调用凭据
+        获取公众号全局接口调用凭据（由进程内共享的管理器缓存与刷新）
         """
-        url = f"{self.base_url}/cgi-bin/token"
-        params = {
-            "grant_type": "client_credential",
-            "appid": self.appid,
-            "secret": self.secret,
-        }
-        
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, params=params)
-            response.raise_for_status()
-            
-            result = response.json()
-            if "errcode" in result and result["errcode"] != 0:
-                raise Exception(f"获取access_token失败: {result['errmsg']}")
-            
-            return result["access_token"]
+        return await self.token_manager.get_token()
     
     async def parse_xml_message(self, xml_content: bytes) -> Dict[str, Any]:
         """
         解析XML消息
         """
-        root = ET.fromstring(xml_content)
-        message = {}
-        for child in root:
-            message[child.tag] = child.text
-        
-        return message
+        return parse_xml(xml_content)
     
     def generate_reply(self, message: Dict[str, Any], content: str) -> str:
         """
         生成回复消息
         """
-        from_user_name = message.get("FromUserName")
-        to_user_name = message.get("ToUserName")
-        timestamp = int(time.time())
+        return build_text_reply(
+            to_user=message.get("FromUserName"),
+            from_user=message.get("ToUserName"),
+            content=content,
+        )
+    
+    def fits_passive_reply(self, content: str) -> bool:
+        """
+        判断内容是否可以直接作为被动回复返回
+        """
+        return len(content.encode("utf-8")) <= settings.WECHAT_MP_PASSIVE_REPLY_MAX_BYTES
+    
+    async def generate_answer(self, message: Dict[str, Any]) -> str:
+        """
+        经公平调度器交给论文问答Agent生成文本消息的回答
+        """
+        content = message.get("Content", "").strip()
+        from_user = message.get("FromUserName")
+        
+        try:
+            async with self._agent_slots or contextlib.nullcontext():
+                result = await scheduler.submit(from_user, content, agent_id="paper_qa")
+            return result.get("response", "抱歉，我无法理解您的问题。")
+        except QueueFullError:
+            return "您提交的问题较多，请等待之前的问题回答后再提问。"
+        except Exception as e:
+            logger.error(f"生成回答时出错: {str(e)}")
+            return "很抱歉，处理您的消息时出现了错误，请稍后再试。"
+    
+    async def deliver_answer(self, message: Dict[str, Any], answer: str):
+        """
+        投递异步生成的回答：优先通过客服消息发送，无法发送时暂存，待用户下次发消息时领取
+        """
+        if settings.WECHAT_MP_CUSTOM_MESSAGE_ENABLED:
+            try:
+                await self.sender.send(message.get("FromUserName"), answer)
+                return
+            except CustomMessageSendError as e:
+                logger.warning(f"{str(e)}，未送达的内容已暂存待用户领取")
+                answer = e.remaining
         
-        reply_xml = f"""
-<xml>
-<ToUserName><![CDATA[{from_user_name}]]></ToUserName>
-<FromUserName><![CDATA[{to_user_name}]]></FromUserName>
-<CreateTime>{timestamp}</CreateTime>
-<MsgType><![CDATA[text]]></MsgType>
-<Content><![CDATA[{content}]]></Content>
-</xml>
-"""
+        await answer_store.put(message, answer)
+    
+    async def _send_answer_when_ready(self, message: Dict[str, Any], answer_task: asyncio.Task):
+        """
+        等待超出被动回复时限的回答完成后投递
+        """
+        answer = await answer_task
+        await self.deliver_answer(message, answer)
+    
+    def _take_passive_chunk(self, content: str):
+        """
+        截取可以作为被动回复的前半部分，返回(本次回复内容, 剩余内容)
+        """
+        if self.fits_passive_reply(content):
+            return content, ""
+        
+        hint = "\n\n（回复“继续”查看剩余内容）"
+        limit = settings.WECHAT_MP_PASSIVE_REPLY_MAX_BYTES - len(hint.encode("utf-8"))
+        head, rest = take_prefix(content, limit)
+        return head + hint, rest
+    
+    async def _reply_pending_answer(self, message: Dict[str, Any]) -> Optional[str]:
+        """
+        用户有待领取的回答时，将其作为被动回复返回
+        """
+        pending = await answer_store.pop(message)
+        if pending is None:
+            return None
         
-        return reply_xml.strip()
+        reply, rest = self._take_passive_chunk(pending)
+        if rest:
+            await answer_store.put(message, rest, front=True)
+        return self.generate_reply(message, reply)
+    
+    async def _reply_text(self, message: Dict[str, Any]) -> str:
+        """
+        处理文本消息：在被动回复时限内完成则直接回复，否则转为异步投递
+        """
+        from_user = message.get("FromUserName")
+        content = message.get("Content", "").strip()
+        budget = settings.WECHAT_MP_REPLY_TIMEOUT
+        
+        # 优先返回之前未送达的回答
+        pending_reply = await self._reply_pending_answer(message)
+        if content in CONTINUE_KEYWORDS:
+            if pending_reply is not None:
+                return pending_reply
+            return self.generate_reply(message, "暂时没有新的回答，您的问题可能仍在处理中，请稍后再发送“继续”。")
+        if pending_reply is not None:
+            # 新问题在后台处理，本次先返回之前的回答
+            budget = 0
+            processing_reply = pending_reply
+        elif settings.WECHAT_MP_CUSTOM_MESSAGE_ENABLED:
+            processing_reply = self.generate_reply(message, "您的问题正在处理中，请稍候...")
+        else:
+            processing_reply = self.generate_reply(
+                message, "您的问题正在处理中，请稍后发送“继续”获取回答。"
+            )
+        
+        if settings.AGENT_WORKER_MODE == "queue":
+            # 交给独立的Worker进程处理，Web进程只负责入队并在时限内等待结果
+            reply_deadline = time.time() + budget if budget > 0 else None
+            job_id = await job_queue.enqueue(
+                "wechat_mp_message",
+                {"appid": self.appid, "message": message},
+                user_key=from_user,
+                reply_deadline=reply_deadline,
+            )
+            if reply_deadline is None:
+                return processing_reply
+            
+            result = await job_queue.wait_result(job_id, timeout=reply_deadline - time.time())
+            if (
+                result is not None
+                and self.fits_passive_reply(result["answer"])
+                and await job_queue.claim_delivery(job_id)
+            ):
+                return self.generate_reply(message, result["answer"])
+            return processing_reply
+        
+        if budget <= 0:
+            asyncio.create_task(self.process_message_async(message))
+            return processing_reply
+        
+        # 与时限赛跑，超时后回答继续在后台生成
+        answer_task = asyncio.create_task(self.generate_answer(message))
+        done, _ = await asyncio.wait({answer_task}, timeout=budget)
+        if done and self.fits_passive_reply(answer_task.result()):
+            return self.generate_reply(message, answer_task.result())
+        
+        asyncio.create_task(self._send_answer_when_ready(message, answer_task))
+        return processing_reply
     
     async def process_message_async(self, message: Dict[str, Any]):
         """
@@ -91,15 +221,10 @@ class WechatMPService:
             msg_type = message.get("MsgType")
             
             if msg_type == "text":
-                content = message.get("Content", "").strip()
-                from_user = message.get("FromUserName")
+                response_text = await self.generate_answer(message)
                 
-                # 使用Orchestrator中的论文问答Agent进行处理
-                result = await orchestrator.process_query(content, agent_id="paper_qa")
-                response_text = result.get("response", "抱歉，我无法理解您的问题。")
-                
-                # 通过客服消息接口发送回复
-                await self.send_custom_message(from_user, "text", response_text)
+                # 通过客服消息接口发送回复，无法发送时暂存待领取
+                await self.deliver_answer(message, response_text)
                 
             elif msg_type == "event":
                 event = message.get("Event")
@@ -130,34 +255,28 @@ class WechatMPService:
             # 解析消息
             message = await self.parse_xml_message(xml_content)
             
+            # 微信重试推送的重复消息不再处理
+            if not await message_deduplicator.claim(message):
+                logger.info(f"忽略重复推送的消息: {message_deduplicator.message_key(message)}")
+                return ""
+            
+            # 命中关键词/菜单规则的固定意图直接回复，不经过Agent；
+            # “继续”用于领取未送达的回答，不参与规则匹配
+            is_continue = (
+                message.get("MsgType") == "text"
+                and message.get("Content", "").strip() in CONTINUE_KEYWORDS
+            )
+            rule_reply = None if is_continue else rule_engine.match(message, self.appid)
+            if rule_reply is not None:
+                return self.generate_reply(message, rule_reply)
+            
             # 获取消息类型
             msg_type = message.get("MsgType")
             
             # 处理不同类型的消息
             if msg_type == "text":
-                # 文本消息，获取内容
-                content = message.get("Content", "").strip()
-                from_user = message.get("FromUserName")
-                
-                # 检查是否正在处理该用户的消息
-                if from_user in self.processing_messages:
-                    # 如果正在处理，返回处理中的提示
-                    return self.generate_reply(
-                        message, 
-                        "您的问题正在处理中，请稍候..."
-                    )
-                
-                # 标记该用户的消息正在处理
-                self.processing_messages[from_user] = datetime.now()
-                
-                # 创建异步任务处理消息
-                asyncio.create_task(self.process_message_async(message))
-                
-                # 立即返回处理中的提示
-                return self.generate_reply(
-                    message, 
-                    "您的问题正在处理中，请稍候..."
-                )
+                # 文本消息，交给Agent处理
+                return await self._reply_text(message)
                 
             elif msg_type == "event":
                 # 处理事件消息
@@ -178,6 +297,9 @@ class WechatMPService:
             logger.error(f"自动回复出错: {str(e)}")
             return "很抱歉，处理您的消息时出现了错误，请稍后再试。"
     
+    async def _send_text_message(self, openid: str, content: str) -> Dict[str, Any]:
+        return await self.send_custom_message(openid, "text", content)
+    
     async def send_custom_message(self, openid: str, message_type: str, content: str) -> Dict[str, Any]:
         """
         发送客服消息
@@ -191,12 +313,6 @@ class WechatMPService:
             微信API返回结果
         """
         try:
-            # 获取access_token
-            access_token = await self.get_access_token()
-            
-            # 构造请求URL
-            url = f"{self.base_url}/cgi-bin/message/custom/send?access_token={access_token}"
-            
             # 构造请求数据
             if message_type == "text":
                 data = {
@@ -209,23 +325,23 @@ class WechatMPService:
             else:
                 raise ValueError(f"不支持的消息类型: {message_type}")
             
-            # 发送请求
-            async with httpx.AsyncClient() as client:
+            async def _send(access_token: str) -> Dict[str, Any]:
+                url = f"{self.base_url}/cgi-bin/message/custom/send?access_token={access_token}"
+                client = http_client.get_client()
                 response = await client.post(url, json=data)
                 response.raise_for_status()
-                
-                result = response.json()
-                if result.get("errcode", 0) != 0:
-                    raise Exception(f"发送客服消息失败: {result.get('errmsg')}")
-                
-                # 发送成功后，从处理列表中移除
-                if openid in self.processing_messages:
-                    del self.processing_messages[openid]
-                
-                return result
+                return response.json()
+            
+            # 发送请求，access_token失效时自动刷新重试
+            result = await self.token_manager.call(_send)
+            if result.get("errcode", 0) != 0:
+                raise WechatAPIError(
+                    result["errcode"],
+                    result.get("errmsg"),
+                    f"发送客服消息失败: {result.get('errmsg')}",
+                )
+            
+            return result
         except Exception as e:
             logger.error(f"发送客服消息失败: {str(e)}")
-            # 发送失败后，从处理列表中移除
-            if openid in self.processing_messages:
-                del self.processing_messages[openid]
             raise 
\ No newline at end of file
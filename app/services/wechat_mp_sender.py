@@ -0,0 +1,168 @@
+from typing import Dict, Any, Awaitable, Callable, Optional
+import asyncio
+import random
+import time
+
+import httpx
+
+from app.utils.logger import get_logger
+from app.utils.text import split_text
+
+logger = get_logger("wechat_mp")
+
+# 可重试的微信错误码：系统繁忙、接口分钟级调用频率超限
+TRANSIENT_ERRCODES = {-1, 45011}
+
+
+class WechatAPIError(Exception):
+    """
+    微信接口返回的错误
+    """
+
+    def __init__(self, errcode: int, errmsg: str, message: Optional[str] = None):
+        super().__init__(message or f"微信接口错误({errcode}): {errmsg}")
+        self.errcode = errcode
+        self.errmsg = errmsg
+
+
+class CustomMessageSendError(Exception):
+    """
+    客服消息未能全部发送，remaining为尚未送达的内容
+    """
+
+    def __init__(self, message: str, remaining: str):
+        super().__init__(message)
+        self.remaining = remaining
+
+
+class TokenBucket:
+    """
+    令牌桶限流
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        """
+        初始化令牌桶
+
+        Args:
+            rate: 每秒生成的令牌数
+            capacity: 桶容量，即允许的突发请求数
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """
+        获取一个令牌，没有可用令牌时等待
+        """
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class CustomMessageSender:
+    """
+    客服消息发送队列
+
+    - 超长文本按段落切分为多条，同一用户的消息按顺序发送
+    - 全局令牌桶限制发送速率，避免触发微信的频率限制
+    - 不同用户的发送在并发上限内同时进行
+    - 遇到系统繁忙等临时错误时指数退避重试
+    """
+
+    def __init__(
+        self,
+        send_text: Callable[[str, str], Awaitable[Dict[str, Any]]],
+        rate: float = 20,
+        burst: int = 40,
+        max_concurrency: int = 10,
+        max_retries: int = 3,
+        max_bytes: int = 2000,
+    ):
+        """
+        初始化发送队列
+
+        Args:
+            send_text: 发送单条文本客服消息的函数，参数为(openid, content)
+            rate: 每秒最多发送的消息数
+            burst: 允许的突发消息数
+            max_concurrency: 同时进行的最大发送数
+            max_retries: 临时错误的最大重试次数
+            max_bytes: 单条消息的最大字节数
+        """
+        self._send_text = send_text
+        self.max_retries = max_retries
+        self.max_bytes = max_bytes
+        self._bucket = TokenBucket(rate, burst)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._user_locks: Dict[str, asyncio.Lock] = {}
+        self._user_waiters: Dict[str, int] = {}
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+
+    async def send(self, openid: str, content: str):
+        """
+        发送文本消息，超长时拆分为多条按顺序发送
+
+        Raises:
+            CustomMessageSendError: 部分或全部内容发送失败时，携带未送达的内容
+        """
+        chunks = split_text(content, self.max_bytes)
+        lock = self._user_locks.setdefault(openid, asyncio.Lock())
+        self._user_waiters[openid] = self._user_waiters.get(openid, 0) + 1
+        try:
+            async with lock:
+                for index, chunk in enumerate(chunks):
+                    try:
+                        await self._send_chunk(openid, chunk)
+                    except Exception as e:
+                        self.failed += 1
+                        raise CustomMessageSendError(
+                            f"客服消息发送失败: {str(e)}",
+                            remaining="\n\n".join(chunks[index:]),
+                        ) from e
+        finally:
+            self._user_waiters[openid] -= 1
+            if not self._user_waiters[openid]:
+                del self._user_waiters[openid]
+                del self._user_locks[openid]
+
+    async def _send_chunk(self, openid: str, chunk: str):
+        attempt = 0
+        while True:
+            await self._bucket.acquire()
+            try:
+                async with self._semaphore:
+                    await self._send_text(openid, chunk)
+                self.sent += 1
+                return
+            except (WechatAPIError, httpx.TransportError) as e:
+                transient = isinstance(e, httpx.TransportError) or e.errcode in TRANSIENT_ERRCODES
+                if not transient or attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                self.retried += 1
+                delay = min(0.5 * 2 ** attempt, 8) * (0.5 + random.random() / 2)
+                logger.warning(f"客服消息发送遇到临时错误，{delay:.1f}秒后第{attempt}次重试: {str(e)}")
+                await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取发送统计
+        """
+        return {
+            "sent": self.sent,
+            "retried": self.retried,
+            "failed": self.failed,
+            "users_sending": len(self._user_locks),
+        }
@@ -1,13 +1,13 @@
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Union
 import json
 import time
 import random
 import string
 import hashlib
-import xml.etree.ElementTree as ET
 import uuid
 
-import httpx
+from app.utils.http_client import http_client
+from app.utils.wechat_xml import dict_to_xml, parse_xml
 
 
 class WechatPayService:
@@ -47,25 +47,13 @@ class WechatPayService:
         """
         将字典转换为XML
         """
-        xml = ["<xml>"]
-        for k, v in data.items():
-            if isinstance(v, str):
-                xml.append(f"<{k}><![CDATA[{v}]]></{k}>")
-            else:
-                xml.append(f"<{k}>{v}</{k}>")
-        xml.append("</xml>")
-        return "".join(xml)
+        return dict_to_xml(data)
     
-    async def _xml_to_dict(self, xml: str) -> Dict[str, Any]:
+    async def _xml_to_dict(self, xml: Union[str, bytes]) -> Dict[str, Any]:
         """
         将XML转换为字典
         """
-        root = ET.fromstring(xml)
-        data = {}
-        for child in root:
-            data[child.tag] = child.text
-        
-        return data
+        return parse_xml(xml)
     
     async def create_jsapi_order(
         self,
@@ -100,41 +88,41 @@ class WechatPayService:
         
         # 发送请求
         url = f"{self.api_url}/pay/unifiedorder"
-        async with httpx.AsyncClient() as client:
-            response = await client.post(url, content=xml_data)
-            response.raise_for_status()
-            
-            # 解析响应
-            result = await self._xml_to_dict(response.text)
-            
-            if result["return_code"] != "SUCCESS" or result["result_code"] != "SUCCESS":
-                error_msg = result.get("err_code_des") or result.get("return_msg")
-                raise Exception(f"创建订单失败: {error_msg}")
-            
-            # 生成支付参数
-            timestamp = str(int(time.time()))
-            noncestr = ''.join(random.choice(string.ascii_letters + string.digits) for _ in range(32))
-            package = f"prepay_id={result['prepay_id']}"
-            
-            pay_params = {
-                "appId": self.appid,
-                "timeStamp": timestamp,
-                "nonceStr": noncestr,
-                "package": package,
-                "signType": "MD5",
-            }
-            
-            # 生成签名
-            pay_params["paySign"] = self._generate_sign(pay_params)
-            
-            return pay_params
+        client = http_client.get_client()
+        response = await client.post(url, content=xml_data)
+        response.raise_for_status()
+        
+        # 解析响应
+        result = await self._xml_to_dict(response.text)
+        
+        if result["return_code"] != "SUCCESS" or result["result_code"] != "SUCCESS":
+            error_msg = result.get("err_code_des") or result.get("return_msg")
+            raise Exception(f"创建订单失败: {error_msg}")
+        
+        # 生成支付参数
+        timestamp = str(int(time.time()))
+        noncestr = ''.join(random.choice(string.ascii_letters + string.digits) for _ in range(32))
+        package = f"prepay_id={result['prepay_id']}"
+        
+        pay_params = {
+            "appId": self.appid,
+            "timeStamp": timestamp,
+            "nonceStr": noncestr,
+            "package": package,
+            "signType": "MD5",
+        }
+        
+        # 生成签名
+        pay_params["paySign"] = self._generate_sign(pay_params)
+        
+        return pay_params
     
     async def process_callback(self, xml_data: bytes) -> Dict[str, Any]:
         """
         处理支付结果通知
         """
         # 解析XML
-        result = await self._xml_to_dict(xml_data.decode("utf-8"))
+        result = await self._xml_to_dict(xml_data)
         
         # 验证签名
         sign = result.pop("sign", "")
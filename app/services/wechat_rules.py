@@ -0,0 +1,243 @@
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+import asyncio
+import re
+import time
+
+from sqlalchemy import func, select
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.auto_reply_rule import AutoReplyRule
+from app.utils.logger import get_logger
+
+logger = get_logger("wechat_mp")
+
+# (优先级, -规则ID)，越大越优先；同优先级时先创建的规则生效
+_RankedReply = Tuple[Tuple[int, int], int, str]
+
+
+def _normalize(text: str) -> str:
+    return text.strip().casefold()
+
+
+class _CompiledRules:
+    """
+    编译后的只读规则集：完全匹配和事件用哈希表，前缀用字符前缀树，正则按优先级排序
+    """
+
+    __slots__ = ("exact", "events", "prefix_root", "regexes", "count")
+
+    def __init__(self, rules: Iterable[Any]):
+        self.exact: Dict[str, _RankedReply] = {}
+        self.events: Dict[str, _RankedReply] = {}
+        self.prefix_root: Dict[str, Any] = {}
+        self.regexes: List[Tuple[Tuple[int, int], int, "re.Pattern", str]] = []
+        self.count = 0
+
+        for rule in rules:
+            rank = (rule.priority or 0, -rule.id)
+            entry = (rank, rule.id, rule.reply)
+            if rule.match_type == "exact":
+                self._keep_best(self.exact, _normalize(rule.pattern), entry)
+            elif rule.match_type == "event":
+                self._keep_best(self.events, rule.pattern.strip(), entry)
+            elif rule.match_type == "prefix":
+                node = self.prefix_root
+                for char in _normalize(rule.pattern):
+                    node = node.setdefault(char, {})
+                self._keep_best(node, None, entry)
+            elif rule.match_type == "regex":
+                try:
+                    pattern = re.compile(rule.pattern, re.IGNORECASE)
+                except re.error as e:
+                    logger.error(f"自动回复规则 {rule.id} 的正则无效，已跳过: {str(e)}")
+                    continue
+                self.regexes.append((rank, rule.id, pattern, rule.reply))
+            else:
+                logger.warning(f"自动回复规则 {rule.id} 的匹配方式未知: {rule.match_type}")
+                continue
+            self.count += 1
+
+        self.regexes.sort(key=lambda item: item[0], reverse=True)
+
+    @staticmethod
+    def _keep_best(table: Dict[Any, Any], key: Any, entry: _RankedReply):
+        current = table.get(key)
+        if current is None or entry[0] > current[0]:
+            table[key] = entry
+
+    def match_text(self, content: str) -> Optional[_RankedReply]:
+        text = _normalize(content)
+        best = self.exact.get(text)
+
+        # 沿前缀树走一遍，收集所有命中的前缀规则
+        node = self.prefix_root
+        for char in text:
+            node = node.get(char)
+            if node is None:
+                break
+            entry = node.get(None)
+            if entry is not None and (best is None or entry[0] > best[0]):
+                best = entry
+
+        # 正则已按优先级排序，只需检查优先级更高的部分
+        for rank, rule_id, pattern, reply in self.regexes:
+            if best is not None and rank <= best[0]:
+                break
+            if pattern.search(text):
+                best = (rank, rule_id, reply)
+                break
+        return best
+
+    def match_event(self, message: Dict[str, Any]) -> Optional[_RankedReply]:
+        event = message.get("Event") or ""
+        key = message.get("EventKey") if event == "CLICK" else event
+        return self.events.get((key or "").strip())
+
+
+class AutoReplyRuleEngine:
+    """
+    关键词/菜单自动回复规则引擎
+
+    规则存放在数据库中，加载后编译为内存中的只读结构，匹配时不访问数据库。
+    appid为空的规则对所有账号生效，其他规则只对所属的账号生效，按账号分别编译。
+    后台任务定期检查规则表是否变化，变化时重新编译并整体替换，无需重启服务。
+    """
+
+    def __init__(self, reload_interval: float):
+        self.reload_interval = reload_interval
+        # appid -> 编译后的规则集，键None为只含公共规则的规则集
+        self._rules: Dict[Optional[str], _CompiledRules] = {None: _CompiledRules(())}
+        self._count = 0
+        self._fingerprint = None
+        self._reload_task: Optional[asyncio.Task] = None
+        self._reload_lock = asyncio.Lock()
+        self.loaded_at: Optional[float] = None
+
+        self.lookups = 0
+        self.hits = 0
+        self.match_seconds = 0.0
+        self.rule_hits: Dict[int, int] = {}
+
+    def load(self, rules: Iterable[Any]):
+        """
+        编译规则并替换当前规则集
+
+        每个账号的规则集同时包含公共规则，匹配一次即可按优先级在两者之间选出最佳规则。
+        """
+        shared: List[Any] = []
+        by_appid: Dict[str, List[Any]] = {}
+        for rule in rules:
+            if rule.appid:
+                by_appid.setdefault(rule.appid, []).append(rule)
+            else:
+                shared.append(rule)
+
+        compiled: Dict[Optional[str], _CompiledRules] = {None: _CompiledRules(shared)}
+        count = compiled[None].count
+        for appid, app_rules in by_appid.items():
+            compiled[appid] = _CompiledRules(shared + app_rules)
+            count += compiled[appid].count - compiled[None].count
+        self._rules = compiled
+        self._count = count
+        self.loaded_at = time.time()
+        logger.info(f"自动回复规则已加载: {count} 条，其中 {len(by_appid)} 个账号有专属规则")
+
+    async def _fetch_fingerprint(self, db) -> Tuple[Any, ...]:
+        result = await db.execute(
+            select(func.count(), func.max(AutoReplyRule.id), func.max(AutoReplyRule.updated_at))
+        )
+        return tuple(result.one())
+
+    async def reload(self, force: bool = True) -> bool:
+        """
+        从数据库重新加载规则；force为False时仅在规则表变化后加载
+
+        Returns:
+            是否重新加载了规则
+        """
+        async with self._reload_lock:
+            async with AsyncSessionLocal() as db:
+                fingerprint = await self._fetch_fingerprint(db)
+                if not force and fingerprint == self._fingerprint:
+                    return False
+                rules = await AutoReplyRule.get_active(db)
+            self.load(rules)
+            self._fingerprint = fingerprint
+            return True
+
+    async def _reload_loop(self):
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                await self.reload(force=False)
+            except Exception as e:
+                logger.error(f"检查自动回复规则更新失败: {str(e)}")
+
+    async def start(self):
+        """
+        加载规则并启动后台热更新任务
+        """
+        try:
+            await self.reload()
+        except Exception as e:
+            logger.error(f"加载自动回复规则失败: {str(e)}")
+        if self.reload_interval > 0 and self._reload_task is None:
+            self._reload_task = asyncio.create_task(self._reload_loop())
+
+    async def stop(self):
+        """
+        停止后台热更新任务
+        """
+        if self._reload_task is not None:
+            self._reload_task.cancel()
+            try:
+                await self._reload_task
+            except asyncio.CancelledError:
+                pass
+            self._reload_task = None
+
+    def match(self, message: Dict[str, Any], appid: Optional[str] = None) -> Optional[str]:
+        """
+        为消息查找自动回复，未命中任何规则时返回None
+
+        Args:
+            message: 用户消息
+            appid: 接收消息的公众号，只匹配公共规则和该账号的规则
+        """
+        started = time.perf_counter()
+        rules = self._rules.get(appid) or self._rules[None]
+        msg_type = message.get("MsgType")
+        if msg_type == "text":
+            entry = rules.match_text(message.get("Content") or "")
+        elif msg_type == "event":
+            entry = rules.match_event(message)
+        else:
+            entry = None
+
+        self.lookups += 1
+        self.match_seconds += time.perf_counter() - started
+        if entry is None:
+            return None
+
+        _, rule_id, reply = entry
+        self.hits += 1
+        self.rule_hits[rule_id] = self.rule_hits.get(rule_id, 0) + 1
+        return reply
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        规则命中统计
+        """
+        return {
+            "rules": self._count,
+            "loaded_at": self.loaded_at,
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_rate": self.hits / self.lookups if self.lookups else 0.0,
+            "avg_match_us": self.match_seconds / self.lookups * 1e6 if self.lookups else 0.0,
+            "rule_hits": dict(self.rule_hits),
+        }
+
+
+rule_engine = AutoReplyRuleEngine(reload_interval=settings.WECHAT_MP_RULES_RELOAD_INTERVAL)
@@ -0,0 +1,214 @@
+from typing import Dict, Any, Awaitable, Callable, Optional
+import asyncio
+import json
+import time
+import uuid
+
+from app.core.config import settings
+from app.utils.http_client import http_client
+from app.utils.logger import get_logger
+from app.utils.shared_store import SharedStore, shared_store
+
+logger = get_logger("wechat_token")
+
+# access_token无效或已过期时微信返回的错误码
+TOKEN_INVALID_ERRCODES = {40001, 40014, 42001}
+
+
+class AccessTokenManager:
+    """
+    微信access_token管理器
+
+    同一个appid在进程内只有一个管理器实例：
+    - 缓存token直到接近expires_in，临近过期时在后台提前刷新
+    - 并发的刷新请求合并为一次（single-flight）
+    - 接口返回token失效错误码时使缓存失效并重试一次
+    - 配置共享存储后，多个进程共用同一个token，避免互相刷新导致旧token失效
+    """
+
+    def __init__(
+        self,
+        appid: str,
+        secret: str,
+        base_url: str = "https://api.weixin.qq.com",
+        refresh_margin: int = 300,
+        store: Optional[SharedStore] = None,
+    ):
+        """
+        初始化管理器
+
+        Args:
+            appid: 应用ID
+            secret: 应用密钥
+            base_url: 微信接口地址
+            refresh_margin: 距离过期多少秒时开始后台刷新
+            store: 跨进程共享存储，None表示仅在进程内缓存
+        """
+        self.appid = appid
+        self.secret = secret
+        self.base_url = base_url
+        self.refresh_margin = refresh_margin
+        self.store = store
+        self._token: Optional[str] = None
+        self._expires_at = 0.0
+        self._refresh_task: Optional[asyncio.Task] = None
+        # 最近一次被判定失效的token，刷新时不再从共享存储中采用
+        self._rejected_token: Optional[str] = None
+        self.fetch_count = 0
+
+    @property
+    def _store_key(self) -> str:
+        return f"wechat:access_token:{self.appid}"
+
+    def _is_usable(self, now: float) -> bool:
+        # 预留60秒，避免使用即将过期的token
+        return self._token is not None and now < self._expires_at - 60
+
+    async def get_token(self) -> str:
+        """
+        获取access_token，优先使用缓存
+        """
+        now = time.time()
+        if self._is_usable(now):
+            if now >= self._expires_at - self.refresh_margin:
+                # 临近过期，后台刷新，本次仍使用当前token
+                self._start_refresh()
+            return self._token
+
+        return await asyncio.shield(self._start_refresh())
+
+    def invalidate(self, token: Optional[str] = None):
+        """
+        使缓存的token失效
+
+        Args:
+            token: 调用方使用的token，仅当其与缓存一致时才失效，避免误删刚刷新的token
+        """
+        if token is None or token == self._token:
+            self._rejected_token = self._token
+            self._token = None
+            self._expires_at = 0.0
+
+    async def call(self, func: Callable[[str], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """
+        使用access_token调用微信接口，token失效时刷新后重试一次
+
+        Args:
+            func: 接收access_token并返回微信接口JSON结果的协程函数
+
+        Returns:
+            微信接口返回结果
+        """
+        token = await self.get_token()
+        result = await func(token)
+        if result.get("errcode") in TOKEN_INVALID_ERRCODES:
+            logger.warning(f"appid {self.appid} 的access_token已失效(errcode={result['errcode']})，刷新后重试")
+            self.invalidate(token)
+            token = await self.get_token()
+            result = await func(token)
+        return result
+
+    def _start_refresh(self) -> asyncio.Task:
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh())
+        return self._refresh_task
+
+    async def _refresh(self) -> str:
+        stale_token = self._token
+        try:
+            if self.store:
+                token, expires_at = await self._refresh_shared(stale_token)
+            else:
+                token, expires_at = await self._fetch()
+        except Exception as e:
+            logger.error(f"刷新appid {self.appid} 的access_token失败: {str(e)}")
+            if self._is_usable(time.time()):
+                # 后台刷新失败时继续使用尚未过期的token
+                return self._token
+            raise
+
+        self._token = token
+        self._expires_at = expires_at
+        return token
+
+    async def _refresh_shared(self, stale_token: Optional[str]):
+        """
+        通过共享存储刷新：其他进程已刷新时直接采用，否则抢占刷新锁后再请求微信接口
+        """
+        lock_key = f"{self._store_key}:lock"
+        for _ in range(50):
+            cached = await self.store.get(self._store_key)
+            if cached:
+                token, expires_at = self._decode(cached)
+                if token not in (stale_token, self._rejected_token) and expires_at - time.time() > self.refresh_margin:
+                    return token, expires_at
+
+            # 锁的值唯一，刷新超过锁的有效期后不会误删其他进程持有的锁
+            lock_value = uuid.uuid4().hex
+            if await self.store.add(lock_key, lock_value, ttl=10):
+                try:
+                    token, expires_at = await self._fetch()
+                    await self.store.set(
+                        self._store_key,
+                        self._encode(token, expires_at),
+                        ttl=max(expires_at - time.time(), 1),
+                    )
+                    return token, expires_at
+                finally:
+                    await self.store.delete(lock_key, value=lock_value)
+
+            # 其他进程正在刷新，等待其结果
+            await asyncio.sleep(0.1)
+
+        return await self._fetch()
+
+    async def _fetch(self):
+        """
+        请求微信接口获取新的access_token
+        """
+        url = f"{self.base_url}/cgi-bin/token"
+        params = {
+            "grant_type": "client_credential",
+            "appid": self.appid,
+            "secret": self.secret,
+        }
+
+        client = http_client.get_client()
+        response = await client.get(url, params=params)
+        response.raise_for_status()
+
+        result = response.json()
+        if "errcode" in result and result["errcode"] != 0:
+            raise Exception(f"获取access_token失败: {result['errmsg']}")
+
+        self.fetch_count += 1
+        logger.info(f"已获取appid {self.appid} 的新access_token")
+        return result["access_token"], time.time() + int(result.get("expires_in", 7200))
+
+    @staticmethod
+    def _encode(token: str, expires_at: float) -> str:
+        return json.dumps({"token": token, "expires_at": expires_at})
+
+    @staticmethod
+    def _decode(value: str):
+        data = json.loads(value)
+        return data["token"], data["expires_at"]
+
+
+# 进程内按appid共享的管理器
+_managers: Dict[str, AccessTokenManager] = {}
+
+
+def get_token_manager(appid: str, secret: str) -> AccessTokenManager:
+    """
+    获取指定appid的access_token管理器
+    """
+    manager = _managers.get(appid)
+    if manager is None or manager.secret != secret:
+        manager = _managers[appid] = AccessTokenManager(
+            appid,
+            secret,
+            refresh_margin=settings.WECHAT_TOKEN_REFRESH_MARGIN,
+            store=shared_store,
+        )
+    return manager
@@ -0,0 +1,45 @@
+from typing import Hashable
+import hashlib
+import math
+
+
+class BloomFilter:
+    """
+    布隆过滤器：判定不存在时一定不存在，判定存在时有小概率误判
+
+    位数组和哈希函数个数按预计容量与误判率计算，
+    k个哈希值由一次blake2b摘要的两个64位片段组合得到（双重哈希）。
+    """
+
+    def __init__(self, capacity: int = 10000, error_rate: float = 0.001):
+        """
+        初始化过滤器
+
+        Args:
+            capacity: 预计元素个数
+            error_rate: 达到预计容量时的误判率
+        """
+        capacity = max(capacity, 1)
+        self.size = max(int(-capacity * math.log(error_rate) / (math.log(2) ** 2)), 8)
+        self.hash_count = max(int(round(self.size / capacity * math.log(2))), 1)
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: Hashable):
+        digest = hashlib.blake2b(str(key).encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, key: Hashable):
+        """
+        加入元素
+        """
+        for pos in self._positions(key):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key: Hashable) -> bool:
+        bits = self._bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
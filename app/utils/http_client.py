@@ -0,0 +1,91 @@
+from typing import Dict, Any, Optional
+
+import httpx
+
+from app.core.config import settings
+from app.utils.logger import get_logger
+
+logger = get_logger("app")
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class HttpClientManager:
+    """
+    应用级共享的HTTP客户端
+
+    所有微信接口调用共用一个带连接池的 httpx.AsyncClient，
+    复用keep-alive连接，避免每次请求都重新建立TCP和TLS连接。
+    """
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        self._http2 = False
+        self._requests = 0
+        self._new_connections = 0
+        self._tls_handshakes = 0
+
+    def get_client(self) -> httpx.AsyncClient:
+        """
+        获取共享客户端，首次调用时创建
+        """
+        if self._client is None or self._client.is_closed:
+            if settings.HTTP_CLIENT_HTTP2 and not HTTP2_AVAILABLE:
+                logger.warning("已配置HTTP_CLIENT_HTTP2，但未安装h2（httpx[http2]），使用HTTP/1.1")
+            self._http2 = settings.HTTP_CLIENT_HTTP2 and HTTP2_AVAILABLE
+            self._client = httpx.AsyncClient(
+                http2=self._http2,
+                timeout=httpx.Timeout(
+                    settings.HTTP_CLIENT_TIMEOUT,
+                    connect=settings.HTTP_CLIENT_CONNECT_TIMEOUT,
+                ),
+                limits=httpx.Limits(
+                    max_connections=settings.HTTP_CLIENT_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.HTTP_CLIENT_MAX_KEEPALIVE,
+                    keepalive_expiry=settings.HTTP_CLIENT_KEEPALIVE_EXPIRY,
+                ),
+                event_hooks={"request": [self._on_request]},
+            )
+            logger.info(f"共享HTTP客户端已创建 (HTTP/2: {self._http2})")
+        return self._client
+
+    async def close(self):
+        """
+        关闭共享客户端及其连接池
+        """
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
+    async def _on_request(self, request: httpx.Request):
+        self._requests += 1
+        request.extensions["trace"] = self._trace
+
+    async def _trace(self, event_name: str, info: Dict[str, Any]):
+        # 只有新建连接时才会触发connect/TLS事件，借此统计连接复用情况
+        if event_name == "connection.connect_tcp.started":
+            self._new_connections += 1
+        elif event_name == "connection.start_tls.started":
+            self._tls_handshakes += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取连接复用统计
+        """
+        reused = max(self._requests - self._new_connections, 0)
+        return {
+            "http2": self._http2,
+            "requests": self._requests,
+            "new_connections": self._new_connections,
+            "tls_handshakes": self._tls_handshakes,
+            "reused_connections": reused,
+            "reuse_ratio": round(reused / self._requests, 4) if self._requests else 0.0,
+        }
+
+
+# 创建单例实例
+http_client = HttpClientManager()
@@ -52,7 +52,7 @@ class LLMTool:
             proxies = None
             if self.http_proxy:
                 proxies = self.http_proxy
-                logger.info(f"使用OpenAI API代理: {self.http_proxy}")
+                logger.debug(f"使用OpenAI API代理: {self.http_proxy}")
             
             # 创建httpx客户端与超时设置
             timeout = httpx.Timeout(360.0, connect=360.0)
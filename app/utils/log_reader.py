@@ -0,0 +1,287 @@
+from typing import AsyncIterator, Iterator, List, NamedTuple, Optional, Tuple
+from collections import deque
+from pathlib import Path
+import asyncio
+import gzip
+import json
+import os
+import re
+
+from app.utils.logger import LOG_BACKUP_COUNT, LOG_LEVELS
+
+# 从文件末尾向前读取的块大小，跟踪日志时每次最多读取的字节数也相同
+_BLOCK_SIZE = 64 * 1024
+# 跟踪日志时检查新内容的间隔（秒）
+_FOLLOW_INTERVAL = 0.5
+
+_LEVEL_RE = re.compile(r" - (DEBUG|INFO|WARNING|ERROR|CRITICAL) - ")
+
+
+def log_files(log_file: Path) -> List[Path]:
+    """
+    获取日志文件及其轮转出的旧文件（.1到.5，可能经过gzip压缩），按从新到旧排列
+    """
+    files = [log_file] if log_file.exists() else []
+    for i in range(1, LOG_BACKUP_COUNT + 1):
+        for rotated in (Path(f"{log_file}.{i}"), Path(f"{log_file}.{i}.gz")):
+            if rotated.exists():
+                files.append(rotated)
+                break
+    return files
+
+
+def line_level(line: str) -> Optional[int]:
+    """
+    解析日志行的级别，支持文本格式和JSON格式；异常堆栈等续行返回None
+    """
+    if line.startswith("{"):
+        try:
+            level = json.loads(line).get("level", "")
+        except (ValueError, AttributeError):
+            return None
+        return LOG_LEVELS.get(str(level).lower())
+    match = _LEVEL_RE.search(line)
+    return LOG_LEVELS[match.group(1).lower()] if match else None
+
+
+class LogPosition(NamedTuple):
+    """
+    日志文件的标识（设备号, inode）和读取位置
+    """
+    file_id: Tuple[int, int]
+    offset: int
+
+
+def position(log_file: Path) -> Optional[LogPosition]:
+    """
+    获取日志文件当前的末尾位置，文件不存在时返回None
+
+    tail读到这个位置为止、follow从这个位置开始，两者之间写入的日志既不遗漏也不重复。
+    """
+    try:
+        stat = log_file.stat()
+    except OSError:
+        return None
+    return LogPosition((stat.st_dev, stat.st_ino), stat.st_size)
+
+
+def _reverse_lines(path: Path, block_size: int = _BLOCK_SIZE, end: Optional[int] = None) -> Iterator[str]:
+    """
+    从文件末尾（或指定的位置end）开始逐行倒序读取，每次只读入一个块
+
+    gzip压缩的文件不能从末尾定位，只能完整解压后倒序返回。
+    """
+    if path.suffix == ".gz":
+        with gzip.open(path, "rt", encoding="utf-8", errors="replace") as f:
+            lines = f.read().splitlines()
+        yield from reversed(lines)
+        return
+
+    with open(path, "rb") as f:
+        offset = f.seek(0, os.SEEK_END)
+        if end is not None:
+            offset = min(offset, end)
+        remainder = b""
+        while offset > 0:
+            size = min(block_size, offset)
+            offset -= size
+            f.seek(offset)
+            chunk = f.read(size) + remainder
+            lines = chunk.split(b"\n")
+            # 第一段可能是不完整的行，留到读入前一个块后再拼接
+            remainder = lines.pop(0)
+            for line in reversed(lines):
+                if line:
+                    yield line.decode("utf-8", errors="replace")
+        if remainder:
+            yield remainder.decode("utf-8", errors="replace")
+
+
+class _RecordFilter:
+    """
+    按最低级别和子串过滤日志
+
+    异常堆栈等续行没有级别，与其前面的日志行视为同一条记录一起保留或丢弃；
+    级别和子串都只检查记录的首行，tail和follow的结果因此一致。
+    """
+
+    def __init__(self, level: Optional[str] = None, contains: Optional[str] = None):
+        self.min_level = LOG_LEVELS.get(level.lower()) if level else None
+        self.contains = contains or None
+
+    @property
+    def active(self) -> bool:
+        return self.min_level is not None or self.contains is not None
+
+    def match(self, first_line: str, level: Optional[int]) -> bool:
+        if self.min_level is not None and (level is None or level < self.min_level):
+            return False
+        if self.contains is not None and self.contains not in first_line:
+            return False
+        return True
+
+
+def tail(
+    log_file: Path,
+    lines: int = 100,
+    level: Optional[str] = None,
+    contains: Optional[str] = None,
+    end: Optional[LogPosition] = None,
+) -> List[str]:
+    """
+    读取日志最后N行（按时间正序），当前文件不够时继续读取轮转出的旧文件
+
+    只从文件末尾向前读取需要的部分，不读入整个文件。
+
+    Args:
+        log_file: 日志文件路径
+        lines: 返回的行数
+        level: 最低日志级别
+        contains: 只返回首行包含该子串的记录
+        end: 只读到该位置为止（见position）。位置所在的文件已经轮转时，跳过比它新的文件，
+            从轮转出的旧文件的该位置开始读；找不到该文件（已被压缩或删除）时读到末尾
+    """
+    record_filter = _RecordFilter(level, contains)
+    result: deque = deque()
+    pending: List[str] = []
+    files = log_files(log_file)
+    end_file = None
+    if end is not None:
+        file_ids = [_file_id(path) for path in files]
+        if end.file_id in file_ids:
+            files = files[file_ids.index(end.file_id):]
+            end_file = files[0]
+    for path in files:
+        for line in _reverse_lines(path, end=end.offset if path == end_file else None):
+            if not record_filter.active:
+                result.appendleft(line)
+            else:
+                pending.append(line)
+                record_level = line_level(line)
+                if record_level is None:
+                    continue
+                # 倒序读到带级别的行时，一条记录（含其后的续行）已读取完整
+                record = pending[::-1]
+                pending = []
+                if record_filter.match(record[0], record_level):
+                    result.extendleft(reversed(record))
+            if len(result) >= lines:
+                return list(result)[-lines:]
+    return list(result)
+
+
+def _file_id(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return stat.st_dev, stat.st_ino
+
+
+class _Follower:
+    """
+    跟踪日志时的文件操作（打开、读取、检查轮转和截断），均为同步调用，由follow放到线程中执行
+    """
+
+    def __init__(self, log_file: Path, start: Optional[LogPosition], chunk_size: int):
+        self.log_file = log_file
+        self.start = start
+        self.chunk_size = chunk_size
+        self._file = None
+        self._file_id: Optional[Tuple[int, int]] = None
+        # 轮转后的新文件、开始跟踪时还不存在的文件都从头读取
+        self._from_beginning = False
+
+    def _open(self) -> bool:
+        path = self.log_file
+        if self.start is not None and not self._from_beginning:
+            rotated = Path(f"{self.log_file}.1")
+            if _file_id(self.log_file) != self.start.file_id and _file_id(rotated) == self.start.file_id:
+                # 记下位置之后文件已经轮转，先读完旧文件中该位置之后的内容，读完后按轮转切换到新文件
+                path = rotated
+        try:
+            f = open(path, "rb")
+        except FileNotFoundError:
+            return False
+        stat = os.fstat(f.fileno())
+        self._file_id = (stat.st_dev, stat.st_ino)
+        if self._from_beginning:
+            pass
+        elif self.start is not None:
+            # 找不到记下位置的文件（已被压缩或删除）时，当前文件的内容都是之后写入的
+            f.seek(self.start.offset if self.start.file_id == self._file_id else 0)
+        else:
+            f.seek(0, os.SEEK_END)
+        self.start = None
+        self._from_beginning = False
+        self._file = f
+        return True
+
+    def read(self) -> bytes:
+        """
+        读取新写入的内容，每次最多chunk_size字节，没有新内容时返回空
+        """
+        if self._file is None and not self._open():
+            self._from_beginning = True
+            return b""
+        data = self._file.read(self.chunk_size)
+        if data:
+            return data
+        if _file_id(self.log_file) not in (None, self._file_id):
+            # 已轮转且旧文件的剩余内容已读完，切换到新文件并从头读取
+            self.close()
+            self._from_beginning = True
+            return self.read()
+        if self._file.tell() > os.fstat(self._file.fileno()).st_size:
+            # 文件被截断
+            self._file.seek(0)
+        return b""
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+async def follow(
+    log_file: Path,
+    level: Optional[str] = None,
+    contains: Optional[str] = None,
+    interval: float = _FOLLOW_INTERVAL,
+    start: Optional[LogPosition] = None,
+    chunk_size: int = _BLOCK_SIZE,
+) -> AsyncIterator[str]:
+    """
+    持续输出日志文件中新写入的行
+
+    从start（见position）开始，未指定时从当前文件末尾开始。文件轮转（改名为.1并新建）后，
+    先读完旧文件剩余的内容，再从头读取新文件，轮转前后的日志不会遗漏或重复。
+    按记录过滤时，续行跟随其所属记录的首行是否匹配，与tail的规则相同。
+    文件操作在线程中执行，每次最多读取chunk_size字节，不阻塞事件循环。
+    """
+    record_filter = _RecordFilter(level, contains)
+    current_level: Optional[int] = None
+    current_match = True
+    follower = _Follower(log_file, start, chunk_size)
+    buffer = b""
+    try:
+        while True:
+            data = await asyncio.to_thread(follower.read)
+            if not data:
+                await asyncio.sleep(interval)
+                continue
+
+            buffer += data
+            *complete, buffer = buffer.split(b"\n")
+            for raw in complete:
+                if not raw:
+                    continue
+                line = raw.decode("utf-8", errors="replace")
+                parsed = line_level(line)
+                if parsed is not None:
+                    current_level = parsed
+                    current_match = record_filter.match(line, current_level)
+                if current_match:
+                    yield line
+    finally:
+        follower.close()
@@ -1,9 +1,20 @@
 import os
+import atexit
+import gzip
+import json
 import logging
-from logging.handlers import RotatingFileHandler
+import queue
+import shutil
+import uuid
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 import sys
 from pathlib import Path
 
+from app.core.config import settings
+
 # 创建日志目录
 log_dir = Path("logs")
 log_dir.mkdir(exist_ok=True)
@@ -21,6 +32,116 @@ LOG_LEVELS = {
     "critical": logging.CRITICAL
 }
 
+LOG_MAX_BYTES = 10 * 1024 * 1024  # 10MB
+LOG_BACKUP_COUNT = 5
+
+# 当前请求的请求ID和链路追踪ID，由RequestContextMiddleware设置
+request_id_var: ContextVar[str] = ContextVar("request_id", default="")
+trace_id_var: ContextVar[str] = ContextVar("trace_id", default="")
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    每条日志输出为一行JSON，附带请求ID和链路追踪ID
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", "")
+        if request_id:
+            data["request_id"] = request_id
+        trace_id = getattr(record, "trace_id", "")
+        if trace_id:
+            data["trace_id"] = trace_id
+        return json.dumps(data, ensure_ascii=False)
+
+
+def _gzip_namer(name: str) -> str:
+    return name + ".gz"
+
+
+def _gzip_rotator(source: str, dest: str):
+    with open(source, "rb") as f_in, gzip.open(dest, "wb") as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
+
+
+class _LogQueueHandler(QueueHandler):
+    """
+    把日志记录放入队列，由后台线程写入目标处理器
+
+    在调用方线程中完成消息格式化并记下请求上下文，入队从不阻塞，也不在调用方写文件。
+    WARNING及以下级别的日志只能使用队列的前limit个位置，之后的容量留给ERROR及以上的日志，
+    低级别日志大量积压时错误日志仍能入队；预留容量也用完时才丢弃，两类分别计数。
+    """
+
+    def __init__(self, log_queue: queue.Queue, route: str, limit: Optional[int] = None):
+        super().__init__(log_queue)
+        self.route = route
+        self.limit = limit if limit is not None else log_queue.maxsize
+        self.dropped = 0
+        self.dropped_errors = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = super().prepare(record)
+        record.log_route = self.route
+        record.request_id = request_id_var.get()
+        record.trace_id = trace_id_var.get()
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        if record.levelno < logging.ERROR and self.limit and self.queue.qsize() >= self.limit:
+            self.dropped += 1
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            if record.levelno < logging.ERROR:
+                self.dropped += 1
+            else:
+                self.dropped_errors += 1
+
+
+class _RouteHandler(logging.Handler):
+    """
+    后台写入线程中按记录来源的日志记录器分发到对应的控制台和文件处理器
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.routes = {}
+
+    def handle(self, record: logging.LogRecord):
+        for handler in self.routes.get(getattr(record, "log_route", None), ()):
+            if record.levelno >= handler.level:
+                handler.handle(record)
+        return True
+
+    def emit(self, record: logging.LogRecord):
+        pass
+
+
+def _formatter() -> logging.Formatter:
+    return JsonFormatter() if settings.LOG_JSON else logging.Formatter(LOG_FORMAT, DATE_FORMAT)
+
+
+# 队列容量为LOG_QUEUE_SIZE加上只给ERROR及以上日志使用的预留容量
+_log_queue: queue.Queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE + settings.LOG_QUEUE_ERROR_RESERVE)
+_route_handler = _RouteHandler()
+_console_handler = logging.StreamHandler(sys.stdout)
+_console_handler.setFormatter(_formatter())
+# 唯一的后台写入线程，所有控制台输出、文件写入和日志轮转都在这里进行
+_listener = QueueListener(_log_queue, _route_handler)
+_listener.start()
+atexit.register(_listener.stop)
+_queue_handlers: List[_LogQueueHandler] = []
+
+
 def setup_logger(name, log_file=None, level="info"):
     """
     设置一个命名日志记录器
@@ -41,27 +162,88 @@ def setup_logger(name, log_file=None, level="info"):
     if logger.handlers:
         return logger
     
-    # 创建格式器
-    formatter = logging.Formatter(LOG_FORMAT, DATE_FORMAT)
-    
     # 控制台处理器
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
+    handlers = [_console_handler]
     
-    # 文件处理器（如果指定）
+    # 文件处理器（如果指定），轮转在后台写入线程中进行，可选压缩轮转出的旧文件
     if log_file:
         file_path = log_dir / log_file
         file_handler = RotatingFileHandler(
-            file_path, 
-            maxBytes=10 * 1024 * 1024,  # 10MB
-            backupCount=5
+            file_path,
+            maxBytes=LOG_MAX_BYTES,
+            backupCount=LOG_BACKUP_COUNT,
+            encoding="utf-8",
         )
-        file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
+        if settings.LOG_COMPRESS_ROTATED:
+            file_handler.namer = _gzip_namer
+            file_handler.rotator = _gzip_rotator
+        file_handler.setFormatter(_formatter())
+        handlers.append(file_handler)
+    
+    # 日志记录器本身只把记录放入队列
+    _route_handler.routes[name] = handlers
+    queue_handler = _LogQueueHandler(_log_queue, name, limit=settings.LOG_QUEUE_SIZE)
+    _queue_handlers.append(queue_handler)
+    logger.addHandler(queue_handler)
     
     return logger
 
+
+class RequestContextMiddleware:
+    """
+    为每个请求设置请求ID和链路追踪ID，写入之后的日志记录，并在响应头X-Request-ID中返回请求ID
+
+    请求ID取自请求头X-Request-ID，没有时生成；追踪ID取自W3C traceparent请求头，没有时与请求ID相同。
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        request_id = headers.get(b"x-request-id", b"").decode("latin-1")[:64] or uuid.uuid4().hex
+        traceparent = headers.get(b"traceparent", b"").decode("latin-1").split("-")
+        trace_id = traceparent[1] if len(traceparent) >= 4 and len(traceparent[1]) == 32 else request_id
+        request_id_var.set(request_id)
+        trace_id_var.set(trace_id)
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-request-id", request_id.encode("latin-1")))
+                message = dict(message, headers=headers)
+            await send(message)
+
+        await self.app(scope, receive, send_with_request_id)
+
+
+def log_stats() -> Dict[str, Any]:
+    """
+    获取日志队列统计：积压的记录数、队列容量（含错误日志的预留容量）、
+    因队列已满丢弃的日志数（按日志记录器）和丢弃的ERROR及以上日志数
+    """
+    dropped = {handler.route: handler.dropped for handler in _queue_handlers if handler.dropped}
+    return {
+        "queued": _log_queue.qsize(),
+        "capacity": _log_queue.maxsize,
+        "error_reserve": settings.LOG_QUEUE_ERROR_RESERVE,
+        "dropped": sum(dropped.values()),
+        "dropped_by_logger": dropped,
+        "dropped_errors": sum(handler.dropped_errors for handler in _queue_handlers),
+    }
+
+
+def flush_logs():
+    """
+    等待队列中的日志全部写出（用于测试和进程退出前）
+    """
+    _listener.stop()
+    _listener.start()
+
 # 预配置的日志记录器
 app_logger = setup_logger("app", "app.log")
 api_logger = setup_logger("api", "api.log")
@@ -89,4 +271,4 @@ def get_logger(name=None):
         return llm_logger
     
     # 为其他模块创建新的日志记录器
-    return setup_logger(name, f"{name}.log") 
\ No newline at end of file
+    return setup_logger(name, f"{name}.log")
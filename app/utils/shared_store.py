@@ -0,0 +1,234 @@
+from typing import List, Optional
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from app.core.config import settings
+from app.utils.logger import get_logger
+
+logger = get_logger("app")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS shared_kv (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_shared_kv_expires_at ON shared_kv (expires_at);
+"""
+
+# DELETE ... RETURNING需要SQLite 3.35及以上
+_SUPPORTS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+
+class SharedStore:
+    """
+    基于SQLite的跨进程键值存储
+
+    用于在同一台机器上的多个Web/Worker进程之间共享少量带过期时间的状态
+    （如access_token），不依赖任何外部服务。
+    过期的键只在同一个键再次写入时被覆盖，消息去重等每次都使用新键的记录需要由
+    start启动的后台任务定期清理。
+    """
+
+    def __init__(self, path: str, purge_interval: float = 300):
+        """
+        初始化存储
+
+        Args:
+            path: SQLite数据库文件路径
+            purge_interval: 后台清理过期键的间隔（秒），0表示不启动清理任务
+        """
+        self.path = path
+        self.purge_interval = purge_interval
+        self._purge_task: Optional[asyncio.Task] = None
+        self._local = threading.local()
+        self._schema_ready = False
+        self._schema_lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        """
+        获取当前线程的数据库连接
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        if not self._schema_ready:
+            with self._schema_lock:
+                if not self._schema_ready:
+                    conn.executescript(_SCHEMA)
+                    self._schema_ready = True
+        return conn
+
+    def _get(self, key: str) -> Optional[str]:
+        row = self._connection().execute(
+            "SELECT value FROM shared_kv WHERE key = ? AND expires_at > ?",
+            (key, time.time()),
+        ).fetchone()
+        return row[0] if row else None
+
+    def _set(self, key: str, value: str, ttl: float) -> None:
+        self._connection().execute(
+            "INSERT INTO shared_kv (key, value, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at",
+            (key, value, time.time() + ttl),
+        )
+
+    def _add(self, key: str, value: str, ttl: float) -> bool:
+        now = time.time()
+        cursor = self._connection().execute(
+            "INSERT INTO shared_kv (key, value, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at "
+            "WHERE shared_kv.expires_at <= ?",
+            (key, value, now + ttl, now),
+        )
+        return cursor.rowcount > 0
+
+    def _delete(self, key: str, value: Optional[str] = None) -> None:
+        if value is None:
+            self._connection().execute("DELETE FROM shared_kv WHERE key = ?", (key,))
+        else:
+            self._connection().execute(
+                "DELETE FROM shared_kv WHERE key = ? AND value = ?", (key, value)
+            )
+
+    def _append(self, key: str, item: str, ttl: float, prepend: bool) -> None:
+        conn = self._connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT value FROM shared_kv WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+            items = json.loads(row[0]) if row else []
+            if prepend:
+                items.insert(0, item)
+            else:
+                items.append(item)
+            conn.execute(
+                "INSERT INTO shared_kv (key, value, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at",
+                (key, json.dumps(items, ensure_ascii=False), now + ttl),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _pop(self, key: str) -> Optional[str]:
+        conn = self._connection()
+        if _SUPPORTS_RETURNING:
+            row = conn.execute(
+                "DELETE FROM shared_kv WHERE key = ? RETURNING value, expires_at", (key,)
+            ).fetchone()
+        else:
+            # 旧版本SQLite在写事务中先读后删，保证只有一个进程取到值
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT value, expires_at FROM shared_kv WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    conn.execute("DELETE FROM shared_kv WHERE key = ?", (key,))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        if row is None or row[1] <= time.time():
+            return None
+        return row[0]
+
+    def _purge(self) -> int:
+        cursor = self._connection().execute(
+            "DELETE FROM shared_kv WHERE expires_at <= ?", (time.time(),)
+        )
+        return cursor.rowcount
+
+    async def get(self, key: str) -> Optional[str]:
+        """
+        获取未过期的值，不存在时返回None
+        """
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        """
+        写入值，ttl秒后过期
+        """
+        await asyncio.to_thread(self._set, key, value, ttl)
+
+    async def add(self, key: str, value: str, ttl: float) -> bool:
+        """
+        仅当键不存在或已过期时写入，返回是否写入成功
+        """
+        return await asyncio.to_thread(self._add, key, value, ttl)
+
+    async def delete(self, key: str, value: Optional[str] = None) -> None:
+        """
+        删除键，指定value时仅在当前值等于value时删除
+        """
+        await asyncio.to_thread(self._delete, key, value)
+
+    async def append(self, key: str, item: str, ttl: float, prepend: bool = False) -> None:
+        """
+        向键对应的列表追加元素（prepend为True时插入到开头），并刷新过期时间
+        """
+        await asyncio.to_thread(self._append, key, item, ttl, prepend)
+
+    async def pop_list(self, key: str) -> List[str]:
+        """
+        取出并删除键对应的列表
+        """
+        value = await asyncio.to_thread(self._pop, key)
+        return json.loads(value) if value else []
+
+    async def purge(self) -> int:
+        """
+        清理已过期的键
+        """
+        return await asyncio.to_thread(self._purge)
+
+    async def _purge_loop(self):
+        while True:
+            await asyncio.sleep(self.purge_interval)
+            try:
+                purged = await self.purge()
+            except Exception as e:
+                logger.error(f"清理共享存储中过期的键失败: {str(e)}")
+                continue
+            if purged:
+                logger.info(f"清理共享存储中过期的键 {purged} 个")
+
+    async def start(self):
+        """
+        启动定期清理过期键的后台任务
+        """
+        if self.purge_interval > 0 and self._purge_task is None:
+            self._purge_task = asyncio.create_task(self._purge_loop())
+
+    async def stop(self):
+        """
+        停止后台清理任务
+        """
+        if self._purge_task is not None:
+            self._purge_task.cancel()
+            try:
+                await self._purge_task
+            except asyncio.CancelledError:
+                pass
+            self._purge_task = None
+
+
+# 未配置路径时为None，各模块退回到进程内存储
+shared_store = (
+    SharedStore(settings.SHARED_STORE_PATH, purge_interval=settings.SHARED_STORE_PURGE_INTERVAL)
+    if settings.SHARED_STORE_PATH
+    else None
+)
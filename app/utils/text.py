@@ -0,0 +1,45 @@
+from typing import List, Tuple
+
+# 按优先级排列的断点：段落、换行、句末标点
+_BREAKS = ("\n\n", "\n", "。", "！", "？", ". ", "! ", "? ")
+
+
+def _split_point(text: str, max_bytes: int) -> int:
+    """
+    计算不超过max_bytes（UTF-8编码）的切分位置，尽量落在段落或句子边界上
+    """
+    if len(text.encode("utf-8")) <= max_bytes:
+        return len(text)
+
+    limit = len(text.encode("utf-8")[:max_bytes].decode("utf-8", errors="ignore"))
+    window = text[:limit]
+    for sep in _BREAKS:
+        pos = window.rfind(sep)
+        # 断点过于靠前时会产生很多碎片，继续尝试下一级断点
+        if pos > limit * 0.3:
+            return pos + len(sep)
+    return max(limit, 1)
+
+
+def take_prefix(text: str, max_bytes: int) -> Tuple[str, str]:
+    """
+    取出不超过max_bytes的开头部分
+
+    Returns:
+        (开头部分, 剩余部分)
+    """
+    cut = _split_point(text, max_bytes)
+    return text[:cut].rstrip(), text[cut:].lstrip("\n")
+
+
+def split_text(text: str, max_bytes: int) -> List[str]:
+    """
+    将长文本按段落边界切分为多段，每段UTF-8编码不超过max_bytes
+    """
+    chunks = []
+    rest = text
+    while rest:
+        head, rest = take_prefix(rest, max_bytes)
+        if head:
+            chunks.append(head)
+    return chunks
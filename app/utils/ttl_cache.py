@@ -0,0 +1,90 @@
+from typing import Any, Hashable, Optional
+from collections import OrderedDict
+import time
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    带过期时间和容量上限的进程内缓存
+
+    超过容量时淘汰最久未使用的条目，过期条目在访问时惰性清理。
+    仅在事件循环线程中使用，不做加锁处理。
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 300):
+        """
+        初始化缓存
+
+        Args:
+            maxsize: 最大条目数
+            ttl: 默认过期时间（秒）
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        获取未过期的值
+        """
+        item = self._data.get(key)
+        if item is None:
+            return default
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """
+        写入值，ttl为None时使用默认过期时间
+        """
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        self._evict()
+
+    def add(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> bool:
+        """
+        仅当键不存在或已过期时写入，返回是否写入成功
+        """
+        if self.get(key, _MISSING) is not _MISSING:
+            return False
+        self.set(key, value, ttl)
+        return True
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """
+        取出并删除未过期的值
+        """
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            return default
+        del self._data[key]
+        return value
+
+    def delete(self, key: Hashable):
+        """
+        删除键
+        """
+        self._data.pop(key, None)
+
+    def clear(self):
+        """
+        清空缓存
+        """
+        self._data.clear()
+
+    def _evict(self):
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        return len(self._data)
+
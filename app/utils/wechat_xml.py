@@ -0,0 +1,123 @@
+from typing import Dict, Any, Optional, Union
+from xml.parsers import expat
+from xml.sax.saxutils import escape
+import re
+import time
+
+# XML 1.0 不允许出现的控制字符，LLM输出中偶尔会夹带
+_INVALID_XML_CHARS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+
+# 预编译的文本被动回复模板
+_TEXT_REPLY_TEMPLATE = (
+    "<xml>"
+    "<ToUserName><![CDATA[{to_user}]]></ToUserName>"
+    "<FromUserName><![CDATA[{from_user}]]></FromUserName>"
+    "<CreateTime>{create_time}</CreateTime>"
+    "<MsgType><![CDATA[text]]></MsgType>"
+    "<Content><![CDATA[{content}]]></Content>"
+    "</xml>"
+)
+
+
+class UnsafeXMLError(ValueError):
+    """
+    XML中包含DTD或实体声明
+    """
+    pass
+
+
+def _reject_dtd(*args):
+    raise UnsafeXMLError("不允许在XML中使用DTD声明")
+
+
+def _reject_entity(*args):
+    raise UnsafeXMLError("不允许在XML中声明实体")
+
+
+class _FlatCollector:
+    """
+    只收集根节点下一级元素文本的expat回调
+    """
+
+    __slots__ = ("depth", "parts", "result")
+
+    def __init__(self):
+        self.depth = 0
+        self.parts = []
+        self.result = {}
+
+    def start(self, name, attrs):
+        self.depth += 1
+        if self.depth == 2:
+            self.parts = []
+
+    def end(self, name):
+        if self.depth == 2:
+            self.result[name] = "".join(self.parts)
+        self.depth -= 1
+
+    def data(self, text):
+        if self.depth == 2:
+            self.parts.append(text)
+
+
+def parse_xml(data: Union[bytes, str]) -> Dict[str, str]:
+    """
+    解析微信消息/支付通知这类扁平XML，返回根节点下一级元素的文本
+
+    基于expat流式解析，不构建DOM；拒绝DTD和实体声明，防止实体扩展攻击。
+    嵌套元素（如事件中的ScanCodeInfo）只保留其直接文本。
+
+    Raises:
+        UnsafeXMLError: XML中包含DTD或实体声明时
+        expat.ExpatError: XML格式错误时
+    """
+    collector = _FlatCollector()
+    parser = expat.ParserCreate()
+    parser.buffer_text = True
+    parser.SetParamEntityParsing(expat.XML_PARAM_ENTITY_PARSING_NEVER)
+    parser.StartDoctypeDeclHandler = _reject_dtd
+    parser.EntityDeclHandler = _reject_entity
+    parser.StartElementHandler = collector.start
+    parser.EndElementHandler = collector.end
+    parser.CharacterDataHandler = collector.data
+    parser.Parse(data, True)
+    return collector.result
+
+
+def cdata(text: Any) -> str:
+    """
+    转义CDATA内容：拆分其中的"]]>"并去除XML不允许的控制字符
+    """
+    text = _INVALID_XML_CHARS.sub("", str(text))
+    if "]]>" in text:
+        text = text.replace("]]>", "]]]]><![CDATA[>")
+    return text
+
+
+def build_text_reply(
+    to_user: str, from_user: str, content: str, create_time: Optional[int] = None
+) -> str:
+    """
+    生成公众号文本被动回复
+    """
+    return _TEXT_REPLY_TEMPLATE.format(
+        to_user=cdata(to_user),
+        from_user=cdata(from_user),
+        create_time=int(time.time()) if create_time is None else create_time,
+        content=cdata(content),
+    )
+
+
+def dict_to_xml(data: Dict[str, Any]) -> str:
+    """
+    将扁平字典转换为XML，字符串值使用CDATA，其他值按文本转义
+    """
+    parts = ["<xml>"]
+    for key, value in data.items():
+        if isinstance(value, str):
+            parts.append(f"<{key}><![CDATA[{cdata(value)}]]></{key}>")
+        else:
+            parts.append(f"<{key}>{escape(str(value))}</{key}>")
+    parts.append("</xml>")
+    return "".join(parts)
@@ -0,0 +1 @@
+# Agent任务队列与独立Worker进程模块
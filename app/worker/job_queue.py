@@ -0,0 +1,337 @@
+from typing import Dict, Any, List, Optional
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from app.core.config import settings
+from app.utils.logger import get_logger
+
+# 获取任务队列的日志记录器
+logger = get_logger("worker")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS agent_job (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    user_key TEXT NOT NULL DEFAULT '',
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker_id TEXT,
+    error TEXT,
+    result TEXT,
+    reply_deadline REAL,
+    delivered INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    claimed_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS ix_agent_job_status_id ON agent_job (status, id);
+"""
+
+# 旧版本队列文件中缺少的列
+_ADDED_COLUMNS = [
+    ("result", "TEXT"),
+    ("reply_deadline", "REAL"),
+    ("delivered", "INTEGER NOT NULL DEFAULT 0"),
+]
+
+
+class SQLiteJobQueue:
+    """
+    基于SQLite的本地任务队列
+
+    Web进程只负责入队，Worker进程通过原子认领的方式消费任务，
+    不依赖任何外部服务。被认领但超时未完成的任务（例如Worker崩溃）
+    会被重新放回队列。
+    """
+
+    def __init__(
+        self,
+        path: str,
+        visibility_timeout: int = 600,
+        max_attempts: int = 3,
+    ):
+        """
+        初始化任务队列
+
+        Args:
+            path: SQLite数据库文件路径
+            visibility_timeout: 任务被认领后的最长处理时间（秒），超时后重新入队
+            max_attempts: 单个任务的最大尝试次数
+        """
+        self.path = path
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+        self._schema_ready = False
+        self._schema_lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        """
+        获取当前线程的数据库连接
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        if not self._schema_ready:
+            with self._schema_lock:
+                if not self._schema_ready:
+                    conn.executescript(_SCHEMA)
+                    columns = {row["name"] for row in conn.execute("PRAGMA table_info(agent_job)")}
+                    for name, ddl in _ADDED_COLUMNS:
+                        if name not in columns:
+                            conn.execute(f"ALTER TABLE agent_job ADD COLUMN {name} {ddl}")
+                    self._schema_ready = True
+        return conn
+
+    def _enqueue(
+        self, kind: str, payload: Dict[str, Any], user_key: str, reply_deadline: Optional[float]
+    ) -> int:
+        conn = self._connection()
+        cursor = conn.execute(
+            "INSERT INTO agent_job (kind, user_key, payload, reply_deadline, created_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (kind, user_key, json.dumps(payload, ensure_ascii=False), reply_deadline, time.time()),
+        )
+        return cursor.lastrowid
+
+    def _claim(
+        self, worker_id: str, limit: int, max_per_user: Optional[int]
+    ) -> List[Dict[str, Any]]:
+        conn = self._connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # 回收超时未完成的任务
+            expired_before = now - self.visibility_timeout
+            conn.execute(
+                "UPDATE agent_job SET status = 'failed', error = '超过最大尝试次数', finished_at = ? "
+                "WHERE status = 'running' AND claimed_at < ? AND attempts >= ?",
+                (now, expired_before, self.max_attempts),
+            )
+            conn.execute(
+                "UPDATE agent_job SET status = 'pending', worker_id = NULL "
+                "WHERE status = 'running' AND claimed_at < ?",
+                (expired_before,),
+            )
+
+            # 按用户内的排队序号轮流认领，并扣除用户已在处理中的任务数，
+            # 使单个用户的大量任务不会占满所有Worker
+            rows = conn.execute(
+                """
+                WITH ranked AS (
+                    SELECT id, user_key,
+                           ROW_NUMBER() OVER (PARTITION BY user_key ORDER BY id) AS rn
+                    FROM agent_job WHERE status = 'pending'
+                ), running AS (
+                    SELECT user_key, COUNT(*) AS n FROM agent_job
+                    WHERE status = 'running' GROUP BY user_key
+                )
+                SELECT j.id, j.kind, j.user_key, j.payload, j.attempts, j.reply_deadline
+                FROM ranked r
+                JOIN agent_job j ON j.id = r.id
+                LEFT JOIN running ON running.user_key = r.user_key
+                WHERE ? IS NULL OR r.user_key = '' OR r.rn + COALESCE(running.n, 0) <= ?
+                ORDER BY r.rn, r.id
+                LIMIT ?
+                """,
+                (max_per_user, max_per_user, limit),
+            ).fetchall()
+            if rows:
+                conn.executemany(
+                    "UPDATE agent_job SET status = 'running', worker_id = ?, claimed_at = ?, "
+                    "attempts = attempts + 1 WHERE id = ?",
+                    [(worker_id, now, row["id"]) for row in rows],
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        return [
+            {
+                "id": row["id"],
+                "kind": row["kind"],
+                "user_key": row["user_key"],
+                "payload": json.loads(row["payload"]),
+                "attempts": row["attempts"] + 1,
+                "reply_deadline": row["reply_deadline"],
+            }
+            for row in rows
+        ]
+
+    def _complete(self, job_id: int) -> None:
+        self._connection().execute(
+            "UPDATE agent_job SET status = 'done', finished_at = ? WHERE id = ?",
+            (time.time(), job_id),
+        )
+
+    def _set_result(self, job_id: int, result: Dict[str, Any]) -> None:
+        self._connection().execute(
+            "UPDATE agent_job SET result = ? WHERE id = ?",
+            (json.dumps(result, ensure_ascii=False), job_id),
+        )
+
+    def _get_result(self, job_id: int) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute(
+            "SELECT result FROM agent_job WHERE id = ?", (job_id,)
+        ).fetchone()
+        if row is None or row["result"] is None:
+            return None
+        return json.loads(row["result"])
+
+    def _claim_delivery(self, job_id: int) -> bool:
+        cursor = self._connection().execute(
+            "UPDATE agent_job SET delivered = 1 WHERE id = ? AND delivered = 0", (job_id,)
+        )
+        return cursor.rowcount > 0
+
+    def _is_delivered(self, job_id: int) -> bool:
+        row = self._connection().execute(
+            "SELECT delivered FROM agent_job WHERE id = ?", (job_id,)
+        ).fetchone()
+        return bool(row and row["delivered"])
+
+    def _fail(self, job_id: int, error: str, retry: bool) -> None:
+        conn = self._connection()
+        if retry:
+            conn.execute(
+                "UPDATE agent_job SET status = CASE WHEN attempts < ? THEN 'pending' ELSE 'failed' END, "
+                "worker_id = NULL, error = ?, finished_at = ? WHERE id = ?",
+                (self.max_attempts, error, time.time(), job_id),
+            )
+        else:
+            conn.execute(
+                "UPDATE agent_job SET status = 'failed', error = ?, finished_at = ? WHERE id = ?",
+                (error, time.time(), job_id),
+            )
+
+    def _purge(self, older_than: float) -> int:
+        cursor = self._connection().execute(
+            "DELETE FROM agent_job WHERE status IN ('done', 'failed') AND finished_at < ?",
+            (time.time() - older_than,),
+        )
+        return cursor.rowcount
+
+    def _stats(self) -> Dict[str, int]:
+        rows = self._connection().execute(
+            "SELECT status, COUNT(*) AS n FROM agent_job GROUP BY status"
+        ).fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+    async def enqueue(
+        self,
+        kind: str,
+        payload: Dict[str, Any],
+        user_key: str = "",
+        reply_deadline: Optional[float] = None,
+    ) -> int:
+        """
+        将任务加入队列
+
+        Args:
+            kind: 任务类型，决定Worker使用哪个处理函数
+            payload: 任务数据，必须可以被JSON序列化
+            user_key: 任务所属用户标识（如openid）
+            reply_deadline: 入队方等待结果的截止时间（时间戳），
+                在此之前由入队方负责投递结果，之后由Worker负责
+
+        Returns:
+            任务ID
+        """
+        return await asyncio.to_thread(self._enqueue, kind, payload, user_key, reply_deadline)
+
+    async def claim(
+        self, worker_id: str, limit: int = 1, max_per_user: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        原子地认领最多limit个待处理任务
+
+        Args:
+            worker_id: Worker标识
+            limit: 最多认领的任务数
+            max_per_user: 单个用户同时处理中的最大任务数，None表示不限制
+
+        Returns:
+            任务列表，不同用户的任务交错排列
+        """
+        return await asyncio.to_thread(self._claim, worker_id, limit, max_per_user)
+
+    async def complete(self, job_id: int) -> None:
+        """
+        标记任务完成
+        """
+        await asyncio.to_thread(self._complete, job_id)
+
+    async def set_result(self, job_id: int, result: Dict[str, Any]) -> None:
+        """
+        保存任务结果，供入队方读取
+        """
+        await asyncio.to_thread(self._set_result, job_id, result)
+
+    async def wait_result(
+        self, job_id: int, timeout: float, interval: float = 0.05
+    ) -> Optional[Dict[str, Any]]:
+        """
+        等待任务结果，超时返回None
+        """
+        deadline = time.time() + timeout
+        while True:
+            result = await asyncio.to_thread(self._get_result, job_id)
+            if result is not None or time.time() >= deadline:
+                return result
+            await asyncio.sleep(min(interval, max(deadline - time.time(), 0)))
+
+    async def claim_delivery(self, job_id: int) -> bool:
+        """
+        原子地认领任务结果的投递权，确保结果只被投递一次
+        """
+        return await asyncio.to_thread(self._claim_delivery, job_id)
+
+    async def claim_delivery_after(
+        self, job_id: int, not_before: float, interval: float = 0.05
+    ) -> bool:
+        """
+        在not_before之后认领投递权；若入队方在此之前已投递则立即返回False
+        """
+        while time.time() < not_before:
+            if await asyncio.to_thread(self._is_delivered, job_id):
+                return False
+            await asyncio.sleep(interval)
+        return await self.claim_delivery(job_id)
+
+    async def fail(self, job_id: int, error: str, retry: bool = True) -> None:
+        """
+        标记任务失败，retry为True且未超过最大尝试次数时重新入队
+        """
+        await asyncio.to_thread(self._fail, job_id, error, retry)
+
+    async def purge(self, older_than: float = 86400) -> int:
+        """
+        清理已结束的历史任务
+        """
+        return await asyncio.to_thread(self._purge, older_than)
+
+    async def stats(self) -> Dict[str, int]:
+        """
+        获取各状态的任务数量
+        """
+        return await asyncio.to_thread(self._stats)
+
+
+# 创建单例实例
+job_queue = SQLiteJobQueue(
+    settings.AGENT_QUEUE_PATH,
+    visibility_timeout=settings.AGENT_JOB_VISIBILITY_TIMEOUT,
+    max_attempts=settings.AGENT_JOB_MAX_ATTEMPTS,
+)
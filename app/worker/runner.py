@@ -0,0 +1,243 @@
+from typing import Dict, Any, Awaitable, Callable, Optional, Set
+import asyncio
+import multiprocessing
+import os
+import signal
+import socket
+import time
+
+from app.core.config import settings
+from app.utils.http_client import http_client
+from app.utils.logger import get_logger
+from app.utils.shared_store import shared_store
+from app.worker.job_queue import SQLiteJobQueue, job_queue
+
+# 获取Worker的日志记录器
+logger = get_logger("worker")
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+async def handle_wechat_mp_message(job: Dict[str, Any]) -> None:
+    """
+    处理公众号消息任务：运行Agent并回复
+
+    入队方在reply_deadline之前拿到结果时会以被动回复的形式返回给用户，
+    否则由Worker通过客服消息接口发送。
+    """
+    from app.services.wechat_apps import wechat_apps
+
+    payload = job["payload"]
+    # 兼容升级前入队的任务，其payload直接是消息本身
+    if "message" in payload:
+        message = payload["message"]
+        wechat_service = await wechat_apps.get_mp_service(payload["appid"])
+    else:
+        message = payload
+        wechat_service = wechat_apps.default_mp_service()
+    if message.get("MsgType") != "text" or not job.get("reply_deadline"):
+        await wechat_service.process_message_async(message)
+        return
+
+    answer = await wechat_service.generate_answer(message)
+    await job_queue.set_result(job["id"], {"answer": answer})
+
+    # 留出时间让Web进程读取结果并认领投递
+    if not await job_queue.claim_delivery_after(job["id"], job["reply_deadline"] + 1):
+        return
+
+    try:
+        await wechat_service.deliver_answer(message, answer)
+    except Exception as e:
+        # 不抛出异常，避免任务重试导致重复运行Agent
+        logger.error(f"任务 {job['id']} 的回答投递失败: {str(e)}")
+
+
+class AgentWorker:
+    """
+    Agent Worker，从本地任务队列中认领任务并运行Orchestrator/Agent
+    """
+
+    def __init__(
+        self,
+        queue: SQLiteJobQueue,
+        concurrency: int = 4,
+        poll_interval: float = 0.5,
+        max_per_user: Optional[int] = None,
+        retention: float = 86400,
+        purge_interval: float = 3600,
+    ):
+        """
+        初始化Worker
+
+        Args:
+            queue: 任务队列
+            concurrency: 单个Worker进程同时处理的最大任务数
+            poll_interval: 队列为空时的轮询间隔（秒）
+            max_per_user: 单个用户同时处理中的最大任务数，None表示不限制
+            retention: 已结束任务的保留时间（秒），0表示不清理
+            purge_interval: 清理已结束任务的间隔（秒）
+        """
+        self.queue = queue
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.max_per_user = max_per_user
+        self.retention = retention
+        self.purge_interval = purge_interval
+        self._next_purge = 0.0
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._handlers: Dict[str, JobHandler] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._stopping = asyncio.Event()
+
+        self.register_handler("wechat_mp_message", handle_wechat_mp_message)
+
+    def register_handler(self, kind: str, handler: JobHandler):
+        """
+        注册任务处理函数
+
+        Args:
+            kind: 任务类型
+            handler: 处理函数，接收任务（包含id、payload等字段）
+        """
+        self._handlers[kind] = handler
+
+    def stop(self):
+        """
+        请求Worker在处理完当前任务后退出
+        """
+        self._stopping.set()
+
+    async def _run_job(self, job: Dict[str, Any]):
+        handler = self._handlers.get(job["kind"])
+        if handler is None:
+            logger.error(f"未知的任务类型: {job['kind']} (任务ID: {job['id']})")
+            await self.queue.fail(job["id"], f"未知的任务类型: {job['kind']}", retry=False)
+            return
+
+        try:
+            await handler(job)
+            await self.queue.complete(job["id"])
+        except Exception as e:
+            logger.error(f"任务 {job['id']} 处理失败(第{job['attempts']}次): {str(e)}")
+            await self.queue.fail(job["id"], str(e))
+
+    async def _purge_if_due(self):
+        """
+        到达清理间隔时删除超过保留时间的已结束任务（启动时先清理一次）
+        """
+        if self.retention <= 0 or time.monotonic() < self._next_purge:
+            return
+        self._next_purge = time.monotonic() + self.purge_interval
+        try:
+            purged = await self.queue.purge(older_than=self.retention)
+        except Exception as e:
+            logger.error(f"清理历史任务失败: {str(e)}")
+            return
+        if purged:
+            logger.info(f"已清理 {purged} 个已结束的历史任务")
+
+    async def run(self):
+        """
+        运行Worker主循环
+        """
+        logger.info(f"Agent Worker {self.worker_id} 启动，并发数: {self.concurrency}")
+
+        while not self._stopping.is_set():
+            await self._purge_if_due()
+
+            jobs = []
+            free_slots = self.concurrency - len(self._tasks)
+            if free_slots > 0:
+                try:
+                    jobs = await self.queue.claim(
+                        self.worker_id, free_slots, max_per_user=self.max_per_user
+                    )
+                except Exception as e:
+                    logger.error(f"认领任务失败: {str(e)}")
+
+            for job in jobs:
+                task = asyncio.create_task(self._run_job(job))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+            if not jobs:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+        if self._tasks:
+            logger.info(f"等待 {len(self._tasks)} 个进行中的任务完成")
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+        logger.info(f"Agent Worker {self.worker_id} 已退出")
+
+
+async def run_worker(concurrency: Optional[int] = None):
+    """
+    在当前进程中运行一个Worker，收到SIGINT/SIGTERM后优雅退出
+    """
+    worker = AgentWorker(
+        job_queue,
+        concurrency=concurrency or settings.AGENT_WORKER_CONCURRENCY,
+        poll_interval=settings.AGENT_QUEUE_POLL_INTERVAL,
+        max_per_user=settings.AGENT_MAX_INFLIGHT_PER_USER,
+        retention=settings.AGENT_JOB_RETENTION,
+        purge_interval=settings.AGENT_JOB_PURGE_INTERVAL,
+    )
+
+    if shared_store is None:
+        logger.warning("未配置SHARED_STORE_PATH，Worker暂存的待领取回答无法被Web进程读取")
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, worker.stop)
+        except NotImplementedError:
+            pass
+
+    try:
+        await worker.run()
+    finally:
+        await http_client.close()
+
+
+def _worker_process_main(concurrency: Optional[int]):
+    asyncio.run(run_worker(concurrency))
+
+
+def run_workers(processes: int = 1, concurrency: Optional[int] = None):
+    """
+    启动一个或多个Worker进程
+
+    Args:
+        processes: Worker进程数
+        concurrency: 每个进程的并发任务数
+    """
+    if processes <= 1:
+        _worker_process_main(concurrency)
+        return
+
+    ctx = multiprocessing.get_context("spawn")
+    workers = [
+        ctx.Process(target=_worker_process_main, args=(concurrency,), name=f"agent-worker-{i}")
+        for i in range(processes)
+    ]
+    for process in workers:
+        process.start()
+
+    # 将SIGTERM转发给子进程，使其处理完当前任务后退出
+    def _forward_sigterm(signum, frame):
+        for process in workers:
+            if process.is_alive():
+                process.terminate()
+
+    signal.signal(signal.SIGTERM, _forward_sigterm)
+
+    try:
+        for process in workers:
+            process.join()
+    except KeyboardInterrupt:
+        for process in workers:
+            process.join()
@@ -0,0 +1,56 @@
+"""
+日志调用开销的基准测试
+
+对比原先直接挂载StreamHandler+RotatingFileHandler（调用方线程同步写文件）与
+app.utils.logger 的队列管道（调用方线程只入队）在调用方线程上每次logger.info的耗时。
+控制台输出重定向到/dev/null。
+
+运行: python -m benchmarks.bench_logging
+"""
+from logging.handlers import RotatingFileHandler
+import logging
+import os
+import sys
+import tempfile
+import time
+
+from app.utils import logger as logger_module
+
+CALLS = 20000
+
+
+def direct_logger(path):
+    log = logging.getLogger("bench_direct")
+    log.setLevel(logging.INFO)
+    log.propagate = False
+    formatter = logging.Formatter(logger_module.LOG_FORMAT, logger_module.DATE_FORMAT)
+    for handler in (logging.StreamHandler(sys.stdout), RotatingFileHandler(path, maxBytes=10 * 1024 * 1024, backupCount=5)):
+        handler.setFormatter(formatter)
+        log.addHandler(handler)
+    return log
+
+
+def run(label, log):
+    start = time.perf_counter()
+    for i in range(CALLS):
+        log.info(f"使用OpenAI API代理: http://127.0.0.1:7890 第{i}次")
+    elapsed = time.perf_counter() - start
+    print(f"  {label}{elapsed / CALLS * 1e6:>10.2f} µs/次（调用方线程）", file=sys.stderr)
+
+
+def main():
+    tmp = tempfile.mkdtemp()
+    sys.stdout = open(os.devnull, "w")
+    logger_module._console_handler.setStream(sys.stdout)
+    logger_module.log_dir = logger_module.Path(tmp)
+    run("直接写文件  ", direct_logger(os.path.join(tmp, "direct.log")))
+    queue_logger = logger_module.setup_logger("bench_queue", "queue.log")
+    run("队列+后台线程", queue_logger)
+    print(f"  队列满丢弃 {queue_logger.handlers[0].dropped} 条", file=sys.stderr)
+    start = time.perf_counter()
+    logger_module.flush_logs()
+    print(f"  后台线程写完剩余日志用时 {time.perf_counter() - start:.2f} 秒", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+小程序登录查找/创建用户的基准测试
+
+对比原先「SELECT + bcrypt哈希虚拟密码 + INSERT/commit/refresh」与
+User.upsert_by_openid 单条语句在首次登录和再次登录时的吞吐。
+旧实现在SQLite上并发写入时会因读事务升级为写事务而报database is locked，
+因此两者都按顺序执行。
+
+运行: python -m benchmarks.bench_mini_login
+"""
+import asyncio
+import os
+import secrets
+import tempfile
+import time
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.security import get_password_hash
+from app.db.base import Base
+from app.models.user import User
+
+
+async def legacy_login(db: AsyncSession, openid: str) -> int:
+    user = await User.get_by_openid(db, openid=openid)
+    if not user:
+        user = User(
+            username=f"wx_{openid[-8:]}",
+            hashed_password=get_password_hash(openid),
+            openid=openid,
+            is_active=True,
+        )
+        db.add(user)
+        await db.commit()
+        await db.refresh(user)
+    return user.id
+
+
+async def upsert_login(db: AsyncSession, openid: str) -> int:
+    user = await User.upsert_by_openid(db, openid=openid, session_key="session_key")
+    return user.id
+
+
+async def run(label, login, openids, concurrency=1):
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(openid):
+        async with semaphore:
+            async with session_factory() as db:
+                await login(db, openid)
+
+    for phase in ("首次登录", "再次登录"):
+        start = time.perf_counter()
+        await asyncio.gather(*(one(openid) for openid in openids))
+        elapsed = time.perf_counter() - start
+        print(f"  {label} {phase:<8}{len(openids) / elapsed:>10.1f} 次/秒")
+    await engine.dispose()
+
+
+def main():
+    openids = ["o" + secrets.token_urlsafe(20) for _ in range(100)]
+    asyncio.run(run("SELECT+bcrypt+INSERT", legacy_login, openids))
+    asyncio.run(run("upsert_by_openid    ", upsert_login, openids))
+
+
+if __name__ == "__main__":
+    main()
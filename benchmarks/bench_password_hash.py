@@ -0,0 +1,63 @@
+"""
+密码哈希的基准测试
+
+1. 不同bcrypt cost下单次哈希的耗时，用于选择 PASSWORD_BCRYPT_ROUNDS
+2. 并发登录时在事件循环内同步校验与放到哈希线程池校验的吞吐和事件循环阻塞时间
+
+运行: python -m benchmarks.bench_password_hash
+"""
+import asyncio
+import time
+
+from passlib.context import CryptContext
+
+from app.core import security
+
+
+async def run_logins(verify, hashed, logins):
+    """
+    并发执行登录校验，返回(总耗时, 事件循环最大阻塞时间)
+    """
+    max_lag = 0.0
+    done = False
+
+    async def probe():
+        nonlocal max_lag
+        while not done:
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            max_lag = max(max_lag, time.perf_counter() - start - 0.001)
+
+    probe_task = asyncio.create_task(probe())
+    await asyncio.sleep(0.01)
+    start = time.perf_counter()
+    await asyncio.gather(*(verify("password", hashed) for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+    done = True
+    await probe_task
+    return elapsed, max_lag
+
+
+async def verify_inline(password, hashed):
+    return security.pwd_context.verify(password, hashed)
+
+
+def main():
+    print("单次哈希耗时")
+    for rounds in (10, 11, 12, 13):
+        context = CryptContext(schemes=["bcrypt"], bcrypt__default_rounds=rounds)
+        start = time.perf_counter()
+        context.hash("password")
+        print(f"  rounds={rounds:<4}{(time.perf_counter() - start) * 1000:>10.1f} ms")
+
+    logins = 32
+    hashed = security.pwd_context.hash("password")
+    print(f"并发登录校验（{logins}次，rounds={security.settings.PASSWORD_BCRYPT_ROUNDS}，"
+          f"哈希线程数={security.settings.PASSWORD_HASH_WORKERS}）")
+    for label, verify in (("  事件循环内同步校验", verify_inline), ("  哈希线程池校验", security.verify_password_async)):
+        elapsed, max_lag = asyncio.run(run_logins(verify, hashed, logins))
+        print(f"{label:<24}{logins / elapsed:>8.1f} 次/秒  事件循环最大阻塞 {max_lag * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
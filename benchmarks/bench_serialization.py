@@ -0,0 +1,61 @@
+"""
+用户列表序列化的基准测试
+
+对比FastAPI默认路径（逐行Pydantic校验 + jsonable_encoder + json.dumps）与
+预生成的模型序列化函数 + orjson，在一页用户上的耗时；另外对比旧的Base.to_dict实现。
+
+运行: python -m benchmarks.bench_serialization
+"""
+from datetime import datetime
+import json
+import timeit
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.models.user import User
+from app.schemas.user import User as UserSchema
+
+PAGE = 100
+
+
+def legacy_to_dict(obj):
+    result = {}
+    for c in obj.__table__.columns:
+        result[c.name] = getattr(obj, c.name)
+    return result
+
+
+def main():
+    now = datetime.now()
+    users = [
+        User(id=i, username=f"user{i}", email=f"user{i}@example.com", is_active=True,
+             is_superuser=False, token_version=0, created_at=now, updated_at=now)
+        for i in range(PAGE)
+    ]
+    adapter = TypeAdapter(list[UserSchema])
+
+    def default_path():
+        value = adapter.validate_python(users, from_attributes=True)
+        return json.dumps(jsonable_encoder(value)).encode("utf-8")
+
+    def fast_path():
+        serialize = User.serializer(UserSchema.model_fields)
+        return orjson.dumps([serialize(user) for user in users])
+
+    assert json.loads(default_path()) == json.loads(fast_path())
+
+    for label, func in (("校验+jsonable_encoder+json", default_path), ("预生成序列化+orjson     ", fast_path)):
+        number = 200
+        elapsed = min(timeit.repeat(func, number=number, repeat=5))
+        print(f"  {label}{elapsed / number * 1e6:>10.1f} µs/页（{PAGE}行）")
+
+    for label, func in (("旧to_dict", legacy_to_dict), ("新to_dict", User.to_dict)):
+        number = 20000
+        elapsed = min(timeit.repeat(lambda: func(users[0]), number=number, repeat=5))
+        print(f"  {label}{elapsed / number * 1e6:>10.2f} µs/行")
+
+
+if __name__ == "__main__":
+    main()
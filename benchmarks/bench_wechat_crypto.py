@@ -0,0 +1,96 @@
+"""
+公众号安全模式加解密的微基准测试
+
+对比每条消息重新派生密钥/Cipher与复用 WechatMsgCrypto 的单次回调开销，
+并在并发回调下测量大报文是否放到线程中处理时的吞吐与事件循环阻塞时间。
+
+运行: python -m benchmarks.bench_wechat_crypto
+"""
+import asyncio
+import base64
+import os
+import time
+import timeit
+
+from app.services.wechat_crypto import WechatMsgCrypto
+
+TOKEN = "benchmark_token"
+APPID = "wx1234567890abcdef"
+AES_KEY = base64.b64encode(os.urandom(32)).decode("ascii").rstrip("=")
+
+MP_TEXT_MESSAGE = (
+    "<xml><ToUserName><![CDATA[gh_123456789abc]]></ToUserName>"
+    "<FromUserName><![CDATA[oABCDEFGHIJKLMNOPQRSTUVWXYZ0]]></FromUserName>"
+    "<CreateTime>1700000000</CreateTime><MsgType><![CDATA[text]]></MsgType>"
+    "<Content><![CDATA[最近有哪些关于大型语言模型的研究？]]></Content>"
+    "<MsgId>24000000000000000</MsgId></xml>"
+).encode("utf-8")
+
+ANSWER = "以下是最近关于大型语言模型的几篇论文：\n\n" + "1. 标题：示例论文，作者：张三等，发表日期：2024-01-01\n" * 20
+
+
+def encrypted_body(crypto, plaintext, timestamp="1700000000", nonce="123456"):
+    encrypt = crypto.encrypt(plaintext)
+    body = f"<xml><ToUserName><![CDATA[gh_123456789abc]]></ToUserName><Encrypt><![CDATA[{encrypt}]]></Encrypt></xml>"
+    return body.encode("utf-8"), crypto.signature(timestamp, nonce, encrypt)
+
+
+def bench(label, func, number=5000):
+    per_call = min(timeit.repeat(func, number=number, repeat=5)) / number
+    print(f"{label:<40}{per_call * 1e6:>10.2f} us")
+
+
+async def run_load(crypto, body, msg_signature, callbacks, concurrency):
+    """
+    并发处理回调，返回(总耗时, 事件循环最大阻塞时间)
+    """
+    max_lag = 0.0
+    done = False
+
+    async def probe():
+        nonlocal max_lag
+        while not done:
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            max_lag = max(max_lag, time.perf_counter() - start - 0.001)
+
+    async def callback():
+        plaintext = await crypto.decrypt_callback_async(body, msg_signature, "1700000000", "123456")
+        await crypto.encrypt_reply_async(plaintext.decode("utf-8"), "1700000000", "123456")
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def limited():
+        async with semaphore:
+            await callback()
+
+    probe_task = asyncio.create_task(probe())
+    await asyncio.sleep(0.01)
+    start = time.perf_counter()
+    await asyncio.gather(*(limited() for _ in range(callbacks)))
+    elapsed = time.perf_counter() - start
+    done = True
+    await probe_task
+    return elapsed, max_lag
+
+
+def main():
+    crypto = WechatMsgCrypto(TOKEN, AES_KEY, APPID)
+    body, msg_signature = encrypted_body(crypto, MP_TEXT_MESSAGE)
+
+    print("单次回调（文本消息）")
+    bench("  每次派生密钥+解密", lambda: WechatMsgCrypto(TOKEN, AES_KEY, APPID).decrypt_callback(
+        body, msg_signature, "1700000000", "123456"))
+    bench("  复用Cipher解密", lambda: crypto.decrypt_callback(body, msg_signature, "1700000000", "123456"))
+    bench("  加密回复 (2KB)", lambda: crypto.encrypt_reply(ANSWER, "1700000000", "123456"))
+
+    print("并发回调（约256KB报文，200次，并发50）")
+    large_body, large_signature = encrypted_body(crypto, MP_TEXT_MESSAGE * 1000)
+    for label, threshold in (("  事件循环内处理", 1 << 40), ("  线程中处理", 0)):
+        crypto.thread_threshold = threshold
+        elapsed, max_lag = asyncio.run(run_load(crypto, large_body, large_signature, 200, 50))
+        print(f"{label:<40}{200 / elapsed:>10.1f} 次/秒  事件循环最大阻塞 {max_lag * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
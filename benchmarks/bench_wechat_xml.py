@@ -0,0 +1,98 @@
+"""
+微信回调XML解析/生成的微基准测试
+
+对比原先基于 ElementTree + f-string 的实现与 app.utils.wechat_xml 编解码器
+在单次回调上的开销。
+
+运行: python -m benchmarks.bench_wechat_xml
+"""
+import time
+import timeit
+import xml.etree.ElementTree as ET
+
+from app.utils.wechat_xml import build_text_reply, dict_to_xml, parse_xml
+
+MP_TEXT_MESSAGE = (
+    "<xml><ToUserName><![CDATA[gh_123456789abc]]></ToUserName>"
+    "<FromUserName><![CDATA[oABCDEFGHIJKLMNOPQRSTUVWXYZ0]]></FromUserName>"
+    "<CreateTime>1700000000</CreateTime><MsgType><![CDATA[text]]></MsgType>"
+    "<Content><![CDATA[最近有哪些关于大型语言模型的研究？]]></Content>"
+    "<MsgId>24000000000000000</MsgId></xml>"
+).encode("utf-8")
+
+PAY_NOTIFY = (
+    "<xml><appid><![CDATA[wx2421b1c4370ec43b]]></appid><bank_type><![CDATA[CFT]]></bank_type>"
+    "<cash_fee><![CDATA[1]]></cash_fee><fee_type><![CDATA[CNY]]></fee_type>"
+    "<is_subscribe><![CDATA[Y]]></is_subscribe><mch_id><![CDATA[10000100]]></mch_id>"
+    "<nonce_str><![CDATA[5d2b6c2a8db53831f7eda20af46e531c]]></nonce_str>"
+    "<openid><![CDATA[oUpF8uMEb4qRXf22hE3X68TekukE]]></openid>"
+    "<out_trade_no><![CDATA[1409811653]]></out_trade_no><result_code><![CDATA[SUCCESS]]></result_code>"
+    "<return_code><![CDATA[SUCCESS]]></return_code><sign><![CDATA[B552ED6B279343CB493C5DD0D78AB241]]></sign>"
+    "<time_end><![CDATA[20140903131540]]></time_end><total_fee>1</total_fee>"
+    "<trade_type><![CDATA[JSAPI]]></trade_type>"
+    "<transaction_id><![CDATA[1004400740201409030005092168]]></transaction_id></xml>"
+).encode("utf-8")
+
+ANSWER = "以下是最近关于大型语言模型的几篇论文：\n\n" + "1. 标题：示例论文，作者：张三等，发表日期：2024-01-01\n" * 20
+
+
+def legacy_parse(xml_content):
+    root = ET.fromstring(xml_content)
+    return {child.tag: child.text for child in root}
+
+
+def legacy_reply(message, content):
+    return f"""
+<xml>
+<ToUserName><![CDATA[{message.get("FromUserName")}]]></ToUserName>
+<FromUserName><![CDATA[{message.get("ToUserName")}]]></FromUserName>
+<CreateTime>{int(time.time())}</CreateTime>
+<MsgType><![CDATA[text]]></MsgType>
+<Content><![CDATA[{content}]]></Content>
+</xml>
+""".strip()
+
+
+def legacy_dict_to_xml(data):
+    xml = ["<xml>"]
+    for k, v in data.items():
+        if isinstance(v, str):
+            xml.append(f"<{k}><![CDATA[{v}]]></{k}>")
+        else:
+            xml.append(f"<{k}>{v}</{k}>")
+    xml.append("</xml>")
+    return "".join(xml)
+
+
+def parse_and_reply(xml_content, content):
+    message = parse_xml(xml_content)
+    return build_text_reply(message["FromUserName"], message["ToUserName"], content)
+
+
+def bench(label, func, number=20000):
+    per_call = min(timeit.repeat(func, number=number, repeat=5)) / number
+    print(f"{label:<40}{per_call * 1e6:>10.2f} us")
+
+
+def main():
+    message = parse_xml(MP_TEXT_MESSAGE)
+    pay_data = parse_xml(PAY_NOTIFY)
+
+    print("公众号文本消息回调")
+    bench("  解析 (ElementTree)", lambda: legacy_parse(MP_TEXT_MESSAGE))
+    bench("  解析 (wechat_xml)", lambda: parse_xml(MP_TEXT_MESSAGE))
+    bench("  生成回复 (f-string)", lambda: legacy_reply(message, ANSWER))
+    bench("  生成回复 (wechat_xml)", lambda: build_text_reply(
+        message["FromUserName"], message["ToUserName"], ANSWER))
+    bench("  解析+回复 (旧)", lambda: legacy_reply(legacy_parse(MP_TEXT_MESSAGE), ANSWER))
+    bench("  解析+回复 (wechat_xml)", lambda: parse_and_reply(MP_TEXT_MESSAGE, ANSWER))
+
+    print("微信支付通知")
+    bench("  解析 (ElementTree)", lambda: legacy_parse(PAY_NOTIFY))
+    bench("  解析 (wechat_xml)", lambda: parse_xml(PAY_NOTIFY))
+    bench("  序列化 (f-string)", lambda: legacy_dict_to_xml(pay_data))
+    bench("  序列化 (wechat_xml)", lambda: dict_to_xml(pay_data))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import asyncio
+import os
+import tempfile
+
+# 测试使用临时数据库，避免在仓库目录下生成app.db（需在导入应用配置之前设置）
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}")
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.db.base import Base
+# 导入全部模型，使Base.metadata包含所有表
+from app.models import auto_reply_rule, token_revocation, user, wechat_app  # noqa: F401
+
+
+@pytest.fixture
+def db_engine(tmp_path):
+    """
+    创建已建好全部表的临时SQLite引擎
+
+    不复用连接，可以在同一个测试的多次asyncio.run之间使用。
+    """
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}", poolclass=NullPool)
+
+    async def create_all():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    asyncio.run(create_all())
+    yield engine
+    asyncio.run(engine.dispose())
+
+
+@pytest.fixture
+def db_session_factory(db_engine):
+    """
+    临时数据库的会话工厂
+    """
+    return sessionmaker(db_engine, class_=AsyncSession, expire_on_commit=False)
+
+
+@pytest.fixture
+def client():
+    """
+    创建测试客户端
+    """
+    from app.main import app
+
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture
+def app_db(client):
+    """
+    应用数据库的会话工厂，用于在测试中准备和检查数据
+
+    使用独立的引擎，不与测试客户端所在事件循环中的连接池共享连接。
+    """
+    from app.core.config import settings
+    from app.db.session import _database_url
+
+    engine = create_async_engine(_database_url(settings.DATABASE_URL), poolclass=NullPool)
+    yield sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    asyncio.run(engine.dispose())
+
+
+@pytest.fixture
+def admin_headers():
+    """
+    管理接口的认证请求头
+    """
+    from app.core.config import settings
+
+    return {"Authorization": f"Bearer {settings.ADMIN_TOKEN}"}
+
+
+@pytest.fixture
+def superuser_headers(app_db):
+    """
+    新建一个超级用户并返回其访问令牌的认证请求头
+    """
+    import uuid
+
+    from app.core.security import create_access_token
+    from app.models.user import User
+
+    async def create():
+        async with app_db() as db:
+            admin = User(username=f"admin_{uuid.uuid4().hex[:12]}", hashed_password="x", is_superuser=True)
+            db.add(admin)
+            await db.commit()
+            return admin
+
+    admin = asyncio.run(create())
+    return {"Authorization": f"Bearer {create_access_token(admin.id, user=admin)}"}
@@ -1,16 +1,8 @@
-import pytest
-from fastapi.testclient import TestClient
-
-from app.main import app
-
-
-@pytest.fixture
-def client():
-    """
-    创建测试客户端
-    """
-    with TestClient(app) as c:
-        yield c
+import asyncio
+import base64
+import json
+import time
+from datetime import datetime, timedelta
 
 
 def test_read_main(client):
@@ -28,4 +20,170 @@ def test_health(client):
     """
     response = client.get("/health")
     assert response.status_code == 200
-    assert response.json() == {"status": "ok"} 
\ No newline at end of file
+    assert response.json() == {"status": "ok"}
+
+
+def _create_users(app_db, users):
+    from app.models.user import User
+
+    async def create():
+        async with app_db() as db:
+            rows = [User(hashed_password="x", **values) for values in users]
+            db.add_all(rows)
+            await db.commit()
+            return [row.id for row in rows]
+
+    return asyncio.run(create())
+
+
+def test_log_stats(client, admin_headers):
+    """
+    测试日志队列统计接口返回丢弃的日志数
+    """
+    response = client.get("/api/v1/admin/logs/stats", headers=admin_headers)
+    assert response.status_code == 200
+    stats = response.json()
+    assert stats["capacity"] > 0
+    assert stats["dropped"] >= 0
+
+
+def test_user_list_cursor_pagination(client, app_db, superuser_headers):
+    """
+    测试用户列表通过X-Next-Cursor逐页翻页，X-Total-Count返回总数
+    """
+    start = datetime(2001, 1, 1)
+    _create_users(app_db, [
+        {"username": f"page_{i}", "created_at": start + timedelta(minutes=i // 2)} for i in range(5)
+    ])
+    params = {"limit": 2, "created_from": start.isoformat(), "created_to": (start + timedelta(days=1)).isoformat()}
+
+    seen, cursor = [], None
+    while True:
+        response = client.get("/api/v1/users", params=dict(params, cursor=cursor, with_total=cursor is None),
+                              headers=superuser_headers)
+        assert response.status_code == 200
+        if cursor is None:
+            assert response.headers["x-total-count"] == "5"
+        seen.extend(user["username"] for user in response.json())
+        cursor = response.headers.get("x-next-cursor")
+        if cursor is None:
+            break
+
+    assert seen == [f"page_{i}" for i in reversed(range(5))]
+    bad_cursor = base64.urlsafe_b64encode(b"not-a-cursor").decode()
+    assert client.get("/api/v1/users", params={"cursor": bad_cursor}, headers=superuser_headers).status_code == 400
+
+
+def test_update_and_delete_user_check_version(client, app_db, superuser_headers):
+    """
+    测试修改和删除用户时版本号不一致返回409
+    """
+    user_id, = _create_users(app_db, [{"username": "versioned_user"}])
+
+    response = client.put(f"/api/v1/users/{user_id}", json={"mobile": "13800000000", "version": 1},
+                          headers=superuser_headers)
+    assert response.status_code == 200
+    assert response.json()["version"] == 2
+
+    stale = client.put(f"/api/v1/users/{user_id}", json={"mobile": "13900000000", "version": 1},
+                       headers=superuser_headers)
+    assert stale.status_code == 409
+    assert client.delete(f"/api/v1/users/{user_id}", params={"version": 1}, headers=superuser_headers).status_code == 409
+    assert client.delete(f"/api/v1/users/{user_id}", params={"version": 2}, headers=superuser_headers).status_code == 200
+    assert client.get(f"/api/v1/users/{user_id}", headers=superuser_headers).status_code == 404
+
+
+def test_user_import_and_export(client, admin_headers):
+    """
+    测试上传文件批量导入用户，查询任务进度，并流式导出
+    """
+    content = "username,password,email\nimported_a,pw1,imported_a@example.com\nimported_b,pw2,not-an-email\n"
+    response = client.post(
+        "/api/v1/admin/users/import",
+        files={"file": ("users.csv", content.encode("utf-8"), "text/csv")},
+        headers=admin_headers,
+    )
+    assert response.status_code == 200
+    job_id = response.json()["id"]
+
+    deadline = time.time() + 10
+    while True:
+        job = client.get(f"/api/v1/admin/users/import/{job_id}", headers=admin_headers).json()
+        if job["status"] != "running" or time.time() > deadline:
+            break
+        time.sleep(0.05)
+    assert job["status"] == "done"
+    assert (job["inserted"], job["invalid"]) == (1, 1)
+    assert client.get("/api/v1/admin/users/import/missing", headers=admin_headers).status_code == 404
+
+    response = client.get("/api/v1/admin/users/export", params={"format": "ndjson"}, headers=admin_headers)
+    assert response.status_code == 200
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    exported = next(row for row in rows if row["username"] == "imported_a")
+    assert exported["email"] == "imported_a@example.com"
+    assert "hashed_password" not in exported
+
+
+def test_logs_reject_invalid_level(client, admin_headers):
+    """
+    测试查询和跟踪日志时日志级别无效返回400
+    """
+    for path in ("/api/v1/admin/logs", "/api/v1/admin/logs/follow"):
+        response = client.get(path, params={"level": "verbose"}, headers=admin_headers)
+        assert response.status_code == 400
+
+
+def test_logs_follow_streams_new_lines(tmp_path, monkeypatch, admin_headers):
+    """
+    测试/logs/follow先返回最近的日志，再以SSE推送新写入且满足级别的日志，客户端断开后结束
+
+    TestClient会等待响应结束，无法读取不会结束的流，因此直接以ASGI方式调用应用。
+    """
+    from app.main import app
+
+    monkeypatch.chdir(tmp_path)
+    log_file = tmp_path / "logs" / "app.log"
+    log_file.parent.mkdir()
+    log_file.write_text("2024-01-01 00:00:00 - app - ERROR - earlier\n", encoding="utf-8")
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": "/api/v1/admin/logs/follow", "raw_path": b"/api/v1/admin/logs/follow",
+        "query_string": b"log_type=app&lines=1&level=warning", "root_path": "",
+        "headers": [(b"host", b"testserver"), (b"authorization", admin_headers["Authorization"].encode())],
+        "client": ("127.0.0.1", 1234), "server": ("testserver", 80),
+    }
+    events, start = [], {}
+
+    def write_live_lines():
+        with open(log_file, "a", encoding="utf-8") as f:
+            f.write("2024-01-01 00:00:01 - app - INFO - skipped\n")
+            f.write("2024-01-01 00:00:02 - app - WARNING - live\n")
+
+    async def scenario():
+        received_two = asyncio.Event()
+
+        async def receive():
+            await received_two.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                start.update(message)
+            elif message.get("body", b"").startswith(b"data: "):
+                events.append(message["body"].decode("utf-8"))
+                if len(events) == 1:
+                    # 在跟踪开始之前写入，也不会遗漏
+                    write_live_lines()
+                else:
+                    received_two.set()
+
+        await asyncio.wait_for(app(scope, receive, send), 10)
+
+    asyncio.run(scenario())
+    assert start["status"] == 200
+    assert (b"content-type", b"text/event-stream; charset=utf-8") in start["headers"]
+    assert events == [
+        "data: 2024-01-01 00:00:00 - app - ERROR - earlier\n\n",
+        "data: 2024-01-01 00:00:02 - app - WARNING - live\n\n",
+    ]
@@ -0,0 +1,279 @@
+import asyncio
+
+import pytest
+from sqlalchemy import column, event, insert, table, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.db import session
+from app.db.pool import InstrumentedAsyncPool, pool_metrics
+
+
+def test_sqlite_pragmas_and_pool_metrics(tmp_path):
+    """
+    测试SQLite连接建立时设置PRAGMA，连接池统计借出与归还
+    """
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'test.db'}",
+        poolclass=InstrumentedAsyncPool,
+        pool_size=2,
+        max_overflow=0,
+    )
+    event.listen(engine.sync_engine, "connect", session._set_sqlite_pragmas)
+    pool_metrics.reset()
+
+    async def main():
+        async with engine.connect() as conn:
+            journal_mode = (await conn.execute(text("PRAGMA journal_mode"))).scalar()
+            busy_timeout = (await conn.execute(text("PRAGMA busy_timeout"))).scalar()
+        await engine.dispose()
+        return journal_mode, busy_timeout
+
+    assert asyncio.run(main()) == ("wal", session.settings.SQLITE_BUSY_TIMEOUT)
+    stats = pool_metrics.stats()
+    assert stats["checkouts"] == 1
+    assert stats["checkins"] == 1
+    assert stats["connects"] == 1
+    assert stats["checked_out"] == 0
+
+
+def test_read_session_routes_to_replica_until_request_writes(tmp_path, monkeypatch):
+    """
+    测试只读会话在副本可用后使用副本，同一请求写入主库后改用主库
+    """
+    from app.db.replicas import ReplicaSet
+
+    primary = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'primary.db'}")
+    replica = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}")
+    replica_set = ReplicaSet([replica], max_lag=5, check_interval=0)
+    monkeypatch.setattr(session, "engine", primary)
+    monkeypatch.setattr(session, "replicas", replica_set)
+
+    async def database_name(db):
+        rows = (await db.execute(text("PRAGMA database_list"))).all()
+        return rows[0][2].rsplit("/", 1)[-1]
+
+    async def main():
+        async with primary.begin() as conn:
+            await conn.execute(text("CREATE TABLE t (id INTEGER)"))
+
+        # 首次检查之前没有可用副本，只读会话回退到主库
+        async with session.AsyncReadSessionLocal() as db:
+            assert await database_name(db) == "primary.db"
+
+        await replica_set.start()
+        async with session.AsyncReadSessionLocal() as db:
+            assert await database_name(db) == "replica.db"
+
+        async with session.AsyncSessionLocal() as db:
+            await db.execute(insert(table("t", column("id"))).values(id=1))
+            await db.commit()
+
+        # 同一请求写入主库之后，只读查询也走主库
+        async with session.AsyncReadSessionLocal() as db:
+            assert await database_name(db) == "primary.db"
+
+        await replica_set.stop()
+        await primary.dispose()
+
+    asyncio.run(main())
+
+
+def test_user_keyset_pages_cover_all_rows_once(db_session_factory):
+    """
+    测试游标分页逐页遍历时每个用户恰好出现一次，筛选条件与估算总数正确
+    """
+    from datetime import datetime, timedelta
+
+    from app.db.counts import approximate_count
+    from app.models.user import User
+
+    start = datetime(2024, 1, 1)
+
+    async def main():
+        async with db_session_factory() as db:
+            # 每三个用户共用一个注册时间，检验相同created_at时按id区分
+            db.add_all(
+                User(username=f"u{i}", created_at=start + timedelta(minutes=i // 3), is_active=i % 2 == 0)
+                for i in range(25)
+            )
+            await db.commit()
+
+            seen, after = [], None
+            while True:
+                page = await User.get_page(db, limit=10, after=after)
+                seen.extend(user.username for user in page)
+                if len(page) < 10:
+                    break
+                after = (page[-1].created_at, page[-1].id)
+
+            active = await User.get_page(db, limit=100, is_active=True, created_from=start + timedelta(minutes=3))
+            total = await approximate_count(db, User.list_query(is_active=True))
+        return seen, active, total
+
+    seen, active, total = asyncio.run(main())
+    assert seen == [f"u{i}" for i in reversed(range(25))]
+    assert [user.username for user in active] == [f"u{i}" for i in range(24, 8, -2)]
+    assert total == 13
+
+
+def test_user_import_skips_conflicts_and_reports_invalid_rows(tmp_path, monkeypatch, db_session_factory):
+    """
+    测试批量导入跳过冲突行、记录无效行并在结束后删除文件，进度可从共享存储读取
+    """
+    from sqlalchemy import select
+
+    from app.utils.shared_store import SharedStore
+
+    from app.models.user import User
+    from app.services import user_transfer
+
+    monkeypatch.setattr(user_transfer, "AsyncSessionLocal", db_session_factory)
+
+    async def fake_hashes(passwords):
+        return [f"hashed-{password}" for password in passwords]
+
+    monkeypatch.setattr(user_transfer, "get_password_hashes_async", fake_hashes)
+
+    path = tmp_path / "users.csv"
+    path.write_text(
+        "username,password,email,openid\n"
+        "a,pw1,a@example.com,\n"
+        "b,pw2,,o1\n"
+        "c,pw3,a@example.com,\n"
+        "d,pw4,not-an-email,\n"
+        "e,pw5,,o1\n",
+        encoding="utf-8",
+    )
+
+    store = SharedStore(str(tmp_path / "shared.db"))
+
+    async def main():
+        importer = user_transfer.UserImporter(batch_size=2, store=store)
+        job = await importer.start(str(path), "csv")
+        await asyncio.gather(*importer._tasks.values())
+        # 其他进程中的导入器从共享存储读取进度
+        progress = await user_transfer.UserImporter(store=store).get(job.id)
+        async with db_session_factory() as db:
+            users = (await db.execute(select(User.username, User.hashed_password).order_by(User.id))).all()
+        return progress, users
+
+    job, users = asyncio.run(main())
+    assert job["status"] == "done"
+    assert (job["processed"], job["inserted"], job["skipped"], job["invalid"]) == (5, 2, 2, 1)
+    assert job["errors"][0]["line"] == 5
+    assert users == [("a", "hashed-pw1"), ("b", "hashed-pw2")]
+    assert not path.exists()
+
+
+@pytest.mark.parametrize("returning", [True, False])
+def test_user_repository_checks_version(db_engine, db_session_factory, returning):
+    """
+    测试按版本号修改和删除用户，版本不一致时抛出VersionConflictError（支持与不支持RETURNING）
+    """
+    from app.models.user import User
+    from app.repositories.user import UserRepository, VersionConflictError
+
+    db_engine.dialect.update_returning = db_engine.dialect.delete_returning = returning
+
+    async def main():
+        async with db_session_factory() as db:
+            db.add(User(id=1, username="a"))
+            await db.commit()
+
+            repo = UserRepository(db)
+            user = await repo.update(1, {"email": "a@example.com"}, expected_version=1, revoke_tokens=True)
+            assert (user.email, user.version, user.token_version) == ("a@example.com", 2, 1)
+
+            with pytest.raises(VersionConflictError):
+                await repo.update(1, {"email": "b@example.com"}, expected_version=1)
+            with pytest.raises(VersionConflictError):
+                await repo.delete(1, expected_version=1)
+            assert await repo.update(2, {"email": "b@example.com"}) is None
+
+            deleted = await repo.delete(1, expected_version=2)
+            assert deleted.username == "a"
+            assert await repo.delete(1) is None
+            await db.commit()
+
+    asyncio.run(main())
+
+
+def test_upsert_by_openid_skips_write_when_unchanged(db_engine, db_session_factory):
+    """
+    测试小程序再次登录时会话密钥和unionid没有变化就不写入，变化时才更新记录
+    """
+    from app.models.user import User
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement.split()[0].upper())
+
+    event.listen(db_engine.sync_engine, "before_cursor_execute", record)
+
+    async def main():
+        async with db_session_factory() as db:
+            first = await User.upsert_by_openid(db, openid="o1", unionid="u1", session_key="k1")
+            statements.clear()
+            again = await User.upsert_by_openid(db, openid="o1", session_key="k1")
+            assert statements == ["SELECT"]
+            assert again.id == first.id
+
+            await User.upsert_by_openid(db, openid="o1", session_key="k2")
+            assert "INSERT" in statements
+            user = await User.get_by_openid(db, openid="o1")
+            assert (user.session_key, user.unionid, user.version) == ("k2", "u1", 2)
+
+    asyncio.run(main())
+
+
+def test_query_fingerprint_and_request_stats(db_engine, monkeypatch):
+    """
+    测试语句指纹归一化参数，请求内重复执行同一语句时给出N+1警告
+    """
+    from app.db import instrumentation
+
+    assert instrumentation.fingerprint(
+        "SELECT * FROM user WHERE id IN (?, ?, ?) AND name = 'bob'  AND age > 3"
+    ) == "SELECT * FROM user WHERE id IN (...) AND name = ? AND age > ?"
+    assert instrumentation.fingerprint(
+        "INSERT INTO t (a, b) VALUES ($1, $2), ($3, $4)"
+    ) == "INSERT INTO t (a, b) VALUES (?, ?)"
+
+    warnings = []
+    monkeypatch.setattr(instrumentation.settings, "DB_REPEATED_QUERY_THRESHOLD", 3)
+    monkeypatch.setattr(instrumentation.logger, "warning", warnings.append)
+    instrumentation.instrument_engine(db_engine)
+
+    async def main():
+        stats = instrumentation.begin_request("/users")
+        async with db_engine.connect() as conn:
+            for i in range(3):
+                await conn.execute(text("SELECT :i"), {"i": i})
+        return stats
+
+    stats = asyncio.run(main())
+    assert stats.count == 3
+    assert stats.fingerprints == {"SELECT ?": 3}
+    assert len(warnings) == 1 and "N+1" in warnings[0]
+
+
+def test_failed_statement_does_not_leak_start_time(db_engine):
+    """
+    测试语句执行失败后丢弃其开始时间，连接上不会残留计时数据
+    """
+    from sqlalchemy.exc import OperationalError
+
+    from app.db import instrumentation
+
+    instrumentation.instrument_engine(db_engine)
+
+    async def main():
+        async with db_engine.connect() as conn:
+            for _ in range(3):
+                with pytest.raises(OperationalError):
+                    await conn.execute(text("SELECT * FROM missing_table"))
+            await conn.execute(text("SELECT 1"))
+            return list(conn.sync_connection.info["query_start"])
+
+    assert asyncio.run(main()) == []
@@ -0,0 +1,79 @@
+import asyncio
+import time
+
+from app.worker.job_queue import SQLiteJobQueue
+
+
+def test_enqueue_claim_complete(tmp_path):
+    """
+    测试任务入队、认领与完成
+    """
+    queue = SQLiteJobQueue(str(tmp_path / "queue.db"))
+
+    async def scenario():
+        job_id = await queue.enqueue("echo", {"text": "你好"}, user_key="u1")
+        jobs = await queue.claim("w1", limit=10)
+        assert [job["id"] for job in jobs] == [job_id]
+        assert jobs[0]["payload"] == {"text": "你好"}
+        # 已认领的任务不会被再次认领
+        assert await queue.claim("w2", limit=10) == []
+        await queue.complete(job_id)
+        return await queue.stats()
+
+    assert asyncio.run(scenario()) == {"done": 1}
+
+
+def test_expired_job_is_reclaimed(tmp_path):
+    """
+    测试超时未完成的任务会被重新认领，超过最大次数后标记为失败
+    """
+    queue = SQLiteJobQueue(str(tmp_path / "queue.db"), visibility_timeout=0, max_attempts=2)
+
+    async def scenario():
+        await queue.enqueue("echo", {})
+        assert len(await queue.claim("w1")) == 1
+        time.sleep(0.01)
+        reclaimed = await queue.claim("w2")
+        assert reclaimed[0]["attempts"] == 2
+        time.sleep(0.01)
+        assert await queue.claim("w3") == []
+        return await queue.stats()
+
+    assert asyncio.run(scenario()) == {"failed": 1}
+
+
+def test_claim_interleaves_users(tmp_path):
+    """
+    测试认领时不同用户的任务交错，且受单用户上限约束
+    """
+    queue = SQLiteJobQueue(str(tmp_path / "queue.db"))
+
+    async def scenario():
+        for i in range(3):
+            await queue.enqueue("echo", {"i": i}, user_key="heavy")
+        await queue.enqueue("echo", {}, user_key="light")
+        return await queue.claim("w1", limit=10, max_per_user=1)
+
+    jobs = asyncio.run(scenario())
+    assert [job["user_key"] for job in jobs] == ["heavy", "light"]
+
+
+def test_worker_purges_finished_jobs(tmp_path):
+    """
+    测试Worker按保留时间清理已结束的任务，未结束的任务保留
+    """
+    from app.worker.runner import AgentWorker
+
+    queue = SQLiteJobQueue(str(tmp_path / "queue.db"))
+    worker = AgentWorker(queue, retention=60, purge_interval=3600)
+
+    async def scenario():
+        old_id = await queue.enqueue("echo", {})
+        await queue.claim("w1")
+        await queue.complete(old_id)
+        queue._connection().execute("UPDATE agent_job SET finished_at = ?", (time.time() - 120,))
+        await queue.enqueue("echo", {})
+        await worker._purge_if_due()
+        return await queue.stats()
+
+    assert asyncio.run(scenario()) == {"pending": 1}
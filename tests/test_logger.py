@@ -0,0 +1,228 @@
+import gzip
+import json
+import logging
+
+from app.utils import logger as logger_module
+
+
+def test_logs_are_written_by_background_listener_with_request_context(tmp_path, monkeypatch):
+    """
+    测试日志由后台线程写入，JSON格式中带有请求ID，低于级别的日志被过滤
+    """
+    monkeypatch.setattr(logger_module, "log_dir", tmp_path)
+    monkeypatch.setattr(logger_module.settings, "LOG_JSON", True)
+    log = logger_module.setup_logger("test_pipeline", "test_pipeline.log")
+
+    token = logger_module.request_id_var.set("req-1")
+    try:
+        log.info("hello %s", "world")
+        log.debug("filtered")
+    finally:
+        logger_module.request_id_var.reset(token)
+    logger_module.flush_logs()
+
+    lines = (tmp_path / "test_pipeline.log").read_text(encoding="utf-8").splitlines()
+    record = json.loads(lines[-1])
+    assert len(lines) == 1
+    assert record["message"] == "hello world"
+    assert record["request_id"] == "req-1"
+    assert record["level"] == "INFO"
+
+
+def test_full_queue_drops_instead_of_blocking():
+    """
+    测试队列已满时丢弃日志并计数，而不是阻塞调用方
+    """
+    import queue
+
+    handler = logger_module._LogQueueHandler(queue.Queue(maxsize=1), "test")
+    record = logging.LogRecord("test", logging.INFO, __file__, 1, "x", None, None)
+    handler.handle(record)
+    handler.handle(record)
+    assert handler.dropped == 1
+
+
+def test_error_logs_use_reserved_queue_capacity(monkeypatch):
+    """
+    测试低级别日志占满普通容量后，ERROR日志仍使用预留容量入队且不阻塞；预留容量也满时丢弃并计数
+    """
+    import queue
+    import time
+
+    log_queue = queue.Queue(maxsize=3)
+    handler = logger_module._LogQueueHandler(log_queue, "test-full", limit=1)
+    monkeypatch.setattr(logger_module, "_queue_handlers", [handler])
+
+    def record(level, msg):
+        return logging.LogRecord("test", level, __file__, 1, msg, None, None)
+
+    started = time.perf_counter()
+    handler.handle(record(logging.INFO, "first"))
+    handler.handle(record(logging.WARNING, "dropped"))
+    handler.handle(record(logging.ERROR, "error 1"))
+    handler.handle(record(logging.CRITICAL, "error 2"))
+    handler.handle(record(logging.ERROR, "error 3"))
+    assert time.perf_counter() - started < 0.1
+
+    assert [log_queue.get_nowait().getMessage() for _ in range(3)] == ["first", "error 1", "error 2"]
+    stats = logger_module.log_stats()
+    assert (stats["dropped"], stats["dropped_by_logger"], stats["dropped_errors"]) == (1, {"test-full": 1}, 1)
+
+
+def test_gzip_rotator(tmp_path):
+    """
+    测试轮转出的旧日志文件被gzip压缩，原文件删除
+    """
+    source = tmp_path / "app.log.1"
+    source.write_text("line\n", encoding="utf-8")
+    dest = logger_module._gzip_namer(str(source))
+
+    logger_module._gzip_rotator(str(source), dest)
+
+    assert not source.exists()
+    with gzip.open(dest, "rt", encoding="utf-8") as f:
+        assert f.read() == "line\n"
+
+
+def _write_log(path, records):
+    path.write_text("".join(f"2024-01-01 00:00:00 - app - {level} - {msg}\n" for level, msg in records), encoding="utf-8")
+
+
+def test_tail_spans_rotated_files_and_filters_records(tmp_path):
+    """
+    测试倒序读取最后N行时跨越轮转文件（含gzip压缩的），按级别和子串过滤记录
+    """
+    from app.utils import log_reader
+
+    log_file = tmp_path / "app.log"
+    with gzip.open(tmp_path / "app.log.2.gz", "wt", encoding="utf-8") as f:
+        f.write("2024-01-01 00:00:00 - app - ERROR - oldest\n")
+    _write_log(tmp_path / "app.log.1", [("INFO", f"rotated {i}") for i in range(3)])
+    _write_log(log_file, [("INFO", "current 0"), ("ERROR", "boom"), ("INFO", "current 1")])
+    with open(log_file, "a", encoding="utf-8") as f:
+        f.write("Traceback (most recent call last):\n")
+
+    lines = log_reader._reverse_lines(log_file, block_size=16)
+    assert next(lines) == "Traceback (most recent call last):"
+    assert [line.split(" - ")[-1] for line in log_reader.tail(log_file, 5)[:3]] == ["rotated 2", "current 0", "boom"]
+    assert len(log_reader.tail(log_file, 100)) == 8
+
+    errors = log_reader.tail(log_file, 10, level="error")
+    assert [line.split(" - ")[-1] for line in errors] == ["oldest", "boom"]
+    # 续行与所属记录一起返回
+    assert log_reader.tail(log_file, 10, contains="current 1")[-1].startswith("Traceback")
+
+
+def test_follow_continues_across_rotation(tmp_path):
+    """
+    测试跟踪日志在文件轮转后先读完旧文件再读取新文件，并按级别过滤
+    """
+    import asyncio
+
+    from app.utils import log_reader
+
+    log_file = tmp_path / "app.log"
+    _write_log(log_file, [("INFO", "before")])
+
+    async def scenario():
+        stream = log_reader.follow(log_file, level="warning", interval=0.01)
+        pending = asyncio.ensure_future(stream.__anext__())
+        await asyncio.sleep(0.05)
+        with open(log_file, "a", encoding="utf-8") as f:
+            f.write("2024-01-01 00:00:00 - app - INFO - skipped\n")
+            f.write("2024-01-01 00:00:00 - app - WARNING - first\n")
+        first = await asyncio.wait_for(pending, 1)
+        with open(log_file, "a", encoding="utf-8") as f:
+            f.write("2024-01-01 00:00:00 - app - ERROR - last in old file\n")
+        log_file.rename(tmp_path / "app.log.1")
+        _write_log(log_file, [("ERROR", "new file")])
+        rest = [await asyncio.wait_for(stream.__anext__(), 1) for _ in range(2)]
+        await stream.aclose()
+        return [line.split(" - ")[-1] for line in [first] + rest]
+
+    assert asyncio.run(scenario()) == ["first", "last in old file", "new file"]
+
+
+def test_follow_starts_where_tail_stopped(tmp_path):
+    """
+    测试记下位置后写入的日志：tail不返回，follow从该位置开始返回（分小块读取也能拼出完整的行）
+    """
+    import asyncio
+
+    from app.utils import log_reader
+
+    log_file = tmp_path / "app.log"
+    _write_log(log_file, [("INFO", "before")])
+    start = log_reader.position(log_file)
+    with open(log_file, "a", encoding="utf-8") as f:
+        f.write("2024-01-01 00:00:00 - app - INFO - after 1\n")
+        f.write("2024-01-01 00:00:00 - app - INFO - after 2\n")
+
+    assert [line.split(" - ")[-1] for line in log_reader.tail(log_file, 10, end=start)] == ["before"]
+
+    async def scenario():
+        stream = log_reader.follow(log_file, interval=0.01, start=start, chunk_size=8)
+        lines = [await asyncio.wait_for(stream.__anext__(), 1) for _ in range(2)]
+        await stream.aclose()
+        return lines
+
+    assert [line.split(" - ")[-1] for line in asyncio.run(scenario())] == ["after 1", "after 2"]
+
+
+def test_tail_and_follow_resume_from_rotated_file(tmp_path):
+    """
+    测试记下位置后文件轮转：tail跳过新文件并在旧文件的该位置截止，follow从旧文件的该位置继续
+    """
+    import asyncio
+
+    from app.utils import log_reader
+
+    log_file = tmp_path / "app.log"
+    _write_log(log_file, [("INFO", "before")])
+    start = log_reader.position(log_file)
+    with open(log_file, "a", encoding="utf-8") as f:
+        f.write("2024-01-01 00:00:00 - app - INFO - after rotation point\n")
+    log_file.rename(tmp_path / "app.log.1")
+    _write_log(log_file, [("INFO", "new file")])
+
+    assert [line.split(" - ")[-1] for line in log_reader.tail(log_file, 10, end=start)] == ["before"]
+
+    async def scenario():
+        stream = log_reader.follow(log_file, interval=0.01, start=start)
+        lines = [await asyncio.wait_for(stream.__anext__(), 1) for _ in range(2)]
+        await stream.aclose()
+        return lines
+
+    assert [line.split(" - ")[-1] for line in asyncio.run(scenario())] == ["after rotation point", "new file"]
+
+
+def test_contains_matches_first_line_in_tail_and_follow(tmp_path):
+    """
+    测试按子串过滤时tail和follow都只检查记录的首行，续行跟随首行
+    """
+    import asyncio
+
+    from app.utils import log_reader
+
+    log_file = tmp_path / "app.log"
+    log_file.write_text("", encoding="utf-8")
+    start = log_reader.position(log_file)
+    records = (
+        "2024-01-01 00:00:00 - app - ERROR - request failed\n"
+        "ValueError: needle\n"
+        "2024-01-01 00:00:00 - app - INFO - needle found\n"
+        "  continuation\n"
+    )
+    with open(log_file, "a", encoding="utf-8") as f:
+        f.write(records)
+
+    tailed = log_reader.tail(log_file, 10, contains="needle")
+
+    async def scenario():
+        stream = log_reader.follow(log_file, contains="needle", interval=0.01, start=start)
+        lines = [await asyncio.wait_for(stream.__anext__(), 1) for _ in range(2)]
+        await stream.aclose()
+        return lines
+
+    followed = asyncio.run(scenario())
+    assert tailed == followed == ["2024-01-01 00:00:00 - app - INFO - needle found", "  continuation"]
@@ -0,0 +1,87 @@
+import asyncio
+import sqlite3
+from pathlib import Path
+
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.config import settings
+from app.db.base import Base
+
+_ROOT = Path(__file__).resolve().parent.parent
+
+
+def _upgrade(monkeypatch, db_path: Path, revision: str = "head") -> None:
+    monkeypatch.setattr(settings, "DATABASE_URL", f"sqlite:///{db_path}")
+    config = Config(str(_ROOT / "alembic.ini"))
+    config.set_main_option("script_location", str(_ROOT / "alembic"))
+    config.attributes["configure_logger"] = False
+    command.upgrade(config, revision)
+
+
+def _user_columns(db_path: Path) -> dict:
+    with sqlite3.connect(db_path) as conn:
+        return {row[1]: row for row in conn.execute('PRAGMA table_info("user")')}
+
+
+def _schema_diff(db_path: Path) -> list:
+    from app.models import auto_reply_rule, token_revocation, user, wechat_app  # noqa: F401
+
+    engine = create_engine(f"sqlite:///{db_path}")
+    with engine.connect() as conn:
+        diff = compare_metadata(MigrationContext.configure(conn), Base.metadata)
+    engine.dispose()
+    return diff
+
+
+def test_migrations_upgrade_baseline_database(tmp_path, monkeypatch):
+    """
+    测试从最初的表结构升级到最新版本，已有数据保留
+    """
+    db_path = tmp_path / "app.db"
+    _upgrade(monkeypatch, db_path, "3f1c2a9d8e01")
+    with sqlite3.connect(db_path) as conn:
+        conn.execute(
+            'INSERT INTO "user" (username, hashed_password, is_active, is_superuser, created_at, updated_at) '
+            "VALUES ('a', 'hash', 1, 0, '2020-01-01', '2020-01-01')"
+        )
+
+    _upgrade(monkeypatch, db_path)
+
+    columns = _user_columns(db_path)
+    # PRAGMA table_info的第4列为notnull
+    assert columns["hashed_password"][3] == 0
+    assert "session_key" in columns
+    assert "token_version" in columns
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute('SELECT username, hashed_password, token_version, version FROM "user"').fetchall() == [
+            ("a", "hash", 0, 1)
+        ]
+        assert conn.execute("SELECT count(*) FROM token_revocation").fetchone() == (0,)
+        assert conn.execute("SELECT count(*) FROM auto_reply_rule").fetchone() == (0,)
+        assert conn.execute("SELECT count(*) FROM wechat_app").fetchone() == (0,)
+    # 迁移后的表结构与当前模型一致
+    assert _schema_diff(db_path) == []
+
+
+def test_migrations_skip_tables_created_by_create_all(tmp_path, monkeypatch):
+    """
+    测试开发环境已按当前模型自动建表时，迁移可以直接执行到最新版本
+    """
+    db_path = tmp_path / "app.db"
+    from app.models import auto_reply_rule, token_revocation, user, wechat_app  # noqa: F401
+
+    async def create_all():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        await engine.dispose()
+
+    asyncio.run(create_all())
+    _upgrade(monkeypatch, db_path)
+
+    assert set(_user_columns(db_path)) == set(Base.metadata.tables["user"].columns.keys())
@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+
+from app.orchestrator.scheduler import FairScheduler, QueueFullError
+
+
+class FakeOrchestrator:
+    """
+    记录处理顺序的模拟协调器
+    """
+
+    def __init__(self):
+        self.order = []
+
+    async def process_query(self, query, context=None, agent_id=None):
+        self.order.append(query)
+        await asyncio.sleep(0.01)
+        return {"response": query}
+
+
+def test_users_are_served_round_robin():
+    """
+    测试重度用户不会阻塞其他用户
+    """
+    fake = FakeOrchestrator()
+    scheduler = FairScheduler(fake, max_concurrency=1, max_inflight_per_user=1)
+
+    async def scenario():
+        # 先占满唯一的并发，使后续查询都进入排队
+        warmup = scheduler.submit("warmup", "w")
+        heavy = [scheduler.submit("heavy", f"h{i}") for i in range(4)]
+        light = [scheduler.submit("light", "l0"), scheduler.submit("other", "o0")]
+        await asyncio.gather(warmup, *heavy, *light)
+
+    asyncio.run(scenario())
+    assert fake.order == ["w", "h0", "l0", "o0", "h1", "h2", "h3"]
+
+
+def test_per_user_inflight_cap():
+    """
+    测试单用户并发上限
+    """
+    fake = FakeOrchestrator()
+    scheduler = FairScheduler(fake, max_concurrency=8, max_inflight_per_user=2)
+
+    async def scenario():
+        tasks = [asyncio.create_task(scheduler.submit("u", str(i))) for i in range(5)]
+        await asyncio.sleep(0)
+        assert scheduler.stats()["running"] == 2
+        await asyncio.gather(*tasks)
+        assert scheduler.stats() == {
+            "running": 0,
+            "queued": 0,
+            "active_users": 0,
+            "max_concurrency": 8,
+            "max_inflight_per_user": 2,
+        }
+
+    asyncio.run(scenario())
+
+
+def test_queue_full():
+    """
+    测试单用户排队上限
+    """
+    scheduler = FairScheduler(FakeOrchestrator(), max_concurrency=1, max_queued_per_user=1)
+
+    async def scenario():
+        first = asyncio.create_task(scheduler.submit("u", "a"))
+        second = asyncio.create_task(scheduler.submit("u", "b"))
+        await asyncio.sleep(0)
+        with pytest.raises(QueueFullError):
+            await scheduler.submit("u", "c")
+        await asyncio.gather(first, second)
+
+    asyncio.run(scenario())
@@ -0,0 +1,228 @@
+import asyncio
+
+import pytest
+from passlib.context import CryptContext
+
+from app.core import security
+
+
+def test_login_rehashes_when_cost_changes():
+    """
+    测试登录时密码哈希的计算强度与配置不一致则重新计算
+    """
+    old_hash = CryptContext(schemes=["bcrypt"], bcrypt__default_rounds=4).hash("secret")
+
+    valid, new_hash = asyncio.run(security.verify_and_update_password("secret", old_hash))
+    assert valid
+    assert new_hash.startswith(f"$2b${security.settings.PASSWORD_BCRYPT_ROUNDS:02d}$")
+
+    assert asyncio.run(security.verify_and_update_password("wrong", old_hash)) == (False, None)
+    assert asyncio.run(security.verify_and_update_password("secret", None)) == (False, None)
+
+
+def test_hash_queue_rejects_when_full(monkeypatch):
+    """
+    测试等待计算的密码哈希过多时直接拒绝
+    """
+    monkeypatch.setattr(security.settings, "PASSWORD_HASH_MAX_PENDING", 0)
+
+    with pytest.raises(security.PasswordHashBusyError):
+        asyncio.run(security.get_password_hash_async("secret"))
+
+
+def test_current_auth_is_cached_until_invalidated(monkeypatch):
+    """
+    测试认证结果缓存在进程内，失效后重新查询数据库
+    """
+    from types import SimpleNamespace
+
+    from app.api import deps
+    from app.core.auth_cache import AuthCache
+
+    cache = AuthCache(ttl=60, token_ttl=60)
+    monkeypatch.setattr(deps, "auth_cache", cache)
+
+    lookups = []
+    user = SimpleNamespace(id=7, is_active=True, is_superuser=False, token_version=0)
+
+    async def get_by_id(db, id):
+        lookups.append(id)
+        return user
+
+    monkeypatch.setattr(deps.User, "get_by_id", get_by_id)
+    token = security.create_access_token(7)
+
+    async def scenario():
+        assert await deps.get_current_auth(db=None, token=token) == (7, True, False, 0)
+        assert await deps.get_current_auth(db=None, token=token) == (7, True, False, 0)
+        assert lookups == [7]
+        assert cache.get_token_payload(token).sub == "7"
+
+        user.is_active = False
+        cache.invalidate(7)
+        auth = await deps.get_current_auth(db=None, token=token)
+        assert lookups == [7, 7] and not auth.is_active
+
+    asyncio.run(scenario())
+
+
+def test_claims_mode_trusts_token_until_revoked(monkeypatch):
+    """
+    测试无状态鉴权模式信任令牌中的声明，直到令牌被吊销
+    """
+    from types import SimpleNamespace
+
+    from fastapi import HTTPException
+
+    from app.api import deps
+    from app.core.auth_cache import AuthCache
+    from app.core.token_revocation import TokenRevocationList
+
+    monkeypatch.setattr(security.settings, "AUTH_CLAIMS_MODE", True)
+    monkeypatch.setattr(deps, "auth_cache", AuthCache(ttl=0, token_ttl=0))
+    revocations = TokenRevocationList(sync_interval=0, capacity=100)
+    monkeypatch.setattr(deps, "token_revocations", revocations)
+
+    async def get_by_id(db, id):
+        raise AssertionError("无状态模式下不应查询数据库")
+
+    monkeypatch.setattr(deps.User, "get_by_id", get_by_id)
+    user = SimpleNamespace(id=9, is_active=True, is_superuser=True, token_version=3)
+    token = security.create_access_token(9, user=user)
+
+    async def scenario():
+        assert await deps.get_current_auth(db=None, token=token) == (9, True, True, 3)
+
+        revocations._apply(9, 4)
+        with pytest.raises(HTTPException) as exc_info:
+            await deps.get_current_auth(db=None, token=token)
+        assert exc_info.value.status_code == 401
+
+        user.token_version = 4
+        fresh_token = security.create_access_token(9, user=user)
+        assert await deps.get_current_auth(db=None, token=fresh_token) == (9, True, True, 4)
+
+    asyncio.run(scenario())
+
+
+def test_cached_auth_rejects_revoked_token(monkeypatch):
+    """
+    测试命中鉴权缓存时仍拒绝版本过低或已被吊销的令牌
+    """
+    from types import SimpleNamespace
+
+    from fastapi import HTTPException
+
+    from app.api import deps
+    from app.core.auth_cache import AuthCache
+    from app.core.token_revocation import TokenRevocationList
+
+    cache = AuthCache(ttl=60, token_ttl=60)
+    monkeypatch.setattr(deps, "auth_cache", cache)
+    revocations = TokenRevocationList(sync_interval=0, capacity=100)
+    monkeypatch.setattr(deps, "token_revocations", revocations)
+
+    user = SimpleNamespace(id=5, is_active=True, is_superuser=False, token_version=1)
+
+    async def get_by_id(db, id):
+        return user
+
+    monkeypatch.setattr(deps.User, "get_by_id", get_by_id)
+    old_token = security.create_access_token(5, user=user)
+
+    async def scenario():
+        assert (await deps.get_current_auth(db=None, token=old_token)).token_version == 1
+
+        # 吊销只登记在吊销列表中，缓存的状态仍是旧版本
+        revocations._apply(5, 2)
+        with pytest.raises(HTTPException) as exc_info:
+            await deps.get_current_auth(db=None, token=old_token)
+        assert exc_info.value.status_code == 401
+
+        # 其他请求刷新了缓存中的令牌版本
+        user.token_version = 3
+        cache.set_state(user)
+        stale_token = security.create_access_token(5, user=SimpleNamespace(**{**vars(user), "token_version": 2}))
+        with pytest.raises(HTTPException):
+            await deps.get_current_auth(db=None, token=stale_token)
+
+    asyncio.run(scenario())
+
+
+def test_stale_replica_row_does_not_restore_revoked_auth(tmp_path, monkeypatch):
+    """
+    测试吊销令牌后只读副本仍返回旧记录时，旧令牌被拒绝且副本上的记录不写入鉴权缓存
+    """
+    import shutil
+
+    from fastapi import HTTPException
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from sqlalchemy.pool import NullPool
+
+    from app.api import deps
+    from app.api.v1.endpoints import users
+    from app.core.auth_cache import AuthCache
+    from app.core.token_revocation import TokenRevocationList
+    from app.db import session
+    from app.db.base import Base
+    from app.db.replicas import ReplicaSet
+    from app.models.user import User
+    from app.schemas.user import UserUpdate
+
+    primary = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'primary.db'}", poolclass=NullPool)
+    replica = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}", poolclass=NullPool)
+    replica_set = ReplicaSet([replica])
+    monkeypatch.setattr(replica_set, "choose", lambda: replica)
+    monkeypatch.setattr(session, "engine", primary)
+    monkeypatch.setattr(session, "replicas", replica_set)
+    cache = AuthCache(ttl=60, token_ttl=0)
+    monkeypatch.setattr(deps, "auth_cache", cache)
+    monkeypatch.setattr(users, "auth_cache", cache)
+    revocations = TokenRevocationList(sync_interval=0, capacity=100)
+    monkeypatch.setattr(deps, "token_revocations", revocations)
+    monkeypatch.setattr(users, "token_revocations", revocations)
+
+    async def create_user():
+        async with primary.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with session.AsyncSessionLocal() as db:
+            user = User(username="stale", hashed_password="x")
+            db.add(user)
+            await db.commit()
+            return user
+
+    user = asyncio.run(create_user())
+    with monkeypatch.context() as m:
+        m.setattr(security.settings, "AUTH_CLAIMS_MODE", True)
+        claims_token = security.create_access_token(user.id, user=user)
+    token = security.create_access_token(user.id)
+    # 副本停留在吊销之前的状态
+    shutil.copy(tmp_path / "primary.db", tmp_path / "stale.db")
+    shutil.copy(tmp_path / "stale.db", tmp_path / "replica.db")
+
+    async def deactivate():
+        async with session.AsyncSessionLocal() as db:
+            return await users._update_user(db, user.id, UserUpdate(is_active=False))
+
+    updated = asyncio.run(deactivate())
+    assert (updated.is_active, updated.token_version) == (False, 1)
+
+    async def authenticate(dependency, token):
+        async with session.AsyncReadSessionLocal() as db:
+            result = await dependency(db=db, token=token)
+            assert session.reads_from_replica(db)
+            return result
+
+    # 副本上的旧记录仍是激活状态，但不能写入缓存并在TTL内一直沿用
+    assert asyncio.run(authenticate(deps.get_current_auth, token)).is_active
+    assert cache.get_state(user.id) is None
+
+    shutil.copy(tmp_path / "primary.db", tmp_path / "replica.db")
+    assert not asyncio.run(authenticate(deps.get_current_auth, token)).is_active
+
+    # 令牌携带版本号时，即使副本上的令牌版本还是旧的，也按吊销列表拒绝
+    shutil.copy(tmp_path / "stale.db", tmp_path / "replica.db")
+    monkeypatch.setattr(security.settings, "AUTH_CLAIMS_MODE", True)
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(authenticate(deps.get_current_user, claims_token))
+    assert exc_info.value.status_code == 401
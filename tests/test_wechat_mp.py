@@ -0,0 +1,445 @@
+import asyncio
+
+import pytest
+
+from app.services.wechat_dedup import MessageDeduplicator
+from app.services.wechat_mp_sender import (
+    CustomMessageSender, CustomMessageSendError, WechatAPIError,
+)
+from app.utils.shared_store import SharedStore
+from app.utils.ttl_cache import TTLCache
+from app.utils.wechat_xml import UnsafeXMLError, build_text_reply, parse_xml
+
+
+def test_ttl_cache_bounded_and_expiring():
+    """
+    测试缓存容量上限与过期
+    """
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert "b" not in cache
+    assert cache.get("a") == 1
+    cache.set("d", 4, ttl=0)
+    assert cache.get("d") is None
+
+
+def test_retried_message_is_claimed_once(tmp_path):
+    """
+    测试重试推送的消息只处理一次，且去重记录可跨进程共享
+    """
+    store = SharedStore(str(tmp_path / "shared.db"))
+    first = MessageDeduplicator(store=store)
+    second = MessageDeduplicator(store=store)
+    text = {"ToUserName": "gh_1", "FromUserName": "u1", "MsgId": "1001", "MsgType": "text"}
+    event = {"ToUserName": "gh_1", "FromUserName": "u1", "CreateTime": "1700000000",
+             "MsgType": "event", "Event": "subscribe"}
+
+    async def scenario():
+        return [
+            await first.claim(text),
+            await first.claim(dict(text)),
+            await second.claim(text),
+            await first.claim(event),
+            await second.claim(event),
+        ]
+
+    assert asyncio.run(scenario()) == [True, False, False, True, False]
+
+
+def test_shared_store_purges_expired_keys(tmp_path):
+    """
+    测试后台任务定期清理共享存储中过期的键，未过期的键保留
+    """
+    import sqlite3
+
+    store = SharedStore(str(tmp_path / "shared.db"), purge_interval=0.05)
+
+    async def scenario():
+        for i in range(3):
+            await store.add(f"wechat:mp:dedup:{i}", "1", ttl=0.01)
+        await store.set("kept", "1", ttl=60)
+        await store.start()
+        await asyncio.sleep(0.2)
+        await store.stop()
+
+    asyncio.run(scenario())
+    with sqlite3.connect(tmp_path / "shared.db") as conn:
+        assert conn.execute("SELECT key FROM shared_kv").fetchall() == [("kept",)]
+
+
+@pytest.mark.parametrize("returning", [True, False])
+def test_shared_store_pop_list_with_and_without_returning(tmp_path, monkeypatch, returning):
+    """
+    测试共享存储取出列表后删除，旧版本SQLite（不支持RETURNING）下结果相同
+    """
+    from app.utils import shared_store
+
+    monkeypatch.setattr(shared_store, "_SUPPORTS_RETURNING", returning)
+    store = SharedStore(str(tmp_path / "shared.db"))
+
+    async def scenario():
+        await store.append("answers", "a", ttl=60)
+        await store.append("answers", "b", ttl=60)
+        return await store.pop_list("answers"), await store.pop_list("answers")
+
+    assert asyncio.run(scenario()) == (["a", "b"], [])
+
+
+def _text_message_xml(msg_id: str, content: str = "你好") -> bytes:
+    return (
+        "<xml><ToUserName><![CDATA[gh_1]]></ToUserName>"
+        "<FromUserName><![CDATA[user_1]]></FromUserName>"
+        "<CreateTime>1700000000</CreateTime><MsgType><![CDATA[text]]></MsgType>"
+        f"<Content><![CDATA[{content}]]></Content><MsgId>{msg_id}</MsgId></xml>"
+    ).encode("utf-8")
+
+
+def _make_service(monkeypatch, answer_delay: float):
+    from app.core.config import settings
+    from app.services.wechat_mp import WechatMPService
+
+    monkeypatch.setattr(settings, "AGENT_WORKER_MODE", "inline")
+    monkeypatch.setattr(settings, "WECHAT_MP_REPLY_TIMEOUT", 0.1)
+    service = WechatMPService(appid="appid", secret="secret", token="token")
+    sent = []
+
+    async def generate_answer(message):
+        await asyncio.sleep(answer_delay)
+        return "论文回答"
+
+    async def send_custom_message(openid, message_type, content):
+        sent.append((openid, content))
+        return {"errcode": 0}
+
+    monkeypatch.setattr(service, "generate_answer", generate_answer)
+    monkeypatch.setattr(service, "send_custom_message", send_custom_message)
+    return service, sent
+
+
+def test_fast_answer_is_returned_as_passive_reply(monkeypatch):
+    """
+    测试时限内完成的回答直接作为被动回复返回
+    """
+    service, sent = _make_service(monkeypatch, answer_delay=0)
+    reply = asyncio.run(service.auto_reply(_text_message_xml("2001")))
+    assert "论文回答" in reply
+    assert sent == []
+
+
+def test_slow_answer_falls_back_to_custom_message(monkeypatch):
+    """
+    测试超出时限的回答改用客服消息发送
+    """
+    service, sent = _make_service(monkeypatch, answer_delay=0.2)
+
+    async def scenario():
+        reply = await service.auto_reply(_text_message_xml("2002"))
+        await asyncio.sleep(0.3)
+        return reply
+
+    reply = asyncio.run(scenario())
+    assert "正在处理中" in reply
+    assert sent == [("user_1", "论文回答")]
+
+
+def test_undelivered_answer_is_picked_up_on_follow_up(monkeypatch):
+    """
+    测试客服消息发送失败的回答在用户发送“继续”时返回
+    """
+    service, sent = _make_service(monkeypatch, answer_delay=0.2)
+
+    async def failing_send(openid, message_type, content):
+        raise Exception("45047: out of response count limit")
+
+    monkeypatch.setattr(service, "send_custom_message", failing_send)
+
+    async def scenario():
+        first = await service.auto_reply(_text_message_xml("3001"))
+        await asyncio.sleep(0.3)
+        follow_up = await service.auto_reply(_text_message_xml("3002", "继续"))
+        empty = await service.auto_reply(_text_message_xml("3003", "继续"))
+        return first, follow_up, empty
+
+    first, follow_up, empty = asyncio.run(scenario())
+    assert "正在处理中" in first
+    assert "论文回答" in follow_up
+    assert "暂时没有新的回答" in empty
+
+
+def test_continue_keyword_is_not_shadowed_by_rules(monkeypatch):
+    """
+    测试能匹配“继续”的规则不会遮蔽待领取的回答
+    """
+    from types import SimpleNamespace
+
+    from app.services import wechat_mp
+    from app.services.wechat_rules import AutoReplyRuleEngine
+
+    engine = AutoReplyRuleEngine(reload_interval=0)
+    engine.load([SimpleNamespace(id=1, appid=None, match_type="prefix", pattern="继", reply="规则回复", priority=0)])
+    monkeypatch.setattr(wechat_mp, "rule_engine", engine)
+    service, sent = _make_service(monkeypatch, answer_delay=0.2)
+
+    async def failing_send(openid, message_type, content):
+        raise Exception("45047: out of response count limit")
+
+    monkeypatch.setattr(service, "send_custom_message", failing_send)
+
+    async def scenario():
+        await service.auto_reply(_text_message_xml("4001"))
+        await asyncio.sleep(0.3)
+        follow_up = await service.auto_reply(_text_message_xml("4002", "继续"))
+        other = await service.auto_reply(_text_message_xml("4003", "继续学习"))
+        return follow_up, other
+
+    follow_up, other = asyncio.run(scenario())
+    assert "论文回答" in follow_up
+    assert "规则回复" in other
+
+
+def test_sender_splits_and_retries_transient_errors():
+    """
+    测试发送队列按段落拆分长消息，并在系统繁忙时重试
+    """
+    delivered = []
+    failures = [WechatAPIError(-1, "system error")]
+
+    async def send_text(openid, content):
+        if failures:
+            raise failures.pop()
+        delivered.append(content)
+        return {"errcode": 0}
+
+    sender = CustomMessageSender(send_text, rate=1000, burst=10, max_bytes=30)
+    asyncio.run(sender.send("user_1", "第一段内容。\n\n第二段内容。\n\n第三段内容。"))
+    assert delivered == ["第一段内容。", "第二段内容。", "第三段内容。"]
+    assert sender.stats()["retried"] == 1
+
+
+def test_sender_reports_undelivered_remainder():
+    """
+    测试发送失败时返回未送达的内容
+    """
+    async def send_text(openid, content):
+        if "第二段" in content:
+            raise WechatAPIError(45047, "out of response count limit")
+        return {"errcode": 0}
+
+    sender = CustomMessageSender(send_text, rate=1000, burst=10, max_bytes=30)
+    with pytest.raises(CustomMessageSendError) as exc_info:
+        asyncio.run(sender.send("user_1", "第一段内容。\n\n第二段内容。\n\n第三段内容。"))
+    assert exc_info.value.remaining == "第二段内容。\n\n第三段内容。"
+
+
+def test_xml_codec_round_trips_cdata_terminator():
+    """
+    测试回复中的CDATA结束符和控制字符被正确处理
+    """
+    reply = build_text_reply("user", "gh_app", "a]]>b\x07c", create_time=1)
+    message = parse_xml(reply.encode("utf-8"))
+    assert message["Content"] == "a]]>bc"
+    assert message["CreateTime"] == "1"
+
+
+def test_xml_codec_rejects_entity_declarations():
+    """
+    测试拒绝带有实体声明的XML
+    """
+    payload = b'<?xml version="1.0"?><!DOCTYPE xml [<!ENTITY a "aaaa">]><xml><Content>&a;</Content></xml>'
+    with pytest.raises(UnsafeXMLError):
+        parse_xml(payload)
+
+
+def test_safe_mode_round_trip_and_signature_check():
+    """
+    测试安全模式消息加解密往返，签名或AppID不符时拒绝
+    """
+    from app.services.wechat_crypto import WechatCryptoError, WechatMsgCrypto
+
+    crypto = WechatMsgCrypto("token", "abcdefghijklmnopqrstuvwxyz0123456789ABCDEFG", "wx_app")
+    plaintext = _text_message_xml("1", "加密消息")
+    encrypt = crypto.encrypt(plaintext)
+    body = f"<xml><Encrypt><![CDATA[{encrypt}]]></Encrypt></xml>".encode("utf-8")
+
+    assert crypto.decrypt_callback(body, crypto.signature("1", "n", encrypt), "1", "n") == plaintext
+    with pytest.raises(WechatCryptoError):
+        crypto.decrypt_callback(body, "bad", "1", "n")
+
+    reply = parse_xml(crypto.encrypt_reply("<xml>ok</xml>", "2", "m"))
+    assert reply["MsgSignature"] == crypto.signature("2", "m", reply["Encrypt"])
+    assert crypto.decrypt(reply["Encrypt"]) == b"<xml>ok</xml>"
+
+    other_app = WechatMsgCrypto("token", "abcdefghijklmnopqrstuvwxyz0123456789ABCDEFG", "wx_other")
+    with pytest.raises(WechatCryptoError):
+        other_app.decrypt(encrypt)
+
+
+def test_invalid_aes_key_only_disables_safe_mode():
+    """
+    测试无效的EncodingAESKey抛出WechatCryptoError，公众号服务仍可创建（仅安全模式不可用）
+    """
+    from app.services.wechat_crypto import WechatCryptoError, WechatMsgCrypto
+    from app.services.wechat_mp import WechatMPService
+
+    for aes_key in ("your_mp_aes_key", "!" * 43, "abcdefghijklmnopqrstuvwxyz0123456789ABCDE!G"):
+        with pytest.raises(WechatCryptoError):
+            WechatMsgCrypto("token", aes_key, "wx_app")
+
+    service = WechatMPService("wx_placeholder", "secret", "token", aes_key="your_mp_aes_key")
+    assert service.crypto is None
+
+
+def test_admin_rejects_invalid_app_aes_key():
+    """
+    测试添加或更新账号时校验EncodingAESKey，43位但无法解码的密钥返回400
+    """
+    from fastapi import HTTPException
+
+    from app.api.v1.endpoints.admin import _check_aes_key
+
+    _check_aes_key("wx_app", "token", "abcdefghijklmnopqrstuvwxyz0123456789ABCDEFG")
+    _check_aes_key("wx_app", "token", None)
+    with pytest.raises(HTTPException) as exc_info:
+        _check_aes_key("wx_app", "token", "abcdefghijklmnopqrstuvwxyz0123456789ABCDE!G")
+    assert exc_info.value.status_code == 400
+
+
+def test_rule_engine_matches_by_type_and_priority():
+    """
+    测试自动回复规则按匹配方式和优先级命中，无效的正则被忽略
+    """
+    from types import SimpleNamespace
+
+    from app.services.wechat_rules import AutoReplyRuleEngine
+
+    def rule(id, match_type, pattern, reply, priority=0, appid=None):
+        return SimpleNamespace(id=id, appid=appid, match_type=match_type, pattern=pattern, reply=reply, priority=priority)
+
+    engine = AutoReplyRuleEngine(reload_interval=0)
+    engine.load([
+        rule(1, "exact", "帮助", "help"),
+        rule(2, "prefix", "价格", "price"),
+        rule(3, "regex", r"\d{4}\.\d{4,5}", "paper", priority=5),
+        rule(4, "prefix", "价格 2303.08774", "specific"),
+        rule(5, "event", "MENU_HELP", "menu"),
+        rule(6, "regex", "(", "broken"),
+    ])
+
+    def text(content):
+        return {"MsgType": "text", "Content": content}
+
+    assert engine.match(text(" 帮助 ")) == "help"
+    assert engine.match(text("帮助一下")) is None
+    assert engine.match(text("价格是多少")) == "price"
+    assert engine.match(text("价格 2303.08774")) == "paper"
+    assert engine.match({"MsgType": "event", "Event": "CLICK", "EventKey": "MENU_HELP"}) == "menu"
+    assert engine.match({"MsgType": "event", "Event": "subscribe"}) is None
+
+    stats = engine.stats()
+    assert stats["rules"] == 5
+    assert stats["lookups"] == 6 and stats["hits"] == 4
+    assert stats["rule_hits"] == {1: 1, 2: 1, 3: 1, 5: 1}
+
+
+def test_rule_engine_scopes_rules_by_appid():
+    """
+    测试账号专属规则只对该账号生效，公共规则对所有账号生效并参与优先级比较
+    """
+    from types import SimpleNamespace
+
+    from app.services.wechat_rules import AutoReplyRuleEngine
+
+    def rule(id, pattern, reply, priority=0, appid=None):
+        return SimpleNamespace(id=id, appid=appid, match_type="exact", pattern=pattern, reply=reply, priority=priority)
+
+    engine = AutoReplyRuleEngine(reload_interval=0)
+    engine.load([
+        rule(1, "帮助", "公共帮助"),
+        rule(2, "帮助", "A的帮助", priority=5, appid="wx_a"),
+        rule(3, "价格", "B的价格", appid="wx_b"),
+    ])
+
+    def text(content):
+        return {"MsgType": "text", "Content": content}
+
+    assert engine.match(text("帮助"), "wx_a") == "A的帮助"
+    assert engine.match(text("帮助"), "wx_b") == "公共帮助"
+    assert engine.match(text("帮助"), "wx_other") == "公共帮助"
+    assert engine.match(text("价格"), "wx_b") == "B的价格"
+    assert engine.match(text("价格"), "wx_a") is None
+    assert engine.match(text("价格")) is None
+    assert engine.stats()["rules"] == 3
+
+
+def test_app_registry_isolates_and_rebuilds_services(monkeypatch):
+    """
+    测试多账号服务按appid隔离，配置变化后重建
+    """
+    from app.services.wechat_apps import WechatAppNotFoundError, WechatAppRegistry
+
+    configs = {
+        "wx_a": {"secret": "a", "token": "ta", "aes_key": "", "max_concurrency": 2},
+        "wx_b": {"secret": "b", "token": "tb", "aes_key": "", "max_concurrency": 0},
+    }
+
+    async def load_config(app_type, appid):
+        config = configs.get(appid)
+        return dict(config) if config else None
+
+    registry = WechatAppRegistry()
+    monkeypatch.setattr(registry, "_load_config", load_config)
+
+    async def scenario():
+        service_a = await registry.get_mp_service("wx_a")
+        service_b = await registry.get_mp_service("wx_b")
+        assert service_a is await registry.get_mp_service("wx_a")
+        assert service_a.token_manager is not service_b.token_manager
+        assert service_a.max_concurrency == 2 and service_b.max_concurrency == 0
+
+        configs["wx_a"]["token"] = "ta2"
+        rebuilt = await registry.get_mp_service("wx_a")
+        assert rebuilt is not service_a and rebuilt.token == "ta2"
+
+        with pytest.raises(WechatAppNotFoundError):
+            await registry.get_mp_service("wx_missing")
+
+    asyncio.run(scenario())
+
+
+def test_app_registry_evicts_removed_apps(monkeypatch):
+    """
+    测试账号被删除或停用后服务实例从注册表中释放
+    """
+    from app.services.wechat_apps import WechatAppNotFoundError, WechatAppRegistry
+
+    configs = {
+        "wx_a": {"secret": "a", "token": "ta", "aes_key": "", "max_concurrency": 0},
+        "wx_b": {"secret": "b", "token": "tb", "aes_key": "", "max_concurrency": 0},
+    }
+
+    async def load_config(app_type, appid):
+        config = configs.get(appid)
+        return dict(config) if config else None
+
+    registry = WechatAppRegistry()
+    monkeypatch.setattr(registry, "_load_config", load_config)
+
+    async def scenario():
+        await registry.get_mp_service("wx_a")
+        await registry.get_mp_service("wx_b")
+        assert registry.stats()["mp"] == ["wx_a", "wx_b"]
+
+        # 管理接口删除账号后调用invalidate
+        registry.invalidate("wx_a")
+        assert registry.stats()["mp"] == ["wx_b"]
+
+        # 其他进程停用的账号在下次访问发现配置不存在时释放
+        del configs["wx_b"]
+        with pytest.raises(WechatAppNotFoundError):
+            await registry.get_mp_service("wx_b")
+        assert registry.stats()["mp"] == []
+
+    asyncio.run(scenario())
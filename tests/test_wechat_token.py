@@ -0,0 +1,85 @@
+import asyncio
+import time
+
+from app.services.wechat_token import AccessTokenManager
+from app.utils.shared_store import SharedStore
+
+
+class CountingTokenManager(AccessTokenManager):
+    """
+    不访问微信接口、按次数生成token的管理器
+    """
+
+    async def _fetch(self):
+        await asyncio.sleep(0.01)
+        self.fetch_count += 1
+        return f"token-{self.fetch_count}", time.time() + 7200
+
+
+def test_concurrent_requests_share_one_fetch():
+    """
+    测试并发获取token只会请求一次微信接口
+    """
+    manager = CountingTokenManager("appid", "secret")
+
+    async def scenario():
+        tokens = await asyncio.gather(*[manager.get_token() for _ in range(20)])
+        assert set(tokens) == {"token-1"}
+        assert await manager.get_token() == "token-1"
+
+    asyncio.run(scenario())
+    assert manager.fetch_count == 1
+
+
+def test_invalid_token_is_refreshed_and_retried():
+    """
+    测试接口返回40001时刷新token并重试
+    """
+    manager = CountingTokenManager("appid", "secret")
+    used = []
+
+    async def api(access_token):
+        used.append(access_token)
+        if access_token == "token-1":
+            return {"errcode": 40001, "errmsg": "invalid credential"}
+        return {"errcode": 0}
+
+    result = asyncio.run(manager.call(api))
+    assert result == {"errcode": 0}
+    assert used == ["token-1", "token-2"]
+
+
+def test_shared_store_reuses_token_across_managers(tmp_path):
+    """
+    测试共享存储中的token可以被其他进程的管理器直接使用
+    """
+    store = SharedStore(str(tmp_path / "shared.db"))
+    first = CountingTokenManager("appid", "secret", store=store)
+    second = CountingTokenManager("appid", "secret", store=store)
+
+    async def scenario():
+        return await first.get_token(), await second.get_token()
+
+    assert asyncio.run(scenario()) == ("token-1", "token-1")
+    assert second.fetch_count == 0
+
+
+def test_refresh_does_not_release_lock_taken_by_another_process(tmp_path):
+    """
+    测试刷新超过锁的有效期、锁已被其他进程抢占时，不会删除其他进程的锁
+    """
+    store = SharedStore(str(tmp_path / "shared.db"))
+
+    class SlowTokenManager(CountingTokenManager):
+        async def _fetch(self):
+            # 模拟锁过期后被其他进程抢占
+            await self.store.set(f"{self._store_key}:lock", "other-process", ttl=10)
+            return await super()._fetch()
+
+    manager = SlowTokenManager("appid", "secret", store=store)
+
+    async def scenario():
+        assert await manager.get_token() == "token-1"
+        return await store.get(f"{manager._store_key}:lock")
+
+    assert asyncio.run(scenario()) == "other-process"
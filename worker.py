@@ -0,0 +1,11 @@
+import argparse
+
+from app.worker.runner import run_workers
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Agent Worker进程")
+    parser.add_argument("--processes", type=int, default=1, help="Worker进程数")
+    parser.add_argument("--concurrency", type=int, default=None, help="每个进程的并发任务数")
+    args = parser.parse_args()
+
+    run_workers(processes=args.processes, concurrency=args.concurrency)